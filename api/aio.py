@@ -0,0 +1,50 @@
+import asyncio
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+# Helpers for the async views (api/async_views.py).
+# Django's async ORM still runs every query through one thread per request, so
+# awaiting two querysets side by side doesn't overlap them. gather_queries runs
+# independent sync ORM callables on worker threads of their own instead, each
+# with its own connection (handed back to the pool when it's done), so their
+# round trips overlap. ASYNC_PARALLEL_QUERIES=False runs them one after another
+# on the request's connection, e.g. inside a test transaction other
+# connections can't see.
+
+
+def on_own_connection(function):
+    def run():
+        try:
+            return function()
+        finally:
+            for connection in connections.all(initialized_only=True):
+                connection.close()
+    return run
+
+
+async def gather_queries(*functions):
+    """Results of the sync callables, in order."""
+    if len(functions) < 2 or not getattr(settings, 'ASYNC_PARALLEL_QUERIES', True):
+        return [await sync_to_async(function)() for function in functions]
+    return await asyncio.gather(
+        *(sync_to_async(on_own_connection(function), thread_sensitive=False)() for function in functions)
+    )
+
+
+async def allow_request(throttle, request, view=None):
+    """SimpleRateThrottle.allow_request() on the async cache API, same keys and history."""
+    if throttle.rate is None:
+        return True
+    throttle.key = throttle.get_cache_key(request, view)
+    if throttle.key is None:
+        return True
+    throttle.history = await throttle.cache.aget(throttle.key, [])
+    throttle.now = throttle.timer()
+    while throttle.history and throttle.history[-1] <= throttle.now - throttle.duration:
+        throttle.history.pop()
+    if len(throttle.history) >= throttle.num_requests:
+        return throttle.throttle_failure()
+    throttle.history.insert(0, throttle.now)
+    await throttle.cache.aset(throttle.key, throttle.history, throttle.duration)
+    return True
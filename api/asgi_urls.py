@@ -0,0 +1,19 @@
+from django.urls import path
+from . import async_views
+from .urls import urlpatterns as sync_urlpatterns
+
+# api.urls with the async views (api/async_views.py) in place of their sync
+# counterparts; every other route is shared. Served under ASGI.
+ASYNC_VIEWS = {
+    'feed-articles': async_views.feed_articles,
+    'profile': async_views.profile,
+    'tag-list': async_views.tag_list,
+    'profile-follow': async_views.follow_user,
+    'favorite-article': async_views.favorite_article,
+}
+
+urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS[pattern.name], name=pattern.name)
+    if getattr(pattern, 'name', None) in ASYNC_VIEWS else pattern
+    for pattern in sync_urlpatterns
+]
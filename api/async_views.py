@@ -0,0 +1,140 @@
+import functools
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+from . import feed, profiles, tags
+from .aio import allow_request
+from .authentication import StatelessJWTAuthentication
+from .conditional import not_modified, stamp
+from .models import Article, Favorite
+from .renderers import FastJSONRenderer
+from .views import FeedView, TagListView, follow_one
+
+# Async views for the ASGI deployment (news_project/asgi.py serves
+# news_project.asgi_urls, which swaps these in for their sync counterparts).
+# They answer from the async cache API and the async ORM, and run independent
+# queries side by side (aio.gather_queries), so a request only leaves the event
+# loop for the database itself. Authentication, permissions, throttling,
+# versioning and error bodies follow the DRF views, and the responses, ETags
+# and cache keys are the same as the sync views produce.
+
+renderer = FastJSONRenderer()
+tag_create = TagListView.as_view()
+
+
+def render(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(renderer.render(data), status=status_code, content_type=renderer.media_type)
+
+
+def async_api_view(methods, permission_classes=(AllowAny,)):
+    """Wraps an async view with the parts of APIView.initial() these endpoints rely on."""
+    def decorator(view):
+        @csrf_exempt
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            drf_request = Request(request)
+            authenticator = StatelessJWTAuthentication()
+            try:
+                if request.method not in methods:
+                    raise exceptions.MethodNotAllowed(request.method)
+                negotiator = api_settings.DEFAULT_CONTENT_NEGOTIATION_CLASS()
+                drf_request.accepted_renderer, drf_request.accepted_media_type = negotiator.select_renderer(
+                    drf_request, [renderer]
+                )
+                drf_request.version, drf_request.versioning_scheme = None, None
+                if api_settings.DEFAULT_VERSIONING_CLASS:
+                    scheme = api_settings.DEFAULT_VERSIONING_CLASS()
+                    drf_request.version, drf_request.versioning_scheme = scheme.determine_version(drf_request), scheme
+                user_auth = await authenticator.aauthenticate(request)
+                drf_request.user, drf_request.auth = user_auth or (AnonymousUser(), None)
+                for permission in permission_classes:
+                    if not permission().has_permission(drf_request, None):
+                        if not drf_request.user.is_authenticated:
+                            raise exceptions.NotAuthenticated()
+                        raise exceptions.PermissionDenied()
+                for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES:
+                    throttle = throttle_class()
+                    if not await allow_request(throttle, drf_request):
+                        raise exceptions.Throttled(throttle.wait())
+                return await view(drf_request, *args, **kwargs)
+            except (exceptions.APIException, Http404) as exc:
+                response = exception_handler(exc, {'request': drf_request, 'view': None})
+                rendered = render(response.data, response.status_code)
+                for header, value in response.headers.items():
+                    if header != 'Content-Type':
+                        rendered[header] = value
+                if response.status_code == status.HTTP_401_UNAUTHORIZED:
+                    rendered['WWW-Authenticate'] = authenticator.authenticate_header(request)
+                return rendered
+        return wrapper
+    return decorator
+
+
+@async_api_view(['GET'], permission_classes=[IsAuthenticated])
+async def feed_articles(request):
+    # same steps, cache entries and output as views.FeedView.list
+    view = FeedView()
+    view.setup(request)
+    view.format_kwarg = None
+    view.celebrity_authors = await feed.afollowed_celebrities(request.user)
+    cache_key = await feed.aresponse_cache_key(request, view.celebrity_authors)
+    data = await cache.aget(cache_key)
+    if data is None:
+        page = await view.paginator.apaginate_merged(view.get_row_querysets(), request, view)
+        results = await view.row_serializer.aserialize(page, request, view.get_output_fields())
+        data = view.paginator.get_paginated_response(results).data
+        await cache.aset(cache_key, data, settings.FEED_CACHE_TIMEOUT)
+    return render(data)
+
+
+@async_api_view(['GET'], permission_classes=[IsAuthenticatedOrReadOnly])
+async def profile(request, username):
+    # same cache entry, validators and output as views.ProfileView
+    row = await profiles.astats(username)
+    if row is None:
+        raise Http404('No User matches the given query.')
+    following = await profiles.ais_following(request.user, row['id'])
+    validators = (tuple(sorted(row.items())), following, request.version)
+    response, etag, timestamp = not_modified(request, validators, None)
+    if response is None:
+        response = render({'profile': profiles.representation(row, following)})
+    return stamp(response, etag, timestamp, vary_on_user=True)
+
+
+@async_api_view(['GET', 'POST'])
+async def tag_list(request):
+    if request.method != 'GET':
+        return await sync_to_async(tag_create)(request._request)  # writes stay on TagListView
+    tag_list = await tags.aget_tag_list()
+    return render({'tags': tag_list['tags'], 'counts': tag_list['counts']})
+
+
+@async_api_view(['POST', 'DELETE'], permission_classes=[IsAuthenticated])
+async def follow_user(request, username):
+    # the batch path is transactional sync code; one thread hop for the whole write
+    detail, status_code = await sync_to_async(follow_one)(request.user, username, request.method)
+    return render({'detail': detail}, status_code)
+
+
+@async_api_view(['POST', 'DELETE'], permission_classes=[IsAuthenticated])
+async def favorite_article(request, article_id):
+    if not await Article.objects.filter(id=article_id).aexists():
+        raise Http404('No Article matches the given query.')
+    if request.method == 'POST':
+        favorite, created = await Favorite.objects.aget_or_create(user=request.user, article_id=article_id)
+        if created:
+            return render({'detail': 'Article favorited.'}, status.HTTP_201_CREATED)
+        return render({'detail': 'Article already favorited.'})
+
+    deleted, _ = await Favorite.objects.filter(user=request.user, article_id=article_id).adelete()
+    if deleted:
+        return render({'detail': 'Favorite removed.'}, status.HTTP_204_NO_CONTENT)
+    return render({'detail': 'Favorite does not exist.'}, status.HTTP_404_NOT_FOUND)
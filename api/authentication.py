@@ -0,0 +1,116 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from .models import User
+
+# Claims copied into every token we issue, so requests can be authenticated
+# without loading the user row. `tv` is the user's token_version at issue time;
+# bumping User.token_version (revoke_tokens) invalidates all older tokens.
+TOKEN_VERSION_CLAIM = 'tv'
+
+
+def refresh_token_for(user):
+    refresh = RefreshToken.for_user(user)
+    refresh['username'] = user.username
+    refresh['is_active'] = user.is_active
+    refresh[TOKEN_VERSION_CLAIM] = user.token_version
+    return refresh
+
+
+def token_version_key(user_id):
+    return f'auth:token_version:{user_id}'
+
+
+def current_token_version(user_id):
+    version = cache.get(token_version_key(user_id))
+    if version is None:
+        version = User.objects.filter(id=user_id).values_list('token_version', flat=True).first()
+        if version is None:
+            return None
+        cache.set(token_version_key(user_id), version, getattr(settings, 'AUTH_TOKEN_VERSION_CACHE_TIMEOUT', 60 * 5))
+    return version
+
+
+async def acurrent_token_version(user_id):
+    version = await cache.aget(token_version_key(user_id))
+    if version is None:
+        version = await User.objects.filter(id=user_id).values_list('token_version', flat=True).afirst()
+        if version is None:
+            return None
+        await cache.aset(token_version_key(user_id), version, getattr(settings, 'AUTH_TOKEN_VERSION_CACHE_TIMEOUT', 60 * 5))
+    return version
+
+
+def revoke_tokens(user):
+    """Invalidate every token issued to the user so far."""
+    User.objects.filter(id=user.id).update(token_version=F('token_version') + 1)
+    user.refresh_from_db(fields=['token_version'])
+    cache.delete(token_version_key(user.id))
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that builds request.user from the token claims.
+
+    The user is a User instance holding only id, username, is_active and
+    token_version; any other field is deferred and loaded from the database on
+    first access, so views that only need the id (filters, FK assignment,
+    ownership checks) run without an auth query. The token version is checked
+    against a cached copy of User.token_version. Tokens issued without our
+    claims fall back to the regular per-request user fetch.
+    """
+
+    def get_user(self, validated_token):
+        if TOKEN_VERSION_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        user_id = self.claimed_user_id(validated_token)
+        return self.claims_user(validated_token, user_id, current_token_version(user_id))
+
+    async def aauthenticate(self, request):
+        """authenticate() for async views: (user, token) or None without a bearer token."""
+        header = self.get_header(request)
+        raw_token = self.get_raw_token(header) if header is not None else None
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        if TOKEN_VERSION_CLAIM not in validated_token:
+            return await sync_to_async(super().get_user)(validated_token), validated_token
+        user_id = self.claimed_user_id(validated_token)
+        return self.claims_user(validated_token, user_id, await acurrent_token_version(user_id)), validated_token
+
+    def claimed_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise AuthenticationFailed('Token contained no recognizable user identification', code='token_not_valid')
+
+    def claims_user(self, validated_token, user_id, version):
+        if version is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        if validated_token[TOKEN_VERSION_CLAIM] != version:
+            raise AuthenticationFailed('Token has been revoked', code='token_revoked')
+        if not validated_token.get('is_active', True):
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+
+        claims = {
+            'id': int(user_id),
+            'username': validated_token['username'],
+            'is_active': validated_token['is_active'],
+            'token_version': version,
+        }
+        # from_db expects values in model field order; every other field is deferred
+        field_names = [field.attname for field in User._meta.concrete_fields if field.attname in claims]
+        return User.from_db('default', field_names, [claims[name] for name in field_names])
+
+
+def full_user(request):
+    """The complete User row for views that read more than the token claims."""
+    user = request.user
+    if user.get_deferred_fields():
+        user = User.objects.get(pk=user.pk)
+    return user
@@ -0,0 +1,76 @@
+import time
+from django.core.cache import caches
+
+# Versioned cache namespaces.
+# Keys are built as `<namespace>:v<version>:<key>`, the version itself living in
+# the shared cache. invalidate() bumps the version, so one write expires every
+# key of the namespace - including keys other workers will build later - without
+# having to know or delete them. Stale entries simply age out.
+
+
+class CacheNamespace:
+    def __init__(self, name, alias='default'):
+        self.name = name
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def version_key(self):
+        return f'ns:{self.name}:version'
+
+    def version(self):
+        version = self.cache.get(self.version_key)
+        if version is None:
+            # seeded from the clock so a lost version never reuses an old one
+            self.cache.add(self.version_key, time.time_ns(), None)
+            version = self.cache.get(self.version_key)
+        return version
+
+    async def aversion(self):
+        version = await self.cache.aget(self.version_key)
+        if version is None:
+            await self.cache.aadd(self.version_key, time.time_ns(), None)
+            version = await self.cache.aget(self.version_key)
+        return version
+
+    def key(self, key):
+        return f'{self.name}:v{self.version()}:{key}'
+
+    def get(self, key, default=None):
+        return self.cache.get(self.key(key), default)
+
+    async def aget(self, key, default=None):
+        return await self.cache.aget(f'{self.name}:v{await self.aversion()}:{key}', default)
+
+    def set(self, key, value, timeout=None):
+        self.cache.set(self.key(key), value, timeout)
+
+    async def aset(self, key, value, timeout=None):
+        await self.cache.aset(f'{self.name}:v{await self.aversion()}:{key}', value, timeout)
+
+    def get_many(self, keys):
+        prefix = self.key('')
+        found = self.cache.get_many([f'{prefix}{key}' for key in keys])
+        return {key: found[f'{prefix}{key}'] for key in keys if f'{prefix}{key}' in found}
+
+    def set_many(self, values, timeout=None):
+        prefix = self.key('')
+        self.cache.set_many({f'{prefix}{key}': value for key, value in values.items()}, timeout)
+
+    def delete_many(self, keys):
+        prefix = self.key('')
+        self.cache.delete_many([f'{prefix}{key}' for key in keys])
+
+    def invalidate(self):
+        try:
+            self.cache.incr(self.version_key)
+        except ValueError:
+            self.cache.add(self.version_key, time.time_ns(), None)
+
+
+tags = CacheNamespace('tags')
+postings = CacheNamespace('postings')
+profiles = CacheNamespace('profiles')
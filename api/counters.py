@@ -0,0 +1,154 @@
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F
+from . import trending
+from .models import Article
+
+# Write-coalescing counters for Article.favorites_count / comments_count.
+# Favorite and comment events bump an in-process buffer once their transaction
+# commits; the buffered deltas are written to the article rows in one short
+# transaction at most COUNTER_FLUSH_INTERVAL seconds after the first of them
+# (a timer thread, so a worker that goes quiet still writes them), as soon as
+# COUNTER_FLUSH_SIZE articles are pending, and when the process exits. A
+# viral article then takes one `count = count + n` UPDATE per
+# flush instead of one row lock per favorite. F() expressions keep flushes
+# from several workers additive. Trending score deltas (api/trending.py) ride
+# the same buffer under (TRENDING, epoch) keys and apply to the article's
+# TrendingScore rows, converted to the stored epoch.
+
+COUNTER_FIELDS = ('favorites_count', 'comments_count')
+TRENDING = 'trending'  # field keys (TRENDING, epoch) hold trending score deltas
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pending = defaultdict(lambda: defaultdict(int))
+_last_flush = time.monotonic()
+_timer = None
+
+
+def flush_interval():
+    return getattr(settings, 'COUNTER_FLUSH_INTERVAL', 5)
+
+
+def incr(article_id, field, delta=1):
+    with _lock:
+        _pending[article_id][field] += delta
+        due = (
+            time.monotonic() - _last_flush >= flush_interval()
+            or len(_pending) >= getattr(settings, 'COUNTER_FLUSH_SIZE', 500)
+        )
+        if not due:
+            _schedule()
+    if due:
+        flush()
+
+
+def _schedule():
+    # with _lock held: one timer per batch of deltas
+    global _timer
+    if _timer is None:
+        _timer = threading.Timer(flush_interval(), _flush_in_thread)
+        _timer.daemon = True
+        _timer.start()
+
+
+def _cancel():
+    global _timer
+    if _timer is not None:
+        _timer.cancel()
+        _timer = None
+
+
+def _flush_in_thread():
+    try:
+        flush()
+    except Exception:
+        logger.exception('Counter flush failed, the deltas are retried with the next one')
+    finally:
+        connection.close()  # the timer thread got its own connection, don't leak it
+
+
+def is_trending(field):
+    return isinstance(field, tuple) and field[0] == TRENDING
+
+
+def pending(article_id, field):
+    """Delta buffered in this process and not yet written to the article row."""
+    with _lock:
+        deltas = _pending.get(article_id)
+        return deltas.get(field, 0) if deltas else 0
+
+
+def value(article, field):
+    return getattr(article, field) + pending(article.id, field)
+
+
+def flush():
+    global _last_flush
+    with _lock:
+        batch = {article_id: dict(deltas) for article_id, deltas in _pending.items()}
+        _pending.clear()
+        _last_flush = time.monotonic()
+        _cancel()
+    if not batch:
+        return
+    scores = {
+        article_id: {field[1]: delta for field, delta in deltas.items() if is_trending(field)}
+        for article_id, deltas in batch.items()
+    }
+    scores = {article_id: deltas for article_id, deltas in scores.items() if deltas}
+    try:
+        with transaction.atomic():
+            # fixed order so concurrent flushes lock rows in the same sequence
+            for article_id in sorted(batch):
+                deltas = batch[article_id]
+                updates = {field: F(field) + deltas[field] for field in COUNTER_FIELDS if deltas.get(field)}
+                if updates:
+                    Article.objects.filter(id=article_id).update(**updates)
+            if scores:
+                trending.apply(scores)
+    except Exception:
+        # put the deltas back so the next flush retries them
+        with _lock:
+            for article_id, deltas in batch.items():
+                for field, delta in deltas.items():
+                    _pending[article_id][field] += delta
+            _schedule()
+        raise
+
+
+def discard():
+    """Drop buffered deltas without writing them (e.g. after a recount)."""
+    global _last_flush
+    with _lock:
+        _pending.clear()
+        _last_flush = time.monotonic()
+        _cancel()
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        flush()
+    except Exception:
+        logger.exception('Counter flush at exit failed, the deltas are lost')
+
+
+def recount(queryset=None):
+    """Recompute stored counters from the Favorite and Comment tables."""
+    queryset = Article.objects.all() if queryset is None else queryset
+    annotated = queryset.annotate(
+        favorites_total=Count('favorites', distinct=True),
+        comments_total=Count('comments', distinct=True),
+    ).values_list('id', 'favorites_total', 'comments_total')
+    with transaction.atomic():
+        for article_id, favorites_total, comments_total in annotated.iterator(chunk_size=1000):
+            Article.objects.filter(id=article_id).update(
+                favorites_count=favorites_total, comments_count=comments_total
+            )
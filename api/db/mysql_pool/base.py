@@ -0,0 +1,72 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.mysql import base
+from api.db.pool import ConnectionPool, PoolTimeout, get_pool, pools
+
+# MySQL backend with a connection pool: ENGINE 'api.db.mysql_pool'.
+# Settings go in DATABASES[alias]['POOL']: MIN_SIZE, MAX_SIZE, MAX_LIFETIME
+# (seconds), TIMEOUT (seconds to wait for a free connection) and CHECK_AFTER
+# (seconds idle before checkout pings the connection). Django still "closes"
+# its connection at the end of every request (CONN_MAX_AGE must stay 0, also
+# under ASGI where persistent connections leak); close returns it to the pool.
+
+
+class PoolExhausted(PoolTimeout, base.Database.OperationalError):
+    pass
+
+
+def create_pool(settings_dict, connect):
+    options = settings_dict.get('POOL') or {}
+    return ConnectionPool(
+        connect,
+        min_size=options.get('MIN_SIZE', 0),
+        max_size=options.get('MAX_SIZE', 10),
+        max_lifetime=options.get('MAX_LIFETIME', 60 * 30),
+        timeout=options.get('TIMEOUT', 5),
+        check=lambda connection: connection.ping(),
+        check_after=options.get('CHECK_AFTER', 0),
+    )
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, settings_dict, alias=base.DEFAULT_DB_ALIAS):
+        super().__init__(settings_dict, alias)
+        if settings_dict.get('CONN_MAX_AGE'):
+            raise ImproperlyConfigured('Pooled connections replace persistent ones, set CONN_MAX_AGE to 0.')
+
+    def open_raw(self, conn_params):
+        connection = base.Database.connect(**conn_params)
+        if connection.encoders.get(bytes) is bytes:
+            connection.encoders.pop(bytes)  # as in the stock backend
+        return connection
+
+    def get_new_connection(self, conn_params):
+        # keyed by database too: test setup connects to the server without one
+        self.pool_key = (self.alias, conn_params.get('database'))
+        pool = get_pool(self.pool_key, lambda: create_pool(self.settings_dict, lambda: self.open_raw(conn_params)))
+        if pool.min_size and pool.size < pool.min_size:
+            pool.fill()
+        try:
+            return pool.checkout()
+        except PoolTimeout as error:
+            raise PoolExhausted(str(error)) from None
+
+    def init_connection_state(self):
+        # session settings survive in the pool, apply them once per raw connection
+        if getattr(self.connection, 'pool_initialized', False):
+            return
+        super().init_connection_state()
+        self.connection.pool_initialized = True
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = pools.get(getattr(self, 'pool_key', None))
+        if pool is None:
+            return super()._close()
+        discard = self.errors_occurred or self.in_atomic_block
+        if not discard and not self.get_autocommit():
+            try:
+                self.connection.rollback()  # never hand out a connection in the middle of a transaction
+            except base.Database.Error:
+                discard = True
+        pool.checkin(self.connection, discard=discard)
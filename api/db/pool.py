@@ -0,0 +1,178 @@
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Process-wide pool of DB-API connections.
+# Django opens a connection per request and per thread and closes it at the end
+# of the request; a pooled backend hands it one of these instead and gets it
+# back on close, so the TCP/auth/handshake cost is paid once per connection
+# lifetime rather than once per request. The pool is guarded by a Condition, so
+# WSGI worker threads and the thread executors ASGI runs sync ORM code in can
+# share it. Connections are used by one thread at a time.
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, connect, min_size=0, max_size=10, max_lifetime=None, timeout=5,
+                 check=None, check_after=0, close=None):
+        """
+        `connect()` opens a raw connection; `check(connection)` raises or returns
+        False for a dead one and runs on checkout when it sat idle at least
+        `check_after` seconds; connections older than `max_lifetime` seconds are
+        replaced; checkout() waits up to `timeout` seconds when `max_size` are in use.
+        """
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.check = check
+        self.check_after = check_after
+        self.close_connection = close or (lambda connection: connection.close())
+        self.condition = threading.Condition()
+        self.idle = deque()  # (connection, opened at, returned at)
+        self.opened_at = {}  # id(connection) -> opened at, for checked out connections
+        self.size = 0
+        self.counters = {'checkouts': 0, 'opened': 0, 'discarded': 0, 'waits': 0, 'timeouts': 0, 'wait_time': 0.0}
+        self.max_wait = 0.0
+
+    def open(self):
+        try:
+            connection = self.connect()
+        except Exception:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.counters['opened'] += 1
+        return connection, time.monotonic()
+
+    def fill(self):
+        """Open connections until `min_size` exist."""
+        while True:
+            with self.condition:
+                if self.size >= self.min_size:
+                    return
+                self.size += 1
+            connection, opened_at = self.open()
+            with self.condition:
+                self.idle.append((connection, opened_at, opened_at))
+                self.condition.notify()
+
+    def expired(self, opened_at, now):
+        return self.max_lifetime is not None and now - opened_at > self.max_lifetime
+
+    def usable(self, connection, returned_at, now):
+        if self.check is None or now - returned_at < self.check_after:
+            return True
+        try:
+            return self.check(connection) is not False
+        except Exception:
+            return False
+
+    def discard(self, connection):
+        with self.condition:
+            self.size -= 1
+            self.counters['discarded'] += 1
+            self.condition.notify()
+        try:
+            self.close_connection(connection)
+        except Exception:
+            pass
+
+    def checkout(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        while True:
+            with self.condition:
+                while not self.idle and self.size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.counters['timeouts'] += 1
+                        raise PoolTimeout(f'No connection available within {self.timeout}s ({self.max_size} in use).')
+                    waited = True
+                    self.condition.wait(remaining)
+                if self.idle:
+                    connection, opened_at, returned_at = self.idle.pop()  # most recent first, the rest can age out
+                else:
+                    self.size += 1
+                    connection = None
+            if connection is None:
+                connection, opened_at = self.open()
+            else:
+                now = time.monotonic()
+                if self.expired(opened_at, now) or not self.usable(connection, returned_at, now):
+                    self.discard(connection)
+                    continue
+            break
+        wait = time.monotonic() - started
+        with self.condition:
+            self.opened_at[id(connection)] = opened_at
+            self.counters['checkouts'] += 1
+            if waited:
+                self.counters['waits'] += 1
+                self.counters['wait_time'] += wait
+                self.max_wait = max(self.max_wait, wait)
+        if waited:
+            logger.warning('Waited %.3fs for a database connection (pool of %d saturated).', wait, self.max_size)
+        return connection
+
+    def checkin(self, connection, discard=False):
+        with self.condition:
+            opened_at = self.opened_at.pop(id(connection), None)
+        if opened_at is None:
+            return self.close_connection(connection)  # not ours (pool was reset)
+        if discard or self.expired(opened_at, time.monotonic()):
+            return self.discard(connection)
+        with self.condition:
+            self.idle.append((connection, opened_at, time.monotonic()))
+            self.condition.notify()
+
+    def stats(self):
+        with self.condition:
+            in_use = self.size - len(self.idle)
+            return {
+                **self.counters,
+                'size': self.size,
+                'idle': len(self.idle),
+                'in_use': in_use,
+                'max_size': self.max_size,
+                'saturation': in_use / self.max_size if self.max_size else 0.0,
+                'max_wait': self.max_wait,
+            }
+
+    def close_all(self):
+        with self.condition:
+            idle, self.idle = list(self.idle), deque()
+            self.size -= len(idle)
+        for connection, _, _ in idle:
+            try:
+                self.close_connection(connection)
+            except Exception:
+                pass
+
+
+# every pool of this process by (alias, database), for stats and shutdown
+pools = {}
+pools_lock = threading.Lock()
+
+
+def get_pool(key, create):
+    with pools_lock:
+        pool = pools.get(key)
+        if pool is None:
+            pool = pools[key] = create()
+    return pool
+
+
+def pool_stats():
+    with pools_lock:
+        return {f'{alias}/{database}': pool.stats() for (alias, database), pool in pools.items()}
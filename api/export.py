@@ -0,0 +1,142 @@
+import csv
+import json
+from io import StringIO
+from django.conf import settings
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.xmlutils import SimplerXMLGenerator
+from .rows import ArticleRowSerializer, CommentRowSerializer
+
+# Streaming exports (JSONL, CSV) and RSS/Atom feeds.
+# Rows are read in keyset chunks (`id > last id ORDER BY id LIMIT n`) rather
+# than with one big cursor: MySQLdb buffers a whole result set client side even
+# under iterator(), while a keyset chunk is bounded on every backend. Each chunk
+# is serialized by the values() row serializers from api/rows.py, which batch
+# their tag lookup per chunk, and written out before the next one is read, so
+# memory stays flat regardless of how many rows are exported.
+
+ARTICLE_FIELDS = [field for field in ArticleRowSerializer.columns if field != 'favorited']
+COMMENT_FIELDS = list(CommentRowSerializer.columns)
+
+
+def chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 1000)
+
+
+def scan(queryset, size=None):
+    """Yield lists of values() rows in id order, one keyset query per chunk."""
+    size = size or chunk_size()
+    queryset = queryset.order_by('id')
+    last_id = None
+    while True:
+        rows = list((queryset if last_id is None else queryset.filter(id__gt=last_id))[:size])
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1]['id']
+
+
+def records(row_serializer, queryset, fields, size=None):
+    """Yield serialized chunks (lists of dicts) for `queryset`."""
+    for rows in scan(row_serializer.values(queryset, fields), size):
+        yield row_serializer.serialize(rows, None, fields)
+
+
+def article_records(queryset, size=None):
+    return records(ArticleRowSerializer(), queryset, ARTICLE_FIELDS, size)
+
+
+def comment_records(queryset, size=None):
+    return records(CommentRowSerializer(), queryset, COMMENT_FIELDS, size)
+
+
+def jsonl(chunks):
+    for chunk in chunks:
+        yield ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in chunk)
+
+
+def csv_value(value):
+    if isinstance(value, dict):
+        return value.get('username')  # nested author
+    if isinstance(value, list):
+        return '|'.join(value)  # tag names
+    return value
+
+
+def csv_rows(fields, chunks):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for chunk in chunks:
+        writer.writerows([csv_value(record[field]) for field in fields] for record in chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()  # header only, when nothing was exported
+
+
+FORMATS = {
+    'jsonl': ('application/x-ndjson; charset=utf-8', lambda fields, chunks: jsonl(chunks)),
+    'csv': ('text/csv; charset=utf-8', csv_rows),
+}
+
+
+class StreamingFeedMixin:
+    """Renders a syndication feed piece by piece instead of from a complete item list."""
+
+    def stream(self, items):
+        # write the empty document once to get everything around the items
+        buffer = StringIO()
+        offsets = []
+        write_items = self.write_items
+        self.write_items = lambda handler: offsets.append(buffer.tell())
+        try:
+            self.write(buffer, 'utf-8')
+        finally:
+            del self.write_items
+        document = buffer.getvalue()
+        yield document[:offsets[0]]
+        for item in items:
+            self.items = []
+            self.add_item(**item)
+            buffer = StringIO()
+            write_items(SimplerXMLGenerator(buffer, 'utf-8', short_empty_elements=True))
+            yield buffer.getvalue()
+        yield document[offsets[0]:]
+
+
+class StreamingRssFeed(StreamingFeedMixin, Rss201rev2Feed):
+    pass
+
+
+class StreamingAtomFeed(StreamingFeedMixin, Atom1Feed):
+    pass
+
+
+FEED_TYPES = {'rss': StreamingRssFeed, 'atom': StreamingAtomFeed}
+
+
+def feed_items(queryset, link_for, size=None):
+    """add_item() kwargs for the newest EXPORT_FEED_ITEMS articles of `queryset`."""
+    row_serializer = ArticleRowSerializer()
+    fields = ['id', 'title', 'description', 'tag', 'author', 'created_at', 'updated_at']
+    ids = list(
+        queryset.order_by('-created_at', '-id').values_list('id', flat=True)[:getattr(settings, 'EXPORT_FEED_ITEMS', 50)]
+    )
+    size = size or chunk_size()
+    for start in range(0, len(ids), size):
+        chunk = ids[start:start + size]
+        rows = {row['id']: row for row in row_serializer.values(queryset.filter(id__in=chunk), fields)}
+        tags = row_serializer.tag_names(chunk)
+        for article_id in chunk:
+            row = rows[article_id]
+            link = link_for(article_id)
+            yield {
+                'title': row['title'],
+                'link': link,
+                'description': row['description'],
+                'unique_id': link,
+                'author_name': row['author__username'],
+                'pubdate': row['created_at'],
+                'updateddate': row['updated_at'],
+                'categories': tags.get(article_id, []),
+            }
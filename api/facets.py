@@ -0,0 +1,125 @@
+import itertools
+import zlib
+from array import array
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from . import cache as cache_namespaces
+from . import tags
+from .models import Article, Tag
+
+# Multi-tag filtering and facet counts (?tags=a,b,c on /articles/).
+# Every tag has a posting list: the sorted ids of its articles, delta-encoded
+# and zlib-compressed in the shared cache (a few bits per article for dense
+# tags). A request loads the lists of its tags in one cache round trip and
+# intersects (tags_mode=all) or unions (tags_mode=any) them in memory, so the
+# page query gets `id IN (...)` instead of one join per tag. Facets are the
+# matching articles per co-occurring tag, counted the same way against the
+# lists of the TAG_FACET_CANDIDATES most popular tags (api/tags.py).
+# A list is rebuilt from the tag links (one index range) on the first read
+# after its tag gained or lost articles: the m2m signals, article deletion and
+# bulk ingestion drop it once their transaction commits. Lists also expire
+# after TAG_POSTINGS_CACHE_TIMEOUT, which bounds how long a rebuild racing a
+# write can miss an article. Results larger than TAG_FILTER_MAX_IDS go back to
+# one grouped semi-join rather than an unbounded IN list.
+
+ALL, ANY = 'all', 'any'
+through = Article.tag.through
+
+
+def encode(article_ids):
+    previous = itertools.chain((0,), article_ids)
+    deltas = array('q', (article_id - before for before, article_id in zip(previous, article_ids)))
+    return zlib.compress(deltas.tobytes())
+
+
+def decode(data):
+    deltas = array('q')
+    deltas.frombytes(zlib.decompress(data))
+    return list(itertools.accumulate(deltas))
+
+
+def load(tag_ids):
+    """{tag_id: sorted article ids}, from the cache or rebuilt from the tag links."""
+    found = cache_namespaces.postings.get_many(tag_ids)
+    postings = {tag_id: decode(data) for tag_id, data in found.items()}
+    missing = [tag_id for tag_id in tag_ids if tag_id not in found]
+    if missing:
+        built = {tag_id: [] for tag_id in missing}
+        links = through.objects.filter(tag_id__in=missing).order_by('tag_id', 'article_id')
+        for tag_id, article_id in links.values_list('tag_id', 'article_id'):
+            built[tag_id].append(article_id)
+        cache_namespaces.postings.set_many(
+            {tag_id: encode(article_ids) for tag_id, article_ids in built.items()},
+            getattr(settings, 'TAG_POSTINGS_CACHE_TIMEOUT', 60 * 60),
+        )
+        postings.update(built)
+    return postings
+
+
+def invalidate(tag_ids):
+    """Drop the lists of tags whose articles changed, once the change is visible to rebuilds."""
+    tag_ids = list(tag_ids)
+    if tag_ids:
+        transaction.on_commit(lambda: cache_namespaces.postings.delete_many(tag_ids))
+
+
+def invalidate_all():
+    cache_namespaces.postings.invalidate()
+
+
+def match(postings, mode):
+    """Ids of the articles carrying every (ALL) or any (ANY) of the lists' tags."""
+    lists = sorted(postings, key=len)
+    if mode == ANY:
+        return set().union(*lists)
+    if not lists:
+        return set()
+    matched = set(lists[0])
+    for article_ids in lists[1:]:
+        if not matched:
+            break
+        matched.intersection_update(article_ids)
+    return matched
+
+
+class TagFilter:
+    """The ?tags= selection of one request: its matching articles and, on demand, their facets."""
+
+    def __init__(self, names, mode=ALL):
+        self.names = list(dict.fromkeys(names))
+        self.mode = mode
+        # the facet candidates' ids come with the selected ones, in the same query
+        self.candidates = [
+            name for name in tags.get_tag_list()['tags'][:getattr(settings, 'TAG_FACET_CANDIDATES', 30)]
+            if name not in self.names
+        ]
+        ids = dict(Tag.objects.filter(name__in=self.names + self.candidates).values_list('name', 'id'))
+        self.candidate_ids = {name: ids[name] for name in self.candidates if name in ids}
+        self.tag_ids = [ids[name] for name in self.names if name in ids]
+        if mode == ALL and len(self.tag_ids) < len(self.names):
+            self.article_ids = set()  # an unknown tag matches nothing
+        else:
+            self.article_ids = match(load(self.tag_ids).values(), mode)
+
+    def filter(self, queryset):
+        if not self.article_ids:
+            return queryset.none()
+        if len(self.article_ids) <= getattr(settings, 'TAG_FILTER_MAX_IDS', 5000):
+            return queryset.filter(id__in=self.article_ids)
+        links = through.objects.filter(tag_id__in=self.tag_ids)
+        if self.mode == ALL:
+            links = links.values('article_id').annotate(matched=Count('tag_id')).filter(matched=len(self.tag_ids))
+        return queryset.filter(id__in=links.values('article_id'))
+
+    def facets(self):
+        """[{'name', 'articlesCount'}] of popular tags among the matching articles, most frequent first."""
+        if not self.article_ids:
+            return []
+        postings = load(list(self.candidate_ids.values()))
+        counts = {
+            name: len(self.article_ids.intersection(postings[tag_id])) for name, tag_id in self.candidate_ids.items()
+        }
+        ranked = sorted((name for name, count in counts.items() if count), key=lambda name: (-counts[name], name))
+        ranked = ranked[:getattr(settings, 'TAG_FACET_COUNT', 10)]
+        return [{'name': name, 'articlesCount': counts[name]} for name in ranked]
@@ -0,0 +1,285 @@
+import hashlib
+import random
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import urlencode
+from django.db.models import Count, F
+from .models import Article, Follow, FeedEntry
+
+# Materialized home feed (fan-out-on-write).
+# Every reader owns a capped timeline of FeedEntry rows. Publishing pushes the
+# article into each follower's timeline, so reading the feed is a range scan on
+# (user, created_at) no matter how many authors the reader follows. Authors with
+# more than FEED_FANOUT_LIMIT followers are not fanned out; their articles are
+# read with a second range scan on (author, created_at) and merged page by page
+# (KeysetPagination.paginate_merged). Timelines are trimmed back to
+# FEED_MAX_LENGTH once past FEED_TRIM_SLACK extra entries; a publish checks
+# about one follower in FEED_TRIM_SLACK + 1, so a timeline overshoots by about
+# the slack and the check never counts every follower's timeline.
+
+CELEBRITY_CACHE_KEY = 'feed:celebrity_ids'
+GENERATION_SEQ_KEY = 'feed:gen:seq'
+
+
+def feed_max_length():
+    return getattr(settings, 'FEED_MAX_LENGTH', 800)
+
+
+def fanout_limit():
+    return getattr(settings, 'FEED_FANOUT_LIMIT', 10000)
+
+
+def celebrity_ids():
+    """Ids of authors followed by more than FEED_FANOUT_LIMIT users (cached)."""
+    ids = cache.get(CELEBRITY_CACHE_KEY)
+    if ids is None:
+        ids = set(
+            Follow.objects.values('following')
+            .annotate(followers=Count('id'))
+            .filter(followers__gt=fanout_limit())
+            .values_list('following', flat=True)
+        )
+        cache.set(CELEBRITY_CACHE_KEY, ids, getattr(settings, 'FEED_CELEBRITY_CACHE_TIMEOUT', 60 * 10))
+    return ids
+
+
+def trim_slack():
+    return getattr(settings, 'FEED_TRIM_SLACK', feed_max_length() // 10)
+
+
+def trim_timelines(user_ids):
+    """Cut timelines back to FEED_MAX_LENGTH once they grow past the trim slack."""
+    max_length = feed_max_length()
+    oversized = (
+        FeedEntry.objects.filter(user_id__in=user_ids)
+        .values('user_id')
+        .annotate(entries=Count('id'))
+        .filter(entries__gt=max_length + trim_slack())
+        .values_list('user_id', flat=True)
+    )
+    for user_id in oversized:
+        cutoff = (
+            FeedEntry.objects.filter(user_id=user_id)
+            .order_by('-created_at', '-article_id')
+            .values_list('created_at', flat=True)[max_length - 1]
+        )
+        FeedEntry.objects.filter(user_id=user_id, created_at__lt=cutoff).delete()
+
+
+def push_article(article):
+    """Fan a freshly created article out to its author's followers."""
+    push_articles([article])
+
+
+def push_articles(articles):
+    """Fan freshly created articles out with one follower query and one trim pass."""
+    celebrities = celebrity_ids()
+    articles = [article for article in articles if article.author_id not in celebrities]
+    if not articles:
+        return
+    followers = {}
+    follows = Follow.objects.filter(following_id__in={article.author_id for article in articles})
+    for follower_id, author_id in follows.values_list('follower_id', 'following_id'):
+        followers.setdefault(author_id, []).append(follower_id)
+    entries = [
+        FeedEntry(user_id=follower_id, article_id=article.id,
+                  author_id=article.author_id, created_at=article.created_at)
+        for article in articles
+        for follower_id in followers.get(article.author_id, ())
+    ]
+    if not entries:
+        return
+    FeedEntry.objects.bulk_create(entries, batch_size=1000, ignore_conflicts=True)
+    # each push grows a timeline by one, so checking a 1/(slack + 1) sample keeps it near the cap
+    slack = trim_slack()
+    trim_timelines({entry.user_id for entry in entries if not random.randrange(slack + 1)})
+
+
+def backfill(follower, author):
+    """Copy the author's recent articles into a new follower's timeline."""
+    backfill_authors(follower.id, [author.id])
+
+
+def backfill_authors(follower_id, author_ids):
+    """Copy several newly followed authors' recent articles into the timeline in one pass."""
+    celebrities = celebrity_ids()
+    author_ids = [author_id for author_id in author_ids if author_id not in celebrities]
+    if not author_ids:
+        return
+    # the timeline keeps FEED_MAX_LENGTH entries, so the newest that many across all of them is enough
+    recent = (
+        Article.objects.filter(author_id__in=author_ids)
+        .order_by('-created_at')
+        .values_list('id', 'author_id', 'created_at')[:feed_max_length()]
+    )
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=follower_id, article_id=article_id,
+                      author_id=author_id, created_at=created_at)
+            for article_id, author_id, created_at in recent
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    trim_timelines([follower_id])
+
+
+def prune_authors(follower_id, author_ids):
+    """Drop unfollowed authors' articles from the follower's timeline."""
+    FeedEntry.objects.filter(user_id=follower_id, author_id__in=author_ids).delete()
+
+
+async def acelebrity_ids():
+    ids = await cache.aget(CELEBRITY_CACHE_KEY)
+    if ids is None:
+        ids = await sync_to_async(celebrity_ids)()
+    return ids
+
+
+def followed_celebrities(user):
+    """Ids of the high-follower authors this user follows (merged at read time)."""
+    celebrities = celebrity_ids()
+    if not celebrities:
+        return []
+    return list(
+        Follow.objects.filter(follower=user, following_id__in=celebrities)
+        .values_list('following_id', flat=True)
+    )
+
+
+async def afollowed_celebrities(user):
+    celebrities = await acelebrity_ids()
+    if not celebrities:
+        return []
+    return [
+        author_id async for author_id in
+        Follow.objects.filter(follower=user, following_id__in=celebrities).values_list('following_id', flat=True)
+    ]
+
+
+def feed_queryset(user):
+    """The user's timeline as articles, ordered and paged on FeedEntry.created_at."""
+    return Article.objects.filter(feed_entries__user_id=user.id).annotate(feed_created_at=F('feed_entries__created_at'))
+
+
+def feed_querysets(user, celebrity_authors=None):
+    """The timeline and, if they follow any, the celebrities' articles: range scans merged per page."""
+    if celebrity_authors is None:
+        celebrity_authors = followed_celebrities(user)
+    if not celebrity_authors:
+        return [feed_queryset(user)]
+    return [
+        # entries pushed before an author crossed the fan-out limit come from the second scan
+        feed_queryset(user).exclude(author_id__in=celebrity_authors),
+        Article.objects.filter(author_id__in=celebrity_authors).annotate(feed_created_at=F('created_at')),
+    ]
+
+
+def rebuild(user):
+    """Recompute a user's timeline from scratch out of their follow graph."""
+    FeedEntry.objects.filter(user=user).delete()
+    celebrities = celebrity_ids()
+    authors = Follow.objects.filter(follower=user).exclude(following_id__in=celebrities)
+    recent = (
+        Article.objects.filter(author_id__in=authors.values('following_id'))
+        .order_by('-created_at', '-id')
+        .values_list('id', 'author_id', 'created_at')[:feed_max_length()]
+    )
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user.id, article_id=article_id,
+                      author_id=author_id, created_at=created_at)
+            for article_id, author_id, created_at in recent
+        ],
+        batch_size=1000,
+    )
+
+
+# Feed response cache.
+# Cached pages are keyed on the reader, the query string (cursor/offset/filters)
+# and generation tokens: one per reader, bumped when their timeline or follow
+# set changes, and one per followed celebrity, bumped when that author's
+# articles change. Bumping a token orphans every page built from the old one.
+# Article edits, tag changes and author profile edits bump the tokens of the
+# authors' readers (invalidate_authors). Favorite and comment counts do not:
+# they are flushed in batches (api/counters.py), so a cached page may show
+# counts up to FEED_CACHE_TIMEOUT old.
+
+def user_generation_key(user_id):
+    return f'feed:gen:user:{user_id}'
+
+
+def author_generation_key(author_id):
+    return f'feed:gen:author:{author_id}'
+
+
+def next_generation():
+    try:
+        return cache.incr(GENERATION_SEQ_KEY)
+    except ValueError:
+        # seeded from the clock so an evicted counter never hands out old tokens again
+        cache.add(GENERATION_SEQ_KEY, time.time_ns(), None)
+        return cache.incr(GENERATION_SEQ_KEY)
+
+
+def bump_user_generations(user_ids):
+    if user_ids:
+        generation = next_generation()
+        cache.set_many({user_generation_key(user_id): generation for user_id in user_ids}, None)
+
+
+def invalidate_author(author_id):
+    """Expire cached feed pages of everyone who sees this author's articles."""
+    invalidate_authors([author_id])
+
+
+def invalidate_authors(author_ids):
+    """invalidate_author() for several authors, with one follower query."""
+    author_ids = set(author_ids)
+    celebrities = author_ids & celebrity_ids()
+    if celebrities:
+        generation = next_generation()
+        cache.set_many({author_generation_key(author_id): generation for author_id in celebrities}, None)
+    others = author_ids - celebrities
+    if others:
+        bump_user_generations(list(
+            Follow.objects.filter(following_id__in=others).values_list('follower_id', flat=True).distinct()
+        ))
+
+
+def generations(keys):
+    tokens = cache.get_many(keys)
+    for key in keys:
+        if key not in tokens:
+            cache.add(key, next_generation(), None)
+            tokens[key] = cache.get(key)
+    return [tokens[key] for key in keys]
+
+
+def generation_keys(user_id, celebrity_authors):
+    keys = [user_generation_key(user_id)]
+    return keys + [author_generation_key(author_id) for author_id in sorted(celebrity_authors)]
+
+
+def page_cache_key(request, tokens):
+    params = urlencode(sorted(request.query_params.lists()), doseq=True)
+    fingerprint = hashlib.md5(
+        f'{request.version}|{params}|{tokens}'.encode('utf-8')
+    ).hexdigest()
+    return f'feed:page:{request.user.id}:{fingerprint}'
+
+
+def response_cache_key(request, celebrity_authors):
+    return page_cache_key(request, generations(generation_keys(request.user.id, celebrity_authors)))
+
+
+async def aresponse_cache_key(request, celebrity_authors):
+    keys = generation_keys(request.user.id, celebrity_authors)
+    tokens = await cache.aget_many(keys)
+    if len(tokens) < len(keys):
+        tokens = await sync_to_async(generations)(keys)  # seeds the missing ones
+    else:
+        tokens = [tokens[key] for key in keys]
+    return page_cache_key(request, tokens)
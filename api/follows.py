@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BooleanField, Exists, OuterRef, Value
+from . import feed, profiles
+from .models import Follow, User
+
+# Batched follow relationships (/follows/).
+# POST and DELETE follow or unfollow up to FOLLOW_BATCH_MAX usernames in one
+# transaction: one query resolves the usernames together with the follows that
+# already exist, then one bulk_create(ignore_conflicts=True) or one DELETE, and
+# one timeline backfill or prune covers every author; the profile stats of
+# everyone involved are recounted in one statement. GET answers "do I follow
+# them, do they follow me" for a list of users in a single query.
+
+
+def max_batch():
+    return getattr(settings, 'FOLLOW_BATCH_MAX', 100)
+
+
+def viewer_follows(viewer, outer='pk'):
+    """Annotation: does `viewer` follow the User row at `outer`? False for anonymous viewers."""
+    if viewer is None or not viewer.is_authenticated:
+        return Value(False, output_field=BooleanField())
+    return Exists(Follow.objects.filter(follower_id=viewer.id, following_id=OuterRef(outer)))
+
+
+def targets(user, usernames):
+    """{username: (id, already followed)} of the usernames that exist."""
+    rows = (
+        User.objects.filter(username__in=usernames)
+        .annotate(followed=viewer_follows(user))
+        .values_list('username', 'id', 'followed')
+    )
+    return {username: (user_id, followed) for username, user_id, followed in rows}
+
+
+def follow(user, usernames):
+    found = targets(user, usernames)
+    result = {'followed': [], 'already_following': [], 'not_found': [], 'invalid': []}
+    new = []
+    for username in usernames:
+        if username not in found:
+            result['not_found'].append(username)
+        elif found[username][0] == user.id:
+            result['invalid'].append(username)  # yourself
+        elif found[username][1]:
+            result['already_following'].append(username)
+        else:
+            result['followed'].append(username)
+            new.append(found[username][0])
+    if new:
+        with transaction.atomic():
+            # a concurrent follow of the same user is skipped rather than failing the batch
+            Follow.objects.bulk_create([Follow(follower_id=user.id, following_id=user_id) for user_id in new],
+                                       ignore_conflicts=True)
+            profiles.refresh([user.id, *new])  # counted, not incremented: the batch may have lost races
+            feed.backfill_authors(user.id, new)
+        feed.bump_user_generations([user.id])  # bulk_create skips invalidate_follower_feed
+    return result
+
+
+def unfollow(user, usernames):
+    found = targets(user, usernames)
+    result = {'unfollowed': [], 'not_following': [], 'not_found': []}
+    gone = []
+    for username in usernames:
+        if username not in found:
+            result['not_found'].append(username)
+        elif found[username][1]:
+            result['unfollowed'].append(username)
+            gone.append(found[username][0])
+        else:
+            result['not_following'].append(username)
+    if gone:
+        with transaction.atomic(), profiles.deferred():
+            Follow.objects.filter(follower_id=user.id, following_id__in=gone).delete()
+            feed.prune_authors(user.id, gone)
+    return result
+
+
+def relationships(user, usernames):
+    """[{'username', 'following', 'followed_by'}] for the usernames that exist, in their order."""
+    rows = (
+        User.objects.filter(username__in=usernames)
+        .annotate(
+            is_following=viewer_follows(user),
+            is_followed_by=Exists(Follow.objects.filter(follower_id=OuterRef('pk'), following_id=user.id)),
+        )
+        .values_list('username', 'is_following', 'is_followed_by')
+    )
+    found = {username: (following, followed_by) for username, following, followed_by in rows}
+    return [
+        {'username': username, 'following': found[username][0], 'followed_by': found[username][1]}
+        for username in usernames if username in found
+    ]
@@ -0,0 +1,166 @@
+from collections import defaultdict
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from . import facets, feed, profiles, related, search, tags, trending
+from .models import Article, SearchPosting, Tag, User, first_free_slug, slug_base
+from .serializers import ArticleIngestSerializer
+
+# Bulk article ingestion (ingest_articles command, POST /articles/bulk/).
+# Items are validated a chunk at a time, then each chunk is written in one
+# transaction with a few bulk statements: missing tags, articles, tag links,
+# trending rows and search postings. bulk_create sends no signals, so the side
+# effects the Article signals would run per row (feed fan-out, feed
+# invalidation, tag list refresh, tag posting lists, related-article lists,
+# author article counts) run once per chunk instead. Every item gets a result, aligned with the
+# input: {'id', 'slug'} when created, {'errors'} otherwise.
+
+DUPLICATE_SLUG = 'You already have an article with this slug.'
+
+
+def chunk_size():
+    return getattr(settings, 'ARTICLE_INGEST_CHUNK_SIZE', 500)
+
+
+def ingest(items, author=None):
+    """Ingest a list of article dicts chunk by chunk; returns one result per item."""
+    results = []
+    size = chunk_size()
+    for start in range(0, len(items), size):
+        results += ingest_chunk(items[start:start + size], author)
+    return results
+
+
+def resolve_authors(valid, results, author):
+    if author is not None:
+        return [(position, author.id, data) for position, data in valid]
+    usernames = {data['author'] for _, data in valid if 'author' in data}
+    author_ids = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+    resolved = []
+    for position, data in valid:
+        if 'author' not in data:
+            results[position] = {'errors': {'author': ['This field is required.']}}
+        elif data['author'] not in author_ids:
+            results[position] = {'errors': {'author': ['Unknown user.']}}
+        else:
+            resolved.append((position, author_ids[data['author']], data))
+    return resolved
+
+
+def assign_slugs(rows, results):
+    """Give every row a slug that is free for its author, or reject a taken explicit one."""
+    wanted = {(author_id, data.get('slug') or slug_base(data['title'])) for _, author_id, data in rows}
+    taken = defaultdict(set)
+    existing = (
+        Article.objects.filter(author_id__in={author_id for author_id, _ in wanted},
+                               slug__in={slug for _, slug in wanted})
+        .values_list('author_id', 'slug')
+    )
+    for author_id, slug in existing:
+        taken[author_id].add(slug)
+    # explicit slugs first, so a generated one never takes a slug asked for later in the chunk
+    slugged = []
+    for position, author_id, data in rows:
+        slug = data.get('slug')
+        if slug:
+            if slug in taken[author_id]:
+                results[position] = {'errors': {'slug': [DUPLICATE_SLUG]}}
+                continue
+            taken[author_id].add(slug)
+            slugged.append((position, author_id, data, slug))
+    searched = set()
+    for position, author_id, data in rows:
+        if data.get('slug'):
+            continue
+        base = slug_base(data['title'])
+        if base in taken[author_id] and (author_id, base) not in searched:
+            # the base is used, load its -2, -3, ... variants (rare, one query per base)
+            searched.add((author_id, base))
+            taken[author_id].update(
+                Article.objects.filter(author_id=author_id, slug__startswith=base).values_list('slug', flat=True)
+            )
+        slug = first_free_slug(base, taken[author_id])
+        taken[author_id].add(slug)
+        slugged.append((position, author_id, data, slug))
+    return sorted(slugged, key=lambda row: row[0])
+
+
+def tag_ids(names):
+    ids = dict(Tag.objects.filter(name__in=names).values_list('name', 'id'))
+    missing = [name for name in names if name not in ids]
+    if missing:
+        Tag.objects.bulk_create([Tag(name=name) for name in missing], ignore_conflicts=True)
+        ids.update(Tag.objects.filter(name__in=missing).values_list('name', 'id'))
+    return ids
+
+
+def write(rows):
+    names = sorted({name for *_, data, _ in rows for name in data['tag']})
+    ids = tag_ids(names) if names else {}
+    articles = [
+        Article(author_id=author_id, slug=slug, title=data['title'],
+                description=data['description'], body=data['body'])
+        for _, author_id, data, slug in rows
+    ]
+    Article.objects.bulk_create(articles, batch_size=500)
+    if any(article.pk is None for article in articles):
+        # backends that can't return ids from a bulk insert (MySQL); (author, slug) is unique
+        created = dict(
+            ((author_id, slug), pk) for author_id, slug, pk in
+            Article.objects.filter(author_id__in={article.author_id for article in articles},
+                                   slug__in={article.slug for article in articles})
+            .values_list('author_id', 'slug', 'id')
+        )
+        for article in articles:
+            article.pk = created[(article.author_id, article.slug)]
+
+    Article.tag.through.objects.bulk_create(
+        [
+            Article.tag.through(article_id=article.pk, tag_id=ids[name])
+            for article, (*_, data, _) in zip(articles, rows)
+            for name in data['tag']
+        ],
+        batch_size=1000,
+    )
+    facets.invalidate(ids.values())
+    profiles.refresh({article.author_id for article in articles})
+    trending.create_scores({
+        article.pk: [ids[name] for name in data['tag']] for article, (*_, data, _) in zip(articles, rows)
+    })
+    search_postings = []
+    for article, (*_, data, _) in zip(articles, rows):
+        search_postings += search.postings_for(article, data['tag'])
+    SearchPosting.objects.bulk_create(search_postings, batch_size=1000)
+    feed.push_articles(articles)
+    return articles
+
+
+def ingest_chunk(items, author=None):
+    """Validate and insert one chunk; `author` defaults to each item's `author` username."""
+    results = [None] * len(items)
+    valid = []
+    for position, item in enumerate(items):
+        serializer = ArticleIngestSerializer(data=item)
+        if serializer.is_valid():
+            valid.append((position, serializer.validated_data))
+        else:
+            results[position] = {'errors': serializer.errors}
+
+    rows = resolve_authors(valid, results, author)
+    if rows:
+        try:
+            with transaction.atomic():
+                rows = assign_slugs(rows, results)
+                articles = write(rows)
+        except IntegrityError:
+            # a concurrent writer took a slug between the check and the insert
+            for position, *_ in rows:
+                results[position] = {'errors': {'non_field_errors': ['Conflicting write, retry the item.']}}
+            return results
+        for (position, *_), article in zip(rows, articles):
+            results[position] = {'id': article.pk, 'slug': article.slug}
+        for author_id in {article.author_id for article in articles}:
+            feed.invalidate_author(author_id)
+        if any(data['tag'] for *_, data, _ in rows):
+            transaction.on_commit(tags.refresh_in_background)
+        related.refresh([article.pk for article, (*_, data, _) in zip(articles, rows) if data['tag']])
+    return results
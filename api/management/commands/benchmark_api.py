@@ -0,0 +1,257 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+from collections import namedtuple
+from unittest import mock
+from datetime import datetime, timezone
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
+from rest_framework.throttling import SimpleRateThrottle
+from api import counters, synthetic
+from api.authentication import refresh_token_for
+from api.models import Article, Tag, User
+
+METRICS_TOKEN = 'benchmark-metrics-token'  # set for the run, the metrics endpoint is off without one
+
+# One benchmarked request shape. `data` is a dict or a function of the iteration
+# number (for bodies that must differ per request); `write` scenarios run inside
+# a rolled-back transaction so the dataset is the same for every run.
+Scenario = namedtuple('Scenario', 'name url_name method path data user write headers',
+                      defaults=(None, None, False, None))
+
+
+def api_url_names():
+    names = set()
+    resolvers = [get_resolver('api.urls')]
+    while resolvers:
+        for pattern in resolvers.pop().url_patterns:
+            if isinstance(pattern, URLResolver):
+                resolvers.append(pattern)
+            elif pattern.name:
+                names.add(pattern.name)
+    return names
+
+
+def percentile(timings, fraction):
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive every endpoint of api/urls.py in-process against the current database (see generate_data) and '
+        'report p50/p95/p99 latency, queries per request and throughput, optionally as JSON and compared '
+        'with an earlier run. Requests run one at a time with throttling off.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Timed requests per endpoint.')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per endpoint first.')
+        parser.add_argument('--only', action='append', help='Scenario name to run (repeatable).')
+        parser.add_argument('--username', help='Authenticated user (default: whoever follows the most users).')
+        parser.add_argument('--password', default=synthetic.PASSWORD, help='Their password, for the login endpoint.')
+        parser.add_argument('--output', help='Write the results as JSON to this path.')
+        parser.add_argument('--compare', help='Earlier --output file to print the p50/p95 change against.')
+
+    def handle(self, *args, **options):
+        scenarios = self.scenarios(options)
+        uncovered = api_url_names() - {scenario.url_name for scenario in scenarios}
+        if options['only']:
+            scenarios = [scenario for scenario in scenarios if scenario.name in options['only']]
+        if uncovered:
+            self.stderr.write(f'No scenario for: {", ".join(sorted(uncovered))}')
+
+        # throttles would cut the runs short (views copy their classes and rates at
+        # import, so settings overrides don't reach them; a None rate lets everything through)
+        no_rates = {scope: None for scope in SimpleRateThrottle.THROTTLE_RATES}
+        results = {}
+        with override_settings(ALLOWED_HOSTS=['*'], METRICS_TOKEN=METRICS_TOKEN), \
+                mock.patch.dict(SimpleRateThrottle.THROTTLE_RATES, no_rates):
+            for scenario in scenarios:
+                results[scenario.name] = self.measure(scenario, options['requests'], options['warmup'])
+                self.report(scenario.name, results[scenario.name])
+
+        run = {
+            'meta': {
+                'commit': git_commit(),
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'requests': options['requests'],
+                'articles': Article.objects.count(),
+                'users': User.objects.count(),
+            },
+            'endpoints': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(run, output, indent=2)
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def scenarios(self, options):
+        if options['username']:
+            reader = User.objects.filter(username=options['username']).first()
+        else:
+            reader = User.objects.annotate(follows=Count('following_relations')).order_by('-follows', 'id').first()
+        article = Article.objects.order_by('-comments_count', '-favorites_count', 'id').first()
+        if reader is None or article is None:
+            raise CommandError('Needs at least one user and one article, see generate_data.')
+        comment = article.comments.order_by('id').first()
+        popular_tags = list(Tag.objects.annotate(used=Count('articles')).order_by('-used', 'id')[:2])
+        tag = popular_tags[0] if popular_tags else None
+        admin = User.objects.filter(is_staff=True).order_by('id').first()
+        author = article.author.username
+        others = list(User.objects.exclude(id=reader.id).order_by('id').values_list('username', flat=True)[:20])
+        word = article.title.split()[0] if article.title.split() else 'a'
+
+        scenarios = [
+            Scenario('api-root', 'api-root', 'get', reverse('api-root')),
+            Scenario('user-register', 'user-register', 'post', reverse('user-register'), lambda i: {
+                'username': f'bench-register-{i}', 'email': f'bench-register-{i}@example.com',
+                'password': 'Bench-pass-2024!',
+            }, write=True),
+            Scenario('user-login', 'user-login', 'post', reverse('user-login'),
+                     {'email': reader.email, 'password': options['password']}),
+            Scenario('user', 'user-detail-update', 'get', reverse('user-detail-update'), user=reader),
+            Scenario('tags', 'tag-list', 'get', reverse('tag-list')),
+            Scenario('articles', 'articles-list', 'get', reverse('articles-list'), user=reader),
+            Scenario('articles anonymous', 'articles-list', 'get', reverse('articles-list')),
+            Scenario('articles by tag', 'articles-list', 'get',
+                     f"{reverse('articles-list')}?tag={tag.name if tag else ''}", user=reader),
+            Scenario('articles by tags', 'articles-list', 'get',
+                     f"{reverse('articles-list')}?tags={','.join(tag.name for tag in popular_tags)}", user=reader),
+            Scenario('articles keyset', 'articles-list', 'get', f"{reverse('articles-list')}?cursor=", user=reader),
+            Scenario('article create', 'articles-list', 'post', reverse('articles-list'), {
+                'title': 'Benchmark article', 'description': 'd', 'body': 'b', 'tag': [tag.name] if tag else [],
+            }, user=reader, write=True),
+            Scenario('article', 'articles-detail', 'get', reverse('articles-detail', kwargs={'pk': article.id}),
+                     user=reader),
+            Scenario('article search', 'articles-search', 'get', f"{reverse('articles-search')}?q={word}"),
+            Scenario('articles trending', 'articles-trending', 'get', reverse('articles-trending')),
+            Scenario('articles related', 'articles-related', 'get',
+                     reverse('articles-related', kwargs={'pk': article.id})),
+            Scenario('articles bulk', 'articles-bulk', 'post', reverse('articles-bulk'), lambda i: [
+                {'title': f'Bulk {i} {n}', 'body': 'b', 'tag': [tag.name] if tag else []} for n in range(10)
+            ], user=reader, write=True),
+            Scenario('feed', 'feed-articles', 'get', reverse('feed-articles'), user=reader),
+            Scenario('comments', 'comments-list-create', 'get',
+                     reverse('comments-list-create', kwargs={'article_id': article.id})),
+            Scenario('comment create', 'comments-list-create', 'post',
+                     reverse('comments-list-create', kwargs={'article_id': article.id}), {'body': 'Benchmark'},
+                     user=reader, write=True),
+            Scenario('favorite', 'favorite-article', 'post',
+                     reverse('favorite-article', kwargs={'article_id': article.id}), user=reader, write=True),
+            Scenario('profile', 'profile', 'get', reverse('profile', kwargs={'username': author})),
+            Scenario('profile following', 'profile-following', 'get',
+                     reverse('profile-following', kwargs={'username': reader.username})),
+            Scenario('follow', 'profile-follow', 'post', reverse('profile-follow', kwargs={'username': author}),
+                     user=reader, write=True),
+            Scenario('follows lookup', 'follows', 'get', f"{reverse('follows')}?usernames={','.join(others)}",
+                     user=reader),
+            Scenario('follow batch', 'follows', 'post', reverse('follows'), {'usernames': others},
+                     user=reader, write=True),
+            Scenario('export articles', 'export-articles', 'get',
+                     f"{reverse('export-articles', kwargs={'export_format': 'jsonl'})}?author={author}", user=reader),
+            Scenario('syndication', 'article-syndication', 'get',
+                     reverse('article-syndication', kwargs={'kind': 'author', 'value': author, 'feed_type': 'rss'})),
+            Scenario('metrics', 'metrics', 'get', reverse('metrics'),
+                     headers={'Authorization': f'Bearer {METRICS_TOKEN}'}),
+        ]
+        if comment is not None:
+            scenarios += [
+                Scenario('comment', 'comments-detail', 'get',
+                         reverse('comments-detail', kwargs={'article_id': article.id, 'comment_id': comment.id})),
+                Scenario('export comments', 'export-comments', 'get',
+                         f"{reverse('export-comments', kwargs={'export_format': 'csv'})}?article={article.id}",
+                         user=reader),
+            ]
+        if admin is not None:
+            scenarios.append(Scenario('database pools', 'database-pools', 'get', reverse('database-pools'), user=admin))
+        return scenarios
+
+    def measure(self, scenario, requests, warmup):
+        client = Client()
+        headers = dict(scenario.headers or {})
+        if scenario.user is not None:
+            headers['Authorization'] = f'Bearer {refresh_token_for(scenario.user).access_token}'
+        timings, queries, errors = [], [], 0
+        for iteration in range(warmup + requests):
+            data = scenario.data(iteration) if callable(scenario.data) else scenario.data
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                if scenario.write:
+                    with transaction.atomic():
+                        response = self.request(client, scenario, data, headers)
+                        transaction.set_rollback(True)
+                else:
+                    response = self.request(client, scenario, data, headers)
+                elapsed = time.perf_counter() - started
+            if scenario.write:
+                counters.discard()  # deltas of rolled-back favorites/comments
+            if iteration < warmup:
+                continue
+            timings.append(elapsed * 1000)
+            queries.append(len(captured))
+            errors += response.status_code >= 400
+        return {
+            'method': scenario.method.upper(),
+            'path': scenario.path,
+            'requests': requests,
+            'errors': errors,
+            'status': response.status_code,
+            'p50_ms': round(percentile(timings, 0.50), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'queries_per_request': round(statistics.mean(queries), 2),
+            'throughput_rps': round(len(timings) / (sum(timings) / 1000), 1),
+        }
+
+    def request(self, client, scenario, data, headers):
+        kwargs = {'headers': headers}
+        if data is not None:
+            kwargs.update(data=json.dumps(data), content_type='application/json')
+        response = getattr(client, scenario.method)(scenario.path, **kwargs)
+        if response.streaming:
+            b''.join(response.streaming_content)  # exports and feeds do their work while streaming
+        return response
+
+    def report(self, name, result):
+        line = (
+            f'{name:<20} {result["method"]:<5} p50 {result["p50_ms"]:8.2f} ms  p95 {result["p95_ms"]:8.2f} ms  '
+            f'p99 {result["p99_ms"]:8.2f} ms  {result["queries_per_request"]:6.1f} q/req  '
+            f'{result["throughput_rps"]:8.1f} req/s'
+        )
+        if result['errors']:
+            line = self.style.ERROR(f'{line}  {result["errors"]} errors (last status {result["status"]})')
+        self.stdout.write(line)
+
+    def compare(self, path, results):
+        with open(path, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Against {path} ({baseline["meta"].get("commit") or "?"})'))
+        for name, result in results.items():
+            before = baseline['endpoints'].get(name)
+            if before is None:
+                continue
+            changes = []
+            for metric in ('p50_ms', 'p95_ms', 'queries_per_request'):
+                if before[metric]:
+                    changes.append(f'{metric} {(result[metric] - before[metric]) / before[metric]:+.0%}')
+            self.stdout.write(f'{name:<20} {"  ".join(changes)}')
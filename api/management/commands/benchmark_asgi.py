@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+from unittest import mock
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from rest_framework.throttling import SimpleRateThrottle
+from api.authentication import refresh_token_for
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare requests per second of the WSGI views (news_project.urls) and the '
+        'async views (news_project.asgi_urls) with the same number of workers: '
+        'threads with one request in flight each for WSGI, concurrent requests on '
+        'one event loop for ASGI. For deployment numbers run gunicorn and uvicorn '
+        'with the same -w against the same database instead.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='User whose token authenticates the requests.')
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Path to request (repeatable). Defaults to the feed, the user\'s profile and the tag list.',
+        )
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent requests per path.')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per path and stack.')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f'No user named {options["username"]!r}.')
+        headers = {'Authorization': f'Bearer {refresh_token_for(user).access_token}'}
+        paths = options['paths'] or ['/api/articles/feed/', f'/api/profile/{user.username}/', '/api/tags/']
+        workers, total = options['workers'], options['requests']
+
+        # throttles would cut either run short. DRF views copy their throttle classes
+        # and rates at import, so a settings override only reached the async views;
+        # a None rate lets requests through on both stacks after the same checks.
+        no_rates = {scope: None for scope in SimpleRateThrottle.THROTTLE_RATES}
+        with override_settings(ALLOWED_HOSTS=['*']), mock.patch.dict(SimpleRateThrottle.THROTTLE_RATES, no_rates):
+            for path in paths:
+                self.stdout.write(self.style.MIGRATE_HEADING(path))
+                with override_settings(ROOT_URLCONF='news_project.urls'):
+                    self.report('wsgi', *self.run_sync(path, headers, workers, total))
+                with override_settings(ROOT_URLCONF='news_project.asgi_urls'):
+                    self.report('asgi', *asyncio.run(self.run_async(path, headers, workers, total)))
+
+    def report(self, label, elapsed, statuses):
+        errors = sum(1 for code in statuses if code >= 400)
+        self.stdout.write(
+            f'  {label}  {len(statuses) / elapsed:8.1f} req/s  '
+            f'{elapsed * 1000 / len(statuses):.2f} ms/request  {errors} errors'
+        )
+
+    def run_sync(self, path, headers, workers, total):
+        statuses, lock = [], threading.Lock()
+        remaining = iter(range(total))
+
+        def worker():
+            client = Client()
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        return
+                code = client.get(path, headers=headers).status_code
+                with lock:
+                    statuses.append(code)
+
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started, statuses
+
+    async def run_async(self, path, headers, workers, total):
+        statuses = []
+        remaining = iter(range(total))
+
+        async def worker():
+            client = AsyncClient()
+            while next(remaining, None) is not None:
+                statuses.append((await client.get(path, headers=headers)).status_code)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        return time.perf_counter() - started, statuses
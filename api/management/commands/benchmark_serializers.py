@@ -0,0 +1,58 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from api.models import Article, Comment
+from api.renderers import FastJSONRenderer
+from api.rows import ArticleRowSerializer, CommentRowSerializer
+from api.serializers import ArticleSerializer, CommentSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the DRF serializer + JSONRenderer list path with the values() row '
+        'serializers + FastJSONRenderer, and check both render the same bytes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=100, help='Rows per page.')
+        parser.add_argument('--repeat', type=int, default=50, help='Timed runs per path.')
+
+    def handle(self, *args, **options):
+        request = Request(APIRequestFactory().get('/'))
+        articles = Article.objects.select_related('author').prefetch_related('tag').order_by('-created_at', '-id')
+        article = articles.first()
+        if article is None:
+            raise CommandError('No articles found, load some data first.')
+        comments = Comment.objects.select_related('author').order_by('created_at')
+        size = options['size']
+
+        shapes = {
+            'article list': (articles, ArticleSerializer, ArticleRowSerializer()),
+            'comment list': (comments, CommentSerializer, CommentRowSerializer()),
+        }
+        for name, (queryset, serializer_class, row_serializer) in shapes.items():
+            def drf():
+                page = list(queryset.all()[:size])
+                data = serializer_class(page, many=True, context={'request': request}).data
+                return JSONRenderer().render(data)
+
+            def rows():
+                page = list(row_serializer.values(queryset.all())[:size])
+                return FastJSONRenderer().render(row_serializer.serialize(page, request))
+
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            if drf() != rows():
+                self.stdout.write(self.style.ERROR('  output differs between the two paths'))
+            for label, render in (('serializer', drf), ('rows', rows)):
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    render()
+                    timings.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f'  {label:<10} median {statistics.median(timings):.3f} ms  '
+                    f'max {max(timings):.3f} ms  ({len(timings)} runs)'
+                )
@@ -0,0 +1,47 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+from api import feed
+from api.models import Article, Comment, Favorite, Follow, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Print EXPLAIN plans and latencies for the hot article/comment/favorite query shapes. '
+        'Run it before and after `migrate api 0002` to compare the index plans.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50, help='Timed runs per query shape.')
+        parser.add_argument('--no-explain', action='store_true', help='Only print latencies.')
+
+    def handle(self, *args, **options):
+        article = Article.objects.order_by('-comments_count', '-id').first()
+        reader = User.objects.filter(id__in=Follow.objects.values('follower_id')).first()
+        if article is None:
+            raise CommandError('No articles found, load some data first.')
+
+        shapes = {
+            'article list': Article.objects.order_by('-created_at', '-id')[:10],
+            'author articles': Article.objects.filter(author_id=article.author_id).order_by('-created_at')[:10],
+            'slug lookup': Article.objects.filter(slug=article.slug).order_by('-created_at')[:1],
+            'article comments': Comment.objects.filter(article=article).order_by('created_at')[:10],
+            'article favorites': Favorite.objects.filter(article=article).order_by('-created_at')[:10],
+        }
+        if reader is not None:
+            shapes['home feed'] = feed.feed_queryset(reader).order_by('-feed_created_at', '-id')[:10]
+
+        for name, queryset in shapes.items():
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                list(queryset.all())  # fresh clone, no result cache
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(
+                f'  median {statistics.median(timings):.3f} ms  '
+                f'max {max(timings):.3f} ms  ({len(timings)} runs)'
+            )
+            if not options['no_explain']:
+                for line in queryset.explain().splitlines():
+                    self.stdout.write(f'  {line}')
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from api import export
+from api.models import Article, Comment
+
+
+class Command(BaseCommand):
+    help = 'Stream articles or comments as JSONL or CSV to a file or stdout, a chunk at a time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=['articles', 'comments'])
+        parser.add_argument('--format', choices=sorted(export.FORMATS), default='jsonl')
+        parser.add_argument('--output', default='-', help='File to write, "-" for stdout.')
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help='Rows per query (default EXPORT_CHUNK_SIZE).')
+        parser.add_argument('--tag', help='Only articles with this tag.')
+        parser.add_argument('--author', help='Only rows by this username.')
+        parser.add_argument('--article', type=int, help='Only comments on this article id.')
+
+    def handle(self, *args, **options):
+        if options['model'] == 'articles':
+            queryset = Article.objects.all()
+            if options['tag']:
+                queryset = queryset.filter(tag__name=options['tag'])
+            fields, records = export.ARTICLE_FIELDS, export.article_records
+        else:
+            queryset = Comment.objects.all()
+            if options['article']:
+                queryset = queryset.filter(article_id=options['article'])
+            fields, records = export.COMMENT_FIELDS, export.comment_records
+        if options['author']:
+            queryset = queryset.filter(author__username=options['author'])
+
+        _, render = export.FORMATS[options['format']]
+        pieces = render(fields, records(queryset, options['chunk_size']))
+        if options['output'] == '-':
+            for piece in pieces:
+                self.stdout.write(piece, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+            for piece in pieces:
+                output.write(piece)
+        self.stderr.write(f'Wrote {options["output"]}.')
@@ -0,0 +1,52 @@
+import time
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from api import counters, facets, synthetic
+
+# derived tables bulk inserts skip, rebuilt in this order once the rows exist
+DERIVED = ('recount_articles', 'recount_profiles', 'rebuild_search_index', 'rebuild_feeds', 'rebuild_trending', 'rebuild_related',
+           'refresh_tag_list')
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a reproducible synthetic dataset: Zipf-distributed follower graph, authorship, tag usage '
+        'and article popularity, log-normal follow/favorite counts. Users are <prefix><n> with password '
+        f'"{synthetic.PASSWORD}".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--articles', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=30000)
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument('--follows-per-user', type=float, default=20, help='Mean follows per user.')
+        parser.add_argument('--favorites-per-user', type=float, default=10, help='Mean favorites per user.')
+        parser.add_argument('--body-words', type=int, default=120)
+        parser.add_argument('--days', type=int, default=365, help='Articles are spread over this many days.')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--prefix', default='bench', help='Username and tag prefix of the dataset.')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows per bulk insert.')
+        parser.add_argument('--replace', action='store_true', help='Delete an existing dataset with this prefix first.')
+        parser.add_argument('--skip-derived', action='store_true',
+                            help='Leave counters, profile stats, search index, feeds, trending and related lists stale.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['replace']:
+            synthetic.delete(options['prefix'])
+        generator = synthetic.Generator(
+            prefix=options['prefix'], seed=options['seed'], days=options['days'], chunk_size=options['chunk_size'],
+            log=lambda message: self.stdout.write(f'  {message} ({time.perf_counter() - started:.1f}s)'),
+        )
+        generator.generate(
+            users=options['users'], articles=options['articles'], comments=options['comments'], tags=options['tags'],
+            follows_per_user=options['follows_per_user'], favorites_per_user=options['favorites_per_user'],
+            body_words=options['body_words'],
+        )
+        facets.invalidate_all()  # cached tag posting lists predate the new links
+        if not options['skip_derived']:
+            counters.discard()
+            for command in DERIVED:
+                call_command(command, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f'Dataset generated in {time.perf_counter() - started:.1f}s.'))
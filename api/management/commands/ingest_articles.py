@@ -0,0 +1,64 @@
+import json
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from api import ingest
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Import articles from a JSONL file (one article object per line, "-" for stdin). '
+        'Each line needs title and body, optionally description, slug, tag (list of names) and '
+        'author (username) unless --author is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--author', help='Username to publish every article as.')
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help='Articles per transaction (default ARTICLE_INGEST_CHUNK_SIZE).')
+
+    def handle(self, *args, **options):
+        author = None
+        if options['author']:
+            author = User.objects.filter(username=options['author']).first()
+            if author is None:
+                raise CommandError(f'Unknown user {options["author"]!r}.')
+        size = options['chunk_size'] or ingest.chunk_size()
+        self.created = self.failed = 0
+
+        stream = sys.stdin if options['path'] == '-' else open(options['path'], encoding='utf-8')
+        try:
+            chunk = []  # (line number, item)
+            for line_number, line in enumerate(stream, 1):
+                if not line.strip():
+                    continue
+                try:
+                    chunk.append((line_number, json.loads(line)))
+                except ValueError as error:
+                    self.report(line_number, {'errors': {'non_field_errors': [f'Invalid JSON: {error}']}})
+                    continue
+                if len(chunk) >= size:
+                    self.flush(chunk, author)
+                    chunk = []
+            self.flush(chunk, author)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        style = self.style.SUCCESS if not self.failed else self.style.WARNING
+        self.stdout.write(style(f'Created {self.created} article(s), {self.failed} failed.'))
+
+    def flush(self, chunk, author):
+        if not chunk:
+            return
+        results = ingest.ingest_chunk([item for _, item in chunk], author)
+        for (line_number, _), result in zip(chunk, results):
+            self.report(line_number, result)
+
+    def report(self, line_number, result):
+        if 'errors' in result:
+            self.failed += 1
+            self.stderr.write(f'line {line_number}: {json.dumps(result["errors"])}')
+        else:
+            self.created += 1
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from api import counters, trending
+
+
+class Command(BaseCommand):
+    help = 'Move the trending epoch to now and rescale the stored scores without waiting for a flush to do it.'
+
+    def handle(self, *args, **options):
+        counters.flush()
+        at = trending.rebase()
+        self.stdout.write(self.style.SUCCESS(f'Trending scores rebased to {at.isoformat()}.'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from api import feed
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = 'Rebuild materialized home feeds from the follow graph.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', help='Only rebuild these users (default: everyone).')
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        rebuilt = 0
+        for user in users.iterator(chunk_size=500):
+            feed.rebuild(user)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rebuilt} feed(s).'))
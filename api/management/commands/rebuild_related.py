@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from api import related
+
+
+class Command(BaseCommand):
+    help = 'Recompute the related-articles list of every article.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        rebuilt = related.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Related articles computed for {rebuilt} article(s).'))
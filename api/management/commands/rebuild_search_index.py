@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from api import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the article search index from scratch.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        indexed = search.rebuild_index(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} article(s).'))
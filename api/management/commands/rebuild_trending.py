@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from api import counters, trending
+
+
+class Command(BaseCommand):
+    help = 'Recompute the trending scores of every article from favorites and comments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        counters.flush()
+        rebuilt = trending.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Scored {rebuilt} article(s).'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from api import counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute Article.favorites_count and comments_count from the source tables.'
+
+    def handle(self, *args, **options):
+        counters.flush()
+        counters.recount()
+        self.stdout.write(self.style.SUCCESS('Article counters recomputed.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from api import profiles
+
+
+class Command(BaseCommand):
+    help = 'Recompute User.followers_count, following_count and articles_count from the source tables.'
+
+    def handle(self, *args, **options):
+        recounted = profiles.recount()
+        profiles.invalidate_all()
+        self.stdout.write(self.style.SUCCESS(f'Profile stats recomputed for {recounted} user(s).'))
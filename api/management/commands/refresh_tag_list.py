@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from api import tags
+
+
+class Command(BaseCommand):
+    help = 'Recompute the cached popular tag list (run from cron to keep it warm).'
+
+    def handle(self, *args, **options):
+        data = tags.refresh()
+        self.stdout.write(self.style.SUCCESS(f"Cached {len(data['tags'])} tag(s)."))
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def dedupe_article_slugs(apps, schema_editor):
+    # existing rows may repeat a slug for one author (or leave it blank); suffix them so the constraint applies
+    from django.db.models import Count
+    from django.utils.text import slugify
+    Article = apps.get_model('api', 'Article')
+    duplicates = (
+        Article.objects.values('author_id', 'slug')
+        .annotate(rows=Count('id'))
+        .filter(rows__gt=1)
+    )
+    for duplicate in duplicates:
+        articles = Article.objects.filter(author_id=duplicate['author_id'], slug=duplicate['slug']).order_by('id')
+        taken = set(Article.objects.filter(author_id=duplicate['author_id']).values_list('slug', flat=True))
+        for article in articles[1:]:
+            base = duplicate['slug'] or slugify(article.title)[:240] or 'article'
+            slug, suffix = base, 2
+            while slug in taken:
+                slug = f'{base}-{suffix}'
+                suffix += 1
+            taken.add(slug)
+            Article.objects.filter(pk=article.pk).update(slug=slug)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['author', '-created_at'], name='article_author_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['-created_at', '-id'], name='article_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['slug'], name='article_slug_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['article', 'created_at'], name='comment_article_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['article', 'created_at'], name='favorite_article_created_idx'),
+        ),
+        migrations.AlterField(
+            model_name='article',
+            name='author',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='articles', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='article',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='api.article'),
+        ),
+        migrations.AlterField(
+            model_name='favorite',
+            name='article',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='favorites', to='api.article'),
+        ),
+        migrations.RunPython(dedupe_article_slugs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='article',
+            constraint=models.UniqueConstraint(fields=('author', 'slug'), name='article_author_slug_uniq'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_tag_ordering'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(default=0)),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trending_scores', to='api.article')),
+                ('tag', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.tag')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tag', '-score'], name='trending_tag_score_idx')],
+                'unique_together': {('article', 'tag')},
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:57
+
+from django.db import migrations, models
+
+
+def count_profile_stats(apps, schema_editor):
+    # same statement as api.profiles.recount, on the historical models
+    from django.db.models import Count, OuterRef, Subquery
+    from django.db.models.functions import Coalesce
+    User = apps.get_model('api', 'User')
+    Follow = apps.get_model('api', 'Follow')
+    Article = apps.get_model('api', 'Article')
+
+    def total(model, field):
+        rows = model.objects.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Count('id'))
+        return Coalesce(Subquery(rows.values('total')), 0)
+
+    User.objects.update(
+        followers_count=total(Follow, 'following_id'),
+        following_count=total(Follow, 'follower_id'),
+        articles_count=total(Article, 'author_id'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_relatedarticle'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='articles_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='following_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_profile_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:30
+
+from django.db import migrations, models
+
+
+def record_configured_epoch(apps, schema_editor):
+    # the scores stored so far are scaled to the configured epoch
+    from datetime import datetime
+    from django.conf import settings
+    TrendingEpoch = apps.get_model('api', 'TrendingEpoch')
+    at = datetime.fromisoformat(getattr(settings, 'TRENDING_EPOCH', '2026-01-01T00:00:00+00:00'))
+    TrendingEpoch.objects.create(pk=1, at=at)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_user_profile_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingEpoch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('at', models.DateTimeField()),
+            ],
+        ),
+        migrations.RunPython(record_configured_epoch, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,19 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils.text import slugify
+
+def slug_base(title):
+    base = slugify(title)[:240] or 'article'
+    if base.isdigit():
+        base = f'article-{base}'  # purely numeric slugs would collide with id lookups
+    return base
+
+def first_free_slug(base, taken):
+    slug, suffix = base, 2
+    while slug in taken:
+        slug = f'{base}-{suffix}'
+        suffix += 1
+    return slug
 
 class User(AbstractUser):
     email = models.EmailField(unique=True)
@@ -7,6 +21,12 @@ class User(AbstractUser):
     username = models.CharField(max_length=150, unique=True)
     bio = models.TextField(blank=True, null=True)
     image = models.CharField(max_length=255, blank=True, null=True)
+    token_version = models.PositiveIntegerField(default=0)  # bump to revoke issued JWTs
+    updated_at = models.DateTimeField(auto_now=True)  # validator for responses embedding the profile
+    # denormalized, maintained by api.profiles
+    followers_count = models.IntegerField(default=0)
+    following_count = models.IntegerField(default=0)
+    articles_count = models.IntegerField(default=0)
     following = models.ManyToManyField(
         'self',
         through='Follow',
@@ -15,37 +35,94 @@ class User(AbstractUser):
         blank=True
     )
 
+    STATS = ('followers_count', 'following_count', 'articles_count')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # tokens carry is_active as a claim; api.signals revokes them when it changes
+        instance.loaded_is_active = instance.__dict__.get('is_active')
+        return instance
+
+    def save(self, *args, **kwargs):
+        # the stats only move through F() updates; a full save must not write back the copies it loaded
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields if not field.primary_key and field.name not in self.STATS
+            ]
+        super().save(*args, **kwargs)
+
 class Article(models.Model):
     slug = models.SlugField(max_length=255)
     title = models.CharField(max_length=255)
     description = models.TextField()
     body = models.TextField()
     tag = models.ManyToManyField('Tag', related_name='articles', blank=True)
-    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='articles')
+    # indexed through (author, -created_at) below, which also backs the FK
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='articles', db_index=False)
+    # denormalized, maintained by api.counters
+    favorites_count = models.IntegerField(default=0)
+    comments_count = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['author', 'slug'], name='article_author_slug_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['author', '-created_at'], name='article_author_created_idx'),  # profiles, ?author=, feed backfill
+            models.Index(fields=['-created_at', '-id'], name='article_created_idx'),  # article list, keyset pages
+            models.Index(fields=['slug'], name='article_slug_idx'),  # GET /articles/<slug>/
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = self.unique_slug(self.title)
+        super().save(*args, **kwargs)
+
+    def unique_slug(self, title):
+        base = slug_base(title)
+        taken = set(
+            Article.objects.filter(author_id=self.author_id, slug__startswith=base)
+            .exclude(pk=self.pk).values_list('slug', flat=True)
+        )
+        return first_free_slug(base, taken)
+
 class Comment(models.Model):
     body = models.TextField()
-    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='comments')
+    # indexed through (article, created_at) below, which also backs the FK
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='comments', db_index=False)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['article', 'created_at'], name='comment_article_created_idx'),
+        ]
+
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        ordering = ['name']  # stable tag order inside serialized articles
+
     def __str__(self):
         return self.name
 
 class Favorite(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='favorites')
-    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='favorites')
+    # indexed through (article, created_at) below, which also backs the FK
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='favorites', db_index=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = ('user', 'article')  # Ensure a user can favorite an article only once
+        indexes = [
+            models.Index(fields=['article', 'created_at'], name='favorite_article_created_idx'),
+        ]
 
 class Follow(models.Model):
     follower = models.ForeignKey(User, on_delete=models.CASCADE, related_name='following_relations')
@@ -54,3 +131,57 @@ class Follow(models.Model):
 
     class Meta:
         unique_together = ('follower', 'following')  # Ensure a user can follow another user only once
+
+class FeedEntry(models.Model):
+    # Materialized home timeline: one row per (reader, article) pushed on write
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='feed_entries')
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='feed_entries')
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField()  # copy of article.created_at so reads never touch the article table to sort
+
+    class Meta:
+        unique_together = ('user', 'article')
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='feed_user_created_idx'),
+            models.Index(fields=['user', 'author'], name='feed_user_author_idx'),
+        ]
+
+class SearchPosting(models.Model):
+    # Inverted index for article search, maintained by api.search
+    term = models.CharField(max_length=64)
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='search_postings')
+    weight = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('term', 'article')  # term-leading index serves exact and prefix lookups
+
+class TrendingScore(models.Model):
+    # Time-decayed engagement maintained by api.trending: one row per article for
+    # the global ranking (tag=None) and one per tag the article carries
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='trending_scores')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    score = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ('article', 'tag')  # article-leading index serves the score updates
+        indexes = [
+            models.Index(fields=['tag', '-score'], name='trending_tag_score_idx'),  # GET /articles/trending/
+        ]
+
+class TrendingEpoch(models.Model):
+    # Single row: the time TrendingScore.score is scaled to (forward decay),
+    # moved forward by api.trending.rebase before the scores grow out of range
+    at = models.DateTimeField()
+
+class RelatedArticle(models.Model):
+    # Precomputed "related articles" list maintained by api.related: the best
+    # RELATED_ARTICLES_COUNT articles sharing tags with `article`
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='related_articles')
+    related = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='related_from')
+    score = models.FloatField()
+
+    class Meta:
+        unique_together = ('article', 'related')
+        indexes = [
+            models.Index(fields=['article', '-score'], name='related_article_score_idx'),  # GET /articles/<id>/related/
+        ]
@@ -0,0 +1,199 @@
+import base64
+import binascii
+import datetime
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination with an opt-in keyset (cursor) mode.
+
+    Without a `cursor` query parameter this behaves exactly like
+    LimitOffsetPagination. Passing `?cursor=` (empty for the first page) switches
+    to keyset paging on the active ordering plus `id` as a tiebreaker, e.g.
+    `(created_at, id)`: each page is a `WHERE (created_at, id) < last_seen` range
+    scan, no rows are skipped and no `count()` is issued, so deep pages cost the
+    same as the first one. Cursors are opaque and only valid for the ordering
+    they were issued with.
+    """
+    cursor_query_param = 'cursor'
+    default_ordering = ('-created_at',)
+    invalid_cursor_message = 'Invalid cursor'
+    keyset_only = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.keyset_only or self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+        return self.keyset_page(self.keyset_rows(queryset, request, view))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() for async views, on the async ORM."""
+        self.keyset = self.keyset_only or self.cursor_query_param in request.query_params
+        if self.keyset:
+            return self.keyset_page(await self.akeyset_rows(queryset, request, view))
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.count = await queryset.acount()
+        self.offset = self.get_offset(request)
+        if self.count == 0 or self.offset > self.count:
+            return []
+        return [row async for row in queryset[self.offset:self.offset + self.limit]]
+
+    def paginate_merged(self, querysets, request, view=None):
+        """
+        paginate_queryset() over several querysets sharing one ordering, e.g. a
+        timeline and the articles merged into it at read time: each is read up
+        to the end of the page on its own and the rows are merged in memory.
+        """
+        self.keyset = self.keyset_only or self.cursor_query_param in request.query_params
+        if self.keyset:
+            rows = [row for queryset in querysets for row in self.keyset_rows(queryset, request, view)]
+            return self.keyset_page(self.merge(rows))
+        self.start_merged(querysets[0], request, view)
+        self.count = sum(queryset.count() for queryset in querysets)
+        if self.count == 0 or self.offset > self.count:
+            return []
+        end = self.offset + self.limit
+        rows = [row for queryset in querysets for row in queryset.order_by(*self.ordering)[:end]]
+        return self.merge(rows)[self.offset:end]
+
+    async def apaginate_merged(self, querysets, request, view=None):
+        self.keyset = self.keyset_only or self.cursor_query_param in request.query_params
+        if self.keyset:
+            rows = [row for queryset in querysets for row in await self.akeyset_rows(queryset, request, view)]
+            return self.keyset_page(self.merge(rows))
+        self.start_merged(querysets[0], request, view)
+        self.count = sum([await queryset.acount() for queryset in querysets])
+        if self.count == 0 or self.offset > self.count:
+            return []
+        end = self.offset + self.limit
+        rows = [row for queryset in querysets async for row in queryset.order_by(*self.ordering)[:end]]
+        return self.merge(rows)[self.offset:end]
+
+    def start_merged(self, queryset, request, view):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.offset = self.get_offset(request)
+        self.ordering = self.get_ordering(queryset, view)
+
+    def merge(self, rows):
+        # stable sorts from the last key to the first, each in its own direction
+        for field in reversed(self.ordering):
+            rows.sort(key=lambda row: self.raw_value(row, field), reverse=field.startswith('-'))
+        return rows
+
+    def keyset_rows(self, queryset, request, view):
+        try:
+            return list(self.keyset_queryset(queryset, request, view))
+        except (ValidationError, TypeError, ValueError):
+            # a well-formed cursor whose values the ordering fields don't accept
+            raise NotFound(self.invalid_cursor_message)
+
+    async def akeyset_rows(self, queryset, request, view):
+        try:
+            return [row async for row in self.keyset_queryset(queryset, request, view)]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def keyset_queryset(self, queryset, request, view):
+        """The next page plus one row, to tell whether another page follows."""
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.ordering = self.get_ordering(queryset, view)
+        queryset = queryset.order_by(*self.ordering)
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.position_filter(position))
+        return queryset[:self.limit + 1]
+
+    def keyset_page(self, rows):
+        self.has_next = len(rows) > self.limit
+        rows = rows[:self.limit]
+        self.next_position = None
+        if self.has_next:
+            self.next_position = [self.field_value(rows[-1], field) for field in self.ordering]
+        return rows
+
+    def get_ordering(self, queryset, view):
+        ordering = list(queryset.query.order_by) or list(getattr(view, 'ordering', None) or self.default_ordering)
+        ordering = ['-id' if field == '-pk' else 'id' if field == 'pk' else field for field in ordering]
+        if not any(field.lstrip('-') == 'id' for field in ordering):
+            # a unique tiebreaker keeps pages stable when the leading values collide
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return ordering
+
+    def position_filter(self, position):
+        # (a, b) < (x, y)  <=>  a < x OR (a = x AND b < y)
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            lookup = '__lt' if field.startswith('-') else '__gt'
+            clause = Q(**{field.lstrip('-') + lookup: position[index]})
+            for previous, value in zip(self.ordering[:index], position[:index]):
+                clause &= Q(**{previous.lstrip('-'): value})
+            condition |= clause
+        return condition
+
+    def raw_value(self, obj, field):
+        if isinstance(obj, dict):  # values() rows from the fast list path (api/rows.py)
+            return obj[field.lstrip('-')]
+        value = obj
+        for attr in field.lstrip('-').split('__'):
+            value = getattr(value, attr)
+        return value
+
+    def field_value(self, obj, field):
+        value = self.raw_value(obj, field)
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            # keep full microsecond precision, DjangoJSONEncoder would truncate it
+            return value.isoformat()
+        return value
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        if not all(isinstance(value, (str, int, float)) and not isinstance(value, bool) for value in position):
+            raise NotFound(self.invalid_cursor_message)  # cursors only carry column values, never null
+        return position
+
+    def encode_cursor(self, position):
+        encoded = base64.urlsafe_b64encode(json.dumps(position, separators=(',', ':')).encode('utf-8'))
+        url = remove_query_param(self.request.build_absolute_uri(), self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded.decode('ascii'))
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+
+class CursorOnlyPagination(KeysetPagination):
+    """Always keyset: for rankings where an offset total makes no sense (search)."""
+    keyset_only = True
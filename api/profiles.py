@@ -0,0 +1,142 @@
+import hashlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from . import cache as cache_namespaces
+from .models import Article, Follow, User
+
+# Profile stats and the cached profile (/profile/<username>/).
+# followers_count, following_count and articles_count are stored on the user
+# row. Follow and Article signals move them with one `count = count + 1`
+# UPDATE per side; the bulk paths that send no signals (batched follows,
+# ingest) recount their users instead, in one statement. Inside deferred()
+# the signals only collect the users, which are recounted once at the end -
+# for deletes that fan out to many rows.
+# A profile's shared fields (everything but the reader's following flag) are
+# cached per username for PROFILE_CACHE_TIMEOUT, so a read costs no query for
+# anonymous readers and one EXISTS for signed-in ones. Any change to them
+# drops the entry once its transaction commits: stat moves, profile edits
+# (old and new username) and the recounts. The timeout bounds how long a
+# rebuild racing a write can serve the old values.
+
+FIELDS = ('id', 'username', 'bio', 'image') + User.STATS
+
+_deferred = ContextVar('profile_stats_deferred', default=None)
+
+
+def timeout():
+    return getattr(settings, 'PROFILE_CACHE_TIMEOUT', 5 * 60)
+
+
+def key(username):
+    return hashlib.sha1(username.encode('utf-8')).hexdigest()  # usernames may hold characters memcached rejects
+
+
+def stats(username):
+    """The cached shared fields of the profile, or None for an unknown username."""
+    row = cache_namespaces.profiles.get(key(username))
+    if row is None:
+        row = User.objects.filter(username=username).values(*FIELDS).first()
+        if row is not None:
+            cache_namespaces.profiles.set(key(username), row, timeout())
+    return row
+
+
+async def astats(username):
+    row = await cache_namespaces.profiles.aget(key(username))
+    if row is None:
+        row = await User.objects.filter(username=username).values(*FIELDS).afirst()
+        if row is not None:
+            await cache_namespaces.profiles.aset(key(username), row, timeout())
+    return row
+
+
+def is_following(viewer, user_id):
+    if viewer is None or not viewer.is_authenticated:
+        return False
+    return Follow.objects.filter(follower_id=viewer.id, following_id=user_id).exists()
+
+
+async def ais_following(viewer, user_id):
+    if viewer is None or not viewer.is_authenticated:
+        return False
+    return await Follow.objects.filter(follower_id=viewer.id, following_id=user_id).aexists()
+
+
+def representation(row, following):
+    """The `profile` object: a stats() row plus the reader's following flag."""
+    return {
+        'username': row['username'], 'bio': row['bio'], 'image': row['image'],
+        'followersCount': row['followers_count'], 'followingCount': row['following_count'],
+        'articlesCount': row['articles_count'], 'following': following,
+    }
+
+
+def moved(deltas):
+    """Apply {user_id: {stat: delta}} from one signal; inside deferred() only note the users."""
+    collected = _deferred.get()
+    if collected is not None:
+        collected.update(deltas)
+        return
+    for user_id, changes in deltas.items():
+        User.objects.filter(id=user_id).update(**{stat: F(stat) + delta for stat, delta in changes.items()})
+    invalidate(deltas)
+
+
+@contextmanager
+def deferred():
+    """Recount the users the signals of the block touch once at the end, instead of per row."""
+    collected = set()
+    token = _deferred.set(collected)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+    refresh(collected)
+
+
+def total(model, field):
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Count('id'))
+    return Coalesce(Subquery(rows.values('total')), 0)
+
+
+def recount(user_ids=None):
+    """Recompute the stored stats from the Follow and Article tables, in one UPDATE."""
+    users = User.objects.all() if user_ids is None else User.objects.filter(id__in=user_ids)
+    return users.update(
+        followers_count=total(Follow, 'following_id'),
+        following_count=total(Follow, 'follower_id'),
+        articles_count=total(Article, 'author_id'),
+    )
+
+
+def refresh(user_ids):
+    """recount() and invalidate() for writes that bypass the signals."""
+    user_ids = set(user_ids)
+    if user_ids:
+        recount(user_ids)
+        invalidate(user_ids)
+
+
+def drop(usernames):
+    cache_namespaces.profiles.delete_many([key(username) for username in usernames])
+
+
+def invalidate(user_ids):
+    """Drop the cached profiles of these users once the change is visible to rebuilds."""
+    user_ids = set(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: drop(User.objects.filter(id__in=user_ids).values_list('username', flat=True)))
+
+
+def forget(usernames):
+    """invalidate() by username, for renames: the old name no longer leads to the user."""
+    usernames = set(usernames)
+    transaction.on_commit(lambda: drop(usernames))
+
+
+def invalidate_all():
+    cache_namespaces.profiles.invalidate()
@@ -0,0 +1,161 @@
+import heapq
+import math
+from collections import defaultdict
+from operator import itemgetter
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Prefetch, Window
+from django.db.models.functions import RowNumber
+from . import trending
+from .models import Article, RelatedArticle, Tag
+
+# Related articles (GET /articles/<id>/related/).
+# Two articles are related through the tags they share, each shared tag counting
+# its IDF, log(1 + articles / articles with the tag), so a niche tag outweighs a
+# catch-all one. The overlap is scaled by the candidate's recency with the same
+# forward decay as api/trending.py (2^((created_at - epoch) / half-life)), so
+# stored scores rank newer candidates higher at any moment without rescoring.
+# Every article keeps its top RELATED_ARTICLES_COUNT in RelatedArticle and the
+# endpoint reads that one index range. When an article's tags change its list
+# is recomputed and the article is offered to the lists of the articles it now
+# shares tags with. Candidates are the newest RELATED_CANDIDATES_PER_TAG
+# articles of each tag, so a refresh stays bounded for huge tags.
+# rebuild_related recomputes every list (and refreshes the IDFs, which drift
+# as tags are used).
+
+through = Article.tag.through
+
+
+def list_size():
+    return getattr(settings, 'RELATED_ARTICLES_COUNT', 10)
+
+
+def recency(created_at):
+    half_life = getattr(settings, 'RELATED_RECENCY_HALF_LIFE', 60 * 60 * 24 * 90)
+    # the configured epoch, never rebased: at this half-life the factor stays in range for centuries
+    return 2 ** ((created_at - trending.initial_epoch()).total_seconds() / half_life)
+
+
+def idf(tag_ids=None):
+    """{tag_id: inverse document frequency} for `tag_ids`, or every used tag."""
+    usage = through.objects.all() if tag_ids is None else through.objects.filter(tag_id__in=tag_ids)
+    total = Article.objects.count()
+    return {
+        tag_id: math.log(1 + total / articles)
+        for tag_id, articles in usage.values('tag_id').annotate(articles=Count('id')).values_list('tag_id', 'articles')
+    }
+
+
+def newest_per_tag(tag_ids):
+    """{tag_id: ids of its newest RELATED_CANDIDATES_PER_TAG articles}, in one query."""
+    per_tag = getattr(settings, 'RELATED_CANDIDATES_PER_TAG', 200)
+    rows = (
+        through.objects.filter(tag_id__in=tag_ids)
+        .annotate(position=Window(RowNumber(), partition_by='tag_id', order_by=F('article_id').desc()))
+        .filter(position__lte=per_tag).values_list('tag_id', 'article_id')
+    )
+    newest = defaultdict(list)
+    for tag_id, article_id in rows:
+        newest[tag_id].append(article_id)
+    return newest
+
+
+def overlaps(article_id, tag_ids, weights, newest):
+    """{candidate id: summed IDF of the tags it shares with the article}."""
+    overlap = defaultdict(float)
+    for tag_id in tag_ids:
+        for candidate in newest[tag_id]:
+            if candidate != article_id:
+                overlap[candidate] += weights.get(tag_id, 0)
+    return overlap
+
+
+def top(overlap, created):
+    """The best [(score, candidate id)] of an overlap map."""
+    return heapq.nlargest(list_size(), (
+        (weight * recency(created[candidate]), candidate)
+        for candidate, weight in overlap.items() if candidate in created
+    ))
+
+
+def refresh(article_ids):
+    """Recompute the articles' lists and their place in the lists of articles sharing their tags."""
+    article_ids = set(article_ids)
+    article_tags = defaultdict(list)
+    for article_id, tag_id in through.objects.filter(article_id__in=article_ids).values_list('article_id', 'tag_id'):
+        article_tags[article_id].append(tag_id)
+    tag_ids = {tag_id for tag_list in article_tags.values() for tag_id in tag_list}
+    weights, newest = (idf(tag_ids), newest_per_tag(tag_ids)) if tag_ids else ({}, {})
+    overlap = {
+        article_id: overlaps(article_id, tag_list, weights, newest) for article_id, tag_list in article_tags.items()
+    }
+    candidates = {candidate for scores in overlap.values() for candidate in scores}
+    created = dict(Article.objects.filter(id__in=article_ids | candidates).values_list('id', 'created_at'))
+
+    rows, offers = [], defaultdict(dict)
+    for article_id, scores in overlap.items():
+        if article_id not in created:
+            continue
+        rows += [RelatedArticle(article_id=article_id, related_id=related_id, score=score)
+                 for score, related_id in top(scores, created)]
+        own_recency = recency(created[article_id])
+        for candidate, weight in scores.items():
+            if candidate not in article_ids and candidate in created:
+                offers[candidate][article_id] = weight * own_recency
+    with transaction.atomic():
+        RelatedArticle.objects.filter(article_id__in=article_ids).delete()
+        RelatedArticle.objects.filter(related_id__in=article_ids).delete()
+        RelatedArticle.objects.bulk_create(rows, batch_size=1000)
+        merge(offers)
+
+
+def merge(offers):
+    """Fold {article_id: {related_id: score}} into the stored lists, keeping the best of each."""
+    stored = defaultdict(list)
+    for row_id, article_id, score in (
+        RelatedArticle.objects.filter(article_id__in=offers).values_list('id', 'article_id', 'score')
+    ):
+        stored[article_id].append((score, row_id, None))
+    dropped, rows = [], []
+    for article_id, offered in offers.items():
+        entries = stored[article_id] + [(score, None, related_id) for related_id, score in offered.items()]
+        kept = heapq.nlargest(list_size(), entries, key=itemgetter(0))
+        dropped += [row_id for _, row_id, _ in set(entries) - set(kept) if row_id is not None]
+        rows += [RelatedArticle(article_id=article_id, related_id=related_id, score=score)
+                 for score, row_id, related_id in kept if row_id is None]
+    RelatedArticle.objects.filter(id__in=dropped).delete()
+    RelatedArticle.objects.bulk_create(rows, batch_size=1000)
+
+
+def related_articles(queryset, article_id):
+    """`queryset` narrowed to the article's related articles, best first."""
+    return queryset.filter(related_from__article_id=article_id).order_by('-related_from__score', '-id')
+
+
+def rebuild(chunk_size=500):
+    """Recompute every list; returns the number of articles."""
+    weights = idf()
+    newest = newest_per_tag(list(weights))
+    created = {}
+    rebuilt = 0
+    RelatedArticle.objects.all().delete()
+    articles = Article.objects.order_by('id').only('id', 'created_at').prefetch_related(
+        Prefetch('tag', queryset=Tag.objects.only('id'))
+    )
+    batch = []
+    for article in articles.iterator(chunk_size=chunk_size):
+        created[article.id] = article.created_at
+        rebuilt += 1
+        tag_ids = [tag.id for tag in article.tag.all()]
+        if not tag_ids:
+            continue
+        overlap = overlaps(article.id, tag_ids, weights, newest)
+        missing = [candidate for candidate in overlap if candidate not in created]
+        created.update(Article.objects.filter(id__in=missing).values_list('id', 'created_at'))
+        batch += [RelatedArticle(article_id=article.id, related_id=related_id, score=score)
+                  for score, related_id in top(overlap, created)]
+        if len(batch) >= 5000:
+            RelatedArticle.objects.bulk_create(batch, batch_size=1000)
+            batch = []
+    RelatedArticle.objects.bulk_create(batch, batch_size=1000)
+    return rebuilt
@@ -0,0 +1,32 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional speedup, the stock renderer is used without it
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed.
+
+    The output is byte-for-byte what JSONRenderer produces for our compact,
+    unicode, strict settings: orjson emits compact UTF-8 without ASCII
+    escaping, and \\u2028/\\u2029 get the same explicit escapes. Types orjson
+    doesn't know (lazy strings, Decimal, ...) go through DRF's JSONEncoder.
+    Data orjson rejects outright, such as the int keys of ListField errors,
+    falls back to the stock path. Indented output (browsable API, `; indent=`) uses the stock path.
+    """
+    default_encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.default_encoder.default)
+        except TypeError:  # non-str dict keys, e.g. {'tag': {0: [...]}}; json.dumps turns them into strings
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
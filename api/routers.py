@@ -0,0 +1,181 @@
+import time
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+import jwt
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils.connection import ConnectionDoesNotExist
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.settings import api_settings
+
+# Read replicas with read-your-writes.
+# ReplicaRoutingMiddleware decides per request whether reads may go to a
+# replica: only safe methods qualify, and only when the caller hasn't written
+# in the last REPLICA_PIN_SECONDS. Every unsafe request pins its user to the
+# primary for that window (a shared cache key), so the article, comment,
+# follow or favorite they just wrote is read back from the primary until the
+# replicas have it. Replicas are health- and lag-checked at most every
+# REPLICA_HEALTH_CHECK_INTERVAL seconds per process; when none is usable reads
+# fall back to the primary. Code outside a request (commands, threads) always
+# uses the primary.
+
+PRIMARY = DEFAULT_DB_ALIAS
+use_replica = ContextVar('use_replica', default=False)
+
+# alias -> (checked at, healthy), per process
+replica_health = {}
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def pin_key(user_id):
+    return f'db:pin:{user_id}'
+
+
+def pin(user_id):
+    cache.set(pin_key(user_id), 1, getattr(settings, 'REPLICA_PIN_SECONDS', 10))
+
+
+def is_pinned(user_id):
+    return cache.get(pin_key(user_id)) is not None
+
+
+async def apin(user_id):
+    await cache.aset(pin_key(user_id), 1, getattr(settings, 'REPLICA_PIN_SECONDS', 10))
+
+
+async def ais_pinned(user_id):
+    return await cache.aget(pin_key(user_id)) is not None
+
+
+def token_user_id(request):
+    """
+    User id from the bearer token, read without verifying it. It only decides
+    which database serves the reads; authentication still checks the token.
+    """
+    header = request.headers.get('Authorization', '').split()
+    if len(header) != 2 or header[0] != 'Bearer':
+        return None
+    try:
+        claims = jwt.decode(header[1], options={'verify_signature': False})
+    except jwt.InvalidTokenError:
+        return None
+    return claims.get(api_settings.USER_ID_CLAIM)
+
+
+def replication_lag(connection):
+    """Seconds the replica is behind, or None when replication isn't running."""
+    with connection.cursor() as cursor:
+        if connection.vendor != 'mysql':
+            cursor.execute('SELECT 1')  # stand-in replicas (SQLite copies in tests) only need to answer
+            return 0
+        cursor.execute('SHOW REPLICA STATUS')
+        row = cursor.fetchone()
+        if row is None:
+            return 0  # not a replica of anything, e.g. a read-only clone
+        status = dict(zip([column[0] for column in cursor.description], row))
+        return status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+
+
+def check_replica(alias):
+    try:
+        lag = replication_lag(connections[alias])
+    except (ConnectionDoesNotExist, DatabaseError):
+        return False
+    return lag is not None and lag <= getattr(settings, 'REPLICA_MAX_LAG', 5)
+
+
+def is_healthy(alias):
+    checked_at, healthy = replica_health.get(alias, (None, False))
+    if checked_at is None or time.monotonic() - checked_at > getattr(settings, 'REPLICA_HEALTH_CHECK_INTERVAL', 10):
+        healthy = check_replica(alias)
+        replica_health[alias] = (time.monotonic(), healthy)
+    return healthy
+
+
+def healthy_replica():
+    aliases = replica_aliases()
+    if not aliases:
+        return None
+    # rotate through the pool from a per-call offset so load spreads across replicas
+    start = time.monotonic_ns() % len(aliases)
+    for alias in aliases[start:] + aliases[:start]:
+        if is_healthy(alias):
+            return alias
+    return None
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not use_replica.get():
+            return PRIMARY
+        return healthy_replica() or PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # replicas hold the same data as the primary
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+def routed(chunks, replica):
+    # streamed bodies are read after the middleware returned, keep their routing
+    iterator = iter(chunks)
+    while True:
+        token = use_replica.set(replica)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            use_replica.reset(token)
+        yield chunk
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True  # keeps the ASGI stack async end to end
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        user_id = token_user_id(request)
+        safe = request.method in SAFE_METHODS
+        replica = safe and bool(replica_aliases()) and not (user_id is not None and is_pinned(user_id))
+        token = use_replica.set(replica)
+        try:
+            response = self.get_response(request)
+        finally:
+            use_replica.reset(token)
+        if not safe and user_id is not None and response.status_code < 400:
+            pin(user_id)
+        return self.finish(response, replica)
+
+    async def __acall__(self, request):
+        user_id = token_user_id(request)
+        safe = request.method in SAFE_METHODS
+        replica = safe and bool(replica_aliases()) and not (user_id is not None and await ais_pinned(user_id))
+        token = use_replica.set(replica)
+        try:
+            response = await self.get_response(request)
+        finally:
+            use_replica.reset(token)
+        if not safe and user_id is not None and response.status_code < 400:
+            await apin(user_id)
+        return self.finish(response, replica)
+
+    def finish(self, response, replica):
+        if response.streaming and not response.is_async:
+            response.streaming_content = routed(response.streaming_content, replica)
+        return response
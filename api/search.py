@@ -0,0 +1,114 @@
+import re
+from collections import Counter
+from django.db import transaction
+from django.db.models import Case, IntegerField, Max, Q, Sum, When
+from rest_framework.filters import BaseFilterBackend
+from .models import Article, SearchPosting
+
+# Inverted index for article search.
+# Every article is tokenized into SearchPosting(term, article, weight) rows,
+# weight being the term frequency scaled by the field it occurs in. A query
+# term is matched as a prefix, which the (term, article) unique index answers
+# with a range scan instead of a LIKE '%term%' over article bodies. Postings
+# are rewritten on article save / tag change (see signals.py) and rebuilt in
+# bulk by the rebuild_search_index command.
+
+FIELD_WEIGHTS = {'title': 4, 'tag': 3, 'description': 2, 'body': 1}
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+MAX_TERM_FREQUENCY = 10  # per field, so keyword stuffing can't dominate ranking
+STOP_WORDS = frozenset(
+    'a an and are as at be but by for if in into is it of on or such that the their then there '
+    'these they this to was will with'.split()
+)
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    return [
+        token[:MAX_TERM_LENGTH]
+        for token in TOKEN_RE.findall((text or '').lower())
+        if token not in STOP_WORDS
+    ]
+
+
+def article_terms(article, tag_names):
+    weights = Counter()
+    fields = {
+        'title': article.title,
+        'description': article.description,
+        'body': article.body,
+        'tag': ' '.join(tag_names),
+    }
+    for field, text in fields.items():
+        frequencies = Counter(tokenize(text))
+        for term, frequency in frequencies.items():
+            weights[term] += FIELD_WEIGHTS[field] * min(frequency, MAX_TERM_FREQUENCY)
+    return weights
+
+
+def postings_for(article, tag_names):
+    return [
+        SearchPosting(term=term, article_id=article.id, weight=weight)
+        for term, weight in article_terms(article, tag_names).items()
+    ]
+
+
+def index_article(article):
+    tag_names = list(article.tag.values_list('name', flat=True))
+    with transaction.atomic():
+        SearchPosting.objects.filter(article_id=article.id).delete()
+        SearchPosting.objects.bulk_create(postings_for(article, tag_names), batch_size=1000)
+
+
+def rebuild_index(chunk_size=500):
+    """Reindex every article; returns the number of articles indexed."""
+    indexed = 0
+    SearchPosting.objects.all().delete()
+    articles = Article.objects.prefetch_related('tag').order_by('id')
+    batch = []
+    for article in articles.iterator(chunk_size=chunk_size):
+        batch.extend(postings_for(article, [tag.name for tag in article.tag.all()]))
+        indexed += 1
+        if len(batch) >= 5000:
+            SearchPosting.objects.bulk_create(batch, batch_size=1000)
+            batch = []
+    SearchPosting.objects.bulk_create(batch, batch_size=1000)
+    return indexed
+
+
+def query_terms(query):
+    return list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+
+
+def search(queryset, query):
+    """
+    Restrict an Article queryset to matches for every query term (prefix match)
+    and annotate a `score`: the summed posting weights of the matched terms.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return queryset.annotate(score=Sum('search_postings__weight')).none()
+    matches = [Q(search_postings__term__startswith=term) for term in terms]
+    condition = matches[0]
+    for match in matches[1:]:
+        condition |= match
+    queryset = queryset.filter(condition).annotate(
+        score=Sum('search_postings__weight'),
+        **{
+            f'matched_{index}': Max(Case(When(match, then=1), default=0, output_field=IntegerField()))
+            for index, match in enumerate(matches)
+        }
+    )
+    return queryset.filter(**{f'matched_{index}': 1 for index in range(len(matches))})
+
+
+class ArticleSearchFilter(BaseFilterBackend):
+    """`?search=` backed by the inverted index instead of LIKE scans."""
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        if not query.strip():
+            return queryset
+        return queryset.filter(id__in=search(Article.objects.all(), query).values('id'))
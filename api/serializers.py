@@ -3,6 +3,7 @@ from rest_framework.validators import UniqueValidator
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from .models import User, Article, Comment, Tag, Favorite
+from . import counters, profiles
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
 # Login Custom serializer for JWT token generation
@@ -63,32 +64,155 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['email', 'token', 'username', 'bio', 'image']
 
 class UserProfileSerializer(serializers.ModelSerializer):
+    # denormalized stats (api/profiles.py); the accounts followed are paged at /profile/<username>/following/
+    followersCount = serializers.IntegerField(source='followers_count', read_only=True)
+    followingCount = serializers.IntegerField(source='following_count', read_only=True)
+    articlesCount = serializers.IntegerField(source='articles_count', read_only=True)
+    following = serializers.SerializerMethodField()  # does the requesting user follow them
+
+    class Meta:
+        model = User
+        fields = ['username', 'bio', 'image', 'followersCount', 'followingCount', 'articlesCount', 'following']
+
+    def get_following(self, obj):
+        request = self.context.get('request')
+        return profiles.is_following(request and request.user, obj.id)
+
+# Lean author shape nested in article/comment lists: no `following` m2m,
+# so a page needs no per-author query. Also the rows of a profile's following page.
+class AuthorSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
-        fields = ['username', 'bio', 'image', 'following']
+        fields = ['username', 'bio', 'image']
 
 class CommentSerializer(serializers.ModelSerializer):
-    author = UserProfileSerializer(read_only=True)
+    author = AuthorSerializer(read_only=True)
     class Meta:
         model = Comment
         fields = ['id', 'body', 'article', 'author', 'created_at', 'updated_at']
         # use read_only_fields to: get field article', 'author' when get, but not required when post
         read_only_fields = ['article', 'author']
 
+class ArticleIngestSerializer(serializers.Serializer):
+    """One item of a bulk import (api/ingest.py); `author` is only read when no author is given."""
+    title = serializers.CharField(max_length=255)
+    description = serializers.CharField(required=False, allow_blank=True, default='')
+    body = serializers.CharField()
+    slug = serializers.SlugField(max_length=255, required=False)
+    tag = serializers.ListField(child=serializers.CharField(max_length=50), required=False, default=list)
+    author = serializers.CharField(max_length=150, required=False)
+
+    def validate_slug(self, value):
+        if value.isdigit():
+            raise serializers.ValidationError('Slug cannot be only digits.')
+        return value
+
+    def validate_tag(self, value):
+        return list(dict.fromkeys(value))
+
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ['name']
-class ArticleSerializer(serializers.ModelSerializer):
-    author = UserProfileSerializer(read_only=True)
+
+
+def requested_fields(request, available, default_omit=()):
+    """
+    Output fields selected by `?fields=a,b` and/or `?omit=c`, in declared order.
+    An explicit `?omit=` replaces `default_omit`, so `?omit=` alone asks for everything.
+    """
+    params = request.query_params
+    selected = params.get('fields')
+    omitted = params.get('omit')
+    selected = [name for name in selected.split(',') if name] if selected else None
+    omitted = [name for name in omitted.split(',') if name] if omitted is not None else None
+    errors = {}
+    for param, names in (('fields', selected), ('omit', omitted)):
+        unknown = [name for name in names or [] if name not in available]
+        if unknown:
+            errors[param] = [f'Unknown field: {name}' for name in unknown]
+    if errors:
+        raise serializers.ValidationError(errors)
+    if omitted is None:
+        omitted = [] if selected else list(default_omit)
+    return [name for name in available if (selected is None or name in selected) and name not in omitted]
+
+class SparseFieldsMixin:
+    """Drops every field not listed in context['fields'] (see requested_fields)."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+def favorited_article_ids(request, article_ids):
+    user = getattr(request, 'user', None)
+    if not article_ids or user is None or not user.is_authenticated:
+        return set()
+    return set(
+        Favorite.objects.filter(user=user, article_id__in=article_ids).values_list('article_id', flat=True)
+    )
+
+class ArticleListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # one favorites lookup for the whole page instead of one per article
+        articles = list(data.all() if hasattr(data, 'all') else data)
+        self.context['favorited_ids'] = favorited_article_ids(
+            self.context.get('request'), [article.id for article in articles]
+        )
+        return super().to_representation(articles)
+
+class ArticleSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    author = AuthorSerializer(read_only=True)
     tag = serializers.StringRelatedField(many=True, read_only=True)
+    favorited = serializers.SerializerMethodField()
+    favoritesCount = serializers.SerializerMethodField()
+    commentsCount = serializers.SerializerMethodField()
 
     class Meta:
         model = Article
+        list_serializer_class = ArticleListSerializer
         fields = ['id', 'slug', 'title', 'description',
                 'body', 'tag', 'author',
+                'favorited', 'favoritesCount', 'commentsCount',
                 'created_at', 'updated_at']
         read_only_fields = ['author']
         extra_kwargs = {
             'description': {'required': False},
+            'slug': {'required': False},  # generated from the title when omitted
         }
+        # (author, slug) uniqueness is checked in validate_slug, author is not a writable field
+        validators = []
+
+    # output field -> model column it reads, for defer() when the field is not requested
+    deferrable_columns = {'slug': 'slug', 'title': 'title', 'description': 'description', 'body': 'body'}
+
+    @classmethod
+    def defer_unrequested(cls, queryset, fields):
+        return queryset.defer(*[column for name, column in cls.deferrable_columns.items() if name not in fields])
+
+    def validate_slug(self, value):
+        if value.isdigit():
+            raise serializers.ValidationError('Slug cannot be only digits.')
+        request = self.context.get('request')
+        author = self.instance.author if self.instance else getattr(request, 'user', None)
+        if author is not None and author.is_authenticated:
+            taken = Article.objects.filter(author=author, slug=value)
+            if self.instance:
+                taken = taken.exclude(pk=self.instance.pk)
+            if taken.exists():
+                raise serializers.ValidationError('You already have an article with this slug.')
+        return value
+
+    def get_favorited(self, obj):
+        favorited_ids = self.context.get('favorited_ids')
+        if favorited_ids is None:
+            favorited_ids = favorited_article_ids(self.context.get('request'), [obj.id])
+        return obj.id in favorited_ids
+
+    def get_favoritesCount(self, obj):
+        return counters.value(obj, 'favorites_count')
+
+    def get_commentsCount(self, obj):
+        return counters.value(obj, 'comments_count')
@@ -1,9 +1,171 @@
-from django.core.cache import cache
-from django.db.models.signals import post_save, post_delete
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
 from django.dispatch import receiver
-from .models import Tag
+from django.utils import timezone
+from . import counters, facets, feed, profiles, related, search, tags, trending
+from .authentication import revoke_tokens
+from .models import Tag, Article, Follow, Favorite, Comment, User
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_activation_change(sender, instance, created, update_fields, **kwargs):
+    # tokens carry is_active and are not checked against the row, so
+    # (de)activating a user must invalidate the tokens issued before
+    loaded = getattr(instance, 'loaded_is_active', None)
+    if created or loaded is None or (update_fields is not None and 'is_active' not in update_fields):
+        return
+    if instance.is_active != loaded:
+        revoke_tokens(instance)
+        instance.loaded_is_active = instance.is_active
+
+@receiver(post_save, sender=User)
+def invalidate_profile_feeds(sender, instance, created, update_fields, **kwargs):
+    # username, bio and image are embedded in the author of every cached feed article
+    if not created and (update_fields is None or {'username', 'bio', 'image'} & set(update_fields)):
+        feed.invalidate_author(instance.id)
 
 @receiver([post_save, post_delete], sender=Tag)
-def clear_tag_list_cache(sender, instance, **kwargs):
-    cache_key = 'tag_list'
-    cache.delete(cache_key)
\ No newline at end of file
+def refresh_tag_list(sender, instance, **kwargs):
+    # recompute after commit; readers keep the previous list until the new one lands
+    transaction.on_commit(tags.refresh_in_background)
+
+@receiver(post_save, sender=Tag)
+def reindex_tagged_articles(sender, instance, created, **kwargs):
+    if not created:  # a renamed tag changes the terms of every article carrying it
+        touch_articles(instance.articles.values_list('id', flat=True))
+        for article in instance.articles.all():
+            search.index_article(article)
+
+@receiver(post_save, sender=Article)
+def fan_out_article(sender, instance, created, **kwargs):
+    # push before invalidating so a page rebuilt under the new generation sees the article
+    if created:
+        feed.push_article(instance)
+    feed.invalidate_author(instance.author_id)
+
+@receiver(post_save, sender=Article)
+def reindex_article(sender, instance, **kwargs):
+    search.index_article(instance)
+
+@receiver(post_save, sender=Article)
+def create_trending_score(sender, instance, created, **kwargs):
+    if created:
+        trending.create_scores({instance.id: []})  # tag rows follow via sync_trending_tags
+
+@receiver(m2m_changed, sender=Article.tag.through)
+def reindex_article_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # tag.articles.clear() reports no pk_set afterwards, remember who loses the tag
+        instance._cleared_article_ids = list(instance.articles.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        touch_articles([instance.id])
+        search.index_article(instance)
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_cleared_article_ids', ())
+    touch_articles(pk_set)
+    for article in Article.objects.filter(id__in=pk_set):
+        search.index_article(article)
+
+@receiver(m2m_changed, sender=Article.tag.through)
+def sync_trending_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    # per-tag trending rows follow the article's tags
+    if action == 'post_add':
+        pairs = [(article_id, instance.id) for article_id in pk_set] if reverse else [(instance.id, tag_id) for tag_id in pk_set]
+        trending.add_tags(pairs)
+    elif action == 'post_remove':
+        if reverse:
+            trending.remove_tags(pk_set, [instance.id])
+        else:
+            trending.remove_tags([instance.id], pk_set)
+    elif action == 'post_clear':
+        if reverse:
+            trending.remove_tags(getattr(instance, '_cleared_article_ids', ()), [instance.id])
+        else:
+            trending.remove_tags([instance.id])
+
+@receiver(m2m_changed, sender=Article.tag.through)
+def refresh_related_articles(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        related.refresh([instance.id])
+    elif action == 'post_clear':
+        related.refresh(getattr(instance, '_cleared_article_ids', ()))
+    else:
+        related.refresh(pk_set)
+
+@receiver(m2m_changed, sender=Article.tag.through)
+def drop_tag_postings(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse and action == 'pre_clear':
+        instance._cleared_tag_ids = list(instance.tag.values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if reverse:
+            facets.invalidate([instance.id])
+        else:
+            facets.invalidate(getattr(instance, '_cleared_tag_ids', ()) if action == 'post_clear' else pk_set)
+
+@receiver(pre_delete, sender=Article)
+def drop_deleted_article_postings(sender, instance, **kwargs):
+    # the tag links go with the article without m2m signals
+    facets.invalidate(instance.tag.values_list('id', flat=True))
+
+def touch_articles(article_ids):
+    # tags are part of the article representation, so its ETag/Last-Modified must move;
+    # the update sends no post_save, so the cached feed pages are expired here
+    articles = Article.objects.filter(id__in=article_ids)
+    articles.update(updated_at=timezone.now())
+    feed.invalidate_authors(articles.values_list('author_id', flat=True).distinct())
+
+@receiver(post_delete, sender=Article)
+def invalidate_author_feeds(sender, instance, **kwargs):
+    feed.invalidate_author(instance.author_id)
+
+@receiver([post_save, post_delete], sender=Follow)
+def invalidate_follower_feed(sender, instance, **kwargs):
+    feed.bump_user_generations([instance.follower_id])
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    if created:
+        profiles.moved({instance.follower_id: {'following_count': 1}, instance.following_id: {'followers_count': 1}})
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    profiles.moved({instance.follower_id: {'following_count': -1}, instance.following_id: {'followers_count': -1}})
+
+@receiver(post_save, sender=Article)
+def count_article(sender, instance, created, **kwargs):
+    if created:
+        profiles.moved({instance.author_id: {'articles_count': 1}})
+
+@receiver(post_delete, sender=Article)
+def uncount_article(sender, instance, **kwargs):
+    profiles.moved({instance.author_id: {'articles_count': -1}})
+
+# counted once the row is committed: a rolled-back favorite or comment must not move the counters
+@receiver(post_save, sender=Favorite)
+def count_favorite(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: record_event(instance, 'favorites_count', 'favorite'))
+        feed.bump_user_generations([instance.user_id])  # cached feed pages carry `favorited`
+
+@receiver(post_delete, sender=Favorite)
+def uncount_favorite(sender, instance, **kwargs):
+    transaction.on_commit(lambda: record_event(instance, 'favorites_count', 'favorite', sign=-1))
+    feed.bump_user_generations([instance.user_id])
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: record_event(instance, 'comments_count', 'comment'))
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    transaction.on_commit(lambda: record_event(instance, 'comments_count', 'comment', sign=-1))
+
+def record_event(instance, field, event, sign=1):
+    counters.incr(instance.article_id, field, sign)
+    trending.record(instance.article_id, event, instance.created_at, sign=sign)
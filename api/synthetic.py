@@ -0,0 +1,215 @@
+import bisect
+import contextlib
+import itertools
+import math
+import random
+from datetime import timedelta
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+from . import profiles
+from .models import Article, Comment, Favorite, Follow, Tag, User
+
+# Synthetic datasets for load tests (generate_data command, benchmark_api).
+# The shapes follow what a real site sees rather than uniform noise: who
+# follows whom and who writes are Zipf-distributed over users (a handful of
+# celebrities with huge follower counts, a long tail with none), tag usage and
+# article popularity (favorites, comments) are Zipfian too, and per-user
+# follow/favorite counts are log-normal. Everything derives from one seed, so
+# the same arguments rebuild the same dataset and benchmark runs on different
+# commits are comparable. Rows are written with bulk_create, which sends no
+# signals; the generate_data command rebuilds the derived tables afterwards.
+
+PASSWORD = 'benchmark-password'  # every generated user's, for login benchmarks
+WORDS = (
+    'data cache query index latency server python django feed article tag user review design system '
+    'network storage memory thread worker queue stream batch model schema release deploy metric trace '
+    'search ranking vector graph cluster replica shard backup security token session request response '
+    'error budget scale load test bench profile'
+).split()
+
+
+class Zipf:
+    """Draws 0..n-1 with P(k) proportional to 1 / (k + 1) ** exponent."""
+
+    def __init__(self, n, exponent, rng):
+        self.n = n
+        self.rng = rng
+        self.cumulative = list(itertools.accumulate(1 / (k + 1) ** exponent for k in range(n)))
+
+    def draw(self):
+        return bisect.bisect(self.cumulative, self.rng.random() * self.cumulative[-1])
+
+    def sample(self, k, exclude=None):
+        """Up to `k` distinct draws; heavy heads make full sets of large k slow, so attempts are capped."""
+        chosen = set()
+        for _ in range(k * 10):
+            if len(chosen) >= k:
+                break
+            value = self.draw()
+            if value != exclude:
+                chosen.add(value)
+        return chosen
+
+
+def lognormal_count(rng, mean, limit):
+    # log-normal with the given mean (sigma 1): most users near it, a few far above
+    return min(limit, int(rng.lognormvariate(math.log(max(mean, 1e-9)) - 0.5, 1)))
+
+
+@contextlib.contextmanager
+def explicit_timestamps(*models):
+    """Let generated rows carry their own created_at/updated_at instead of now()."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+class Generator:
+    def __init__(self, prefix='bench', seed=1, days=365, chunk_size=2000, log=None, now=None):
+        self.prefix = prefix
+        self.rng = random.Random(seed)
+        self.now = (now or timezone.now()).replace(microsecond=0)
+        self.start = self.now - timedelta(days=days)
+        self.chunk_size = chunk_size
+        self.log = log or (lambda message: None)
+
+    def words(self, count, zipf):
+        return ' '.join(WORDS[zipf.draw() % len(WORDS)] for _ in range(count))
+
+    def after(self, moment, mean_hours):
+        # engagement arrives soon after publication and tails off
+        return min(self.now, moment + timedelta(hours=self.rng.expovariate(1 / mean_hours)))
+
+    def insert(self, model, rows):
+        total = 0
+        for chunk in chunked(rows, self.chunk_size):
+            model.objects.bulk_create(chunk, batch_size=self.chunk_size)
+            total += len(chunk)
+        return total
+
+    def generate(self, users, articles, comments, tags, follows_per_user=20, favorites_per_user=10, body_words=120):
+        with explicit_timestamps(User, Article, Comment, Favorite, Follow, Tag):
+            tag_ids = self.tags(tags)
+            user_ids = self.users(users)
+            self.follows(user_ids, follows_per_user)
+            article_ids, published = self.articles(articles, user_ids, tag_ids, body_words)
+            # popularity is independent of age: rank -> article through a seeded shuffle
+            popular = list(range(len(article_ids)))
+            self.rng.shuffle(popular)
+            self.comments(comments, user_ids, article_ids, published, popular)
+            self.favorites(user_ids, article_ids, published, popular, favorites_per_user)
+
+    def tags(self, count):
+        self.insert(Tag, (Tag(name=f'{self.prefix}-{i}', created_at=self.start) for i in range(count)))
+        self.log(f'{count} tags')
+        return list(Tag.objects.filter(name__startswith=f'{self.prefix}-').order_by('id').values_list('id', flat=True))
+
+    def users(self, count):
+        password = make_password(PASSWORD)  # hashing is the slow part, do it once
+        rows = (
+            User(username=f'{self.prefix}{i}', email=f'{self.prefix}{i}@example.com', password=password,
+                 date_joined=self.start, updated_at=self.start)
+            for i in range(count)
+        )
+        self.insert(User, rows)
+        self.log(f'{count} users')
+        # creation order is popularity rank: the first users are the celebrities
+        return list(User.objects.filter(email__endswith='@example.com', username__startswith=self.prefix)
+                    .order_by('id').values_list('id', flat=True))
+
+    def follows(self, user_ids, mean):
+        popularity = Zipf(len(user_ids), 1.1, self.rng)
+
+        def rows():
+            for position, follower_id in enumerate(user_ids):
+                count = lognormal_count(self.rng, mean, len(user_ids) // 2)
+                for followed in popularity.sample(count, exclude=position):
+                    yield Follow(follower_id=follower_id, following_id=user_ids[followed], created_at=self.start)
+
+        self.log(f'{self.insert(Follow, rows())} follows')
+
+    def articles(self, count, user_ids, tag_ids, body_words):
+        writers = Zipf(len(user_ids), 1.0, self.rng)
+        tag_popularity = Zipf(len(tag_ids), 1.0, self.rng)
+        vocabulary = Zipf(len(WORDS), 1.0, self.rng)
+        span = (self.now - self.start).total_seconds()
+        # ids grow with created_at, as on a live site
+        times = sorted(self.rng.random() * span for _ in range(count))
+        article_ids, published = [], []
+        for chunk in chunked(enumerate(times), self.chunk_size):
+            batch, tag_sets = [], []
+            for number, offset in chunk:
+                created_at = self.start + timedelta(seconds=offset)
+                title = self.words(self.rng.randint(3, 8), vocabulary).capitalize()
+                batch.append(Article(
+                    slug=f'{self.prefix}-{number}', title=title, description=self.words(12, vocabulary),
+                    body=self.words(body_words, vocabulary), author_id=user_ids[writers.draw()],
+                    created_at=created_at, updated_at=created_at,
+                ))
+                tag_sets.append(tag_popularity.sample(self.rng.choice((1, 1, 2, 2, 3, 4))) if tag_ids else ())
+            Article.objects.bulk_create(batch, batch_size=self.chunk_size)
+            if any(article.pk is None for article in batch):
+                ids = dict(Article.objects.filter(slug__in=[article.slug for article in batch]).values_list('slug', 'id'))
+                for article in batch:
+                    article.pk = ids[article.slug]
+            Article.tag.through.objects.bulk_create(
+                [Article.tag.through(article_id=article.pk, tag_id=tag_ids[tag])
+                 for article, tags in zip(batch, tag_sets) for tag in tags],
+                batch_size=self.chunk_size,
+            )
+            article_ids += [article.pk for article in batch]
+            published += [article.created_at for article in batch]
+        self.log(f'{count} articles')
+        return article_ids, published
+
+    def comments(self, count, user_ids, article_ids, published, popular):
+        if not article_ids:
+            return
+        popularity = Zipf(len(article_ids), 1.0, self.rng)
+        vocabulary = Zipf(len(WORDS), 1.0, self.rng)
+
+        def rows():
+            for _ in range(count):
+                article = popular[popularity.draw()]
+                created_at = self.after(published[article], 24)
+                yield Comment(article_id=article_ids[article], author_id=self.rng.choice(user_ids),
+                              body=self.words(self.rng.randint(5, 40), vocabulary),
+                              created_at=created_at, updated_at=created_at)
+
+        self.log(f'{self.insert(Comment, rows())} comments')
+
+    def favorites(self, user_ids, article_ids, published, popular, mean):
+        if not article_ids:
+            return
+        popularity = Zipf(len(article_ids), 1.0, self.rng)
+
+        def rows():
+            for user_id in user_ids:
+                for rank in popularity.sample(lognormal_count(self.rng, mean, len(article_ids) // 2)):
+                    article = popular[rank]
+                    yield Favorite(user_id=user_id, article_id=article_ids[article],
+                                   created_at=self.after(published[article], 48))
+
+        self.log(f'{self.insert(Favorite, rows())} favorites')
+
+
+def delete(prefix):
+    """Remove a previously generated dataset (cascades to its articles, comments and so on)."""
+    with profiles.deferred():  # one recount instead of one per cascaded follow and article
+        User.objects.filter(email__endswith='@example.com', username__startswith=prefix).delete()
+    Tag.objects.filter(name__startswith=f'{prefix}-').delete()
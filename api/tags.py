@@ -0,0 +1,97 @@
+import threading
+import time
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Q
+from django.utils import timezone
+from . import cache as cache_namespaces
+from .models import Tag
+
+# Popular tag list for TagListView.
+# The cache holds the finished payload: every tag name ranked by how many
+# articles used it within TAG_POPULARITY_WINDOW, plus those counts. Requests
+# never recompute a stale list themselves - once it is older than
+# TAG_LIST_REFRESH_INTERVAL they keep serving it and a single background
+# refresh (guarded by a cache lock) replaces it. Only a cold cache makes a
+# request wait, and then just one worker queries while the others poll.
+
+TAG_LIST_KEY = 'tag_list'
+REFRESH_LOCK_KEY = 'tags:refresh_lock'
+
+
+def compute():
+    since = timezone.now() - timedelta(days=getattr(settings, 'TAG_POPULARITY_WINDOW', 30))
+    rows = (
+        Tag.objects.annotate(articles_count=Count('articles', filter=Q(articles__created_at__gte=since)))
+        .order_by('-articles_count', 'name')
+        .values_list('name', 'articles_count')
+    )
+    return {
+        'tags': [name for name, _ in rows],
+        'counts': [{'name': name, 'articlesCount': articles_count} for name, articles_count in rows],
+        'computed_at': time.time(),
+    }
+
+
+def refresh():
+    data = compute()
+    # kept well past the refresh interval so readers always have something to serve
+    cache_namespaces.tags.set(TAG_LIST_KEY, data, getattr(settings, 'TAG_LIST_CACHE_TIMEOUT', 60 * 60 * 24))
+    return data
+
+
+def _refresh_and_unlock():
+    try:
+        refresh()
+    finally:
+        cache.delete(REFRESH_LOCK_KEY)
+
+
+def _refresh_in_thread():
+    try:
+        _refresh_and_unlock()
+    finally:
+        connection.close()  # the thread got its own connection, don't leak it
+
+
+def refresh_in_background():
+    """Start one refresh unless another worker is already running it."""
+    if not cache.add(REFRESH_LOCK_KEY, 1, getattr(settings, 'TAG_LIST_LOCK_TIMEOUT', 30)):
+        return
+    if getattr(settings, 'TAG_LIST_REFRESH_ASYNC', True):
+        threading.Thread(target=_refresh_in_thread, daemon=True).start()
+    else:
+        _refresh_and_unlock()
+
+
+def get_tag_list():
+    data = cache_namespaces.tags.get(TAG_LIST_KEY)
+    if data is not None:
+        if time.time() - data['computed_at'] > getattr(settings, 'TAG_LIST_REFRESH_INTERVAL', 60):
+            refresh_in_background()
+        return data
+
+    # cold cache: one worker computes, the rest wait for its result
+    if cache.add(REFRESH_LOCK_KEY, 1, getattr(settings, 'TAG_LIST_LOCK_TIMEOUT', 30)):
+        try:
+            return refresh()
+        finally:
+            cache.delete(REFRESH_LOCK_KEY)
+    deadline = time.monotonic() + getattr(settings, 'TAG_LIST_LOCK_WAIT', 2)
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        data = cache_namespaces.tags.get(TAG_LIST_KEY)
+        if data is not None:
+            return data
+    return compute()  # the lock holder is stuck or gone; answer without caching
+
+
+async def aget_tag_list():
+    """get_tag_list() for async views; only a stale or cold cache leaves the event loop."""
+    data = await cache_namespaces.tags.aget(TAG_LIST_KEY)
+    if data is not None and time.time() - data['computed_at'] <= getattr(settings, 'TAG_LIST_REFRESH_INTERVAL', 60):
+        return data
+    return await sync_to_async(get_tag_list)()
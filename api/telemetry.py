@@ -0,0 +1,385 @@
+import bisect
+import functools
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from .db.pool import pool_stats
+
+logger = logging.getLogger(__name__)
+
+# Per-endpoint request telemetry (TelemetryMiddleware, GET /api/metrics).
+# The middleware sits outermost and gives every request a RequestStats in a
+# context variable; an execute wrapper on every database connection times the
+# queries run on its behalf (including the ones ASGI views run in worker
+# threads, which copy the context), and InstrumentedCache counts cache hits and
+# misses. When the response is done (for streamed ones, when the stream is) the
+# request is folded into in-process counters and histograms keyed by resolved
+# URL name and method: wall time, DB time, queries, statements repeated within
+# the request (an N+1 shows up as one fingerprint run many times), cache hits
+# and misses, response size. GET /api/metrics renders them, plus the
+# connection pool stats, in the Prometheus text format. Like database_pools the
+# numbers are this process's; scrape every worker.
+# QUERY_BUDGETS caps the queries per request of an endpoint: going over is
+# logged, or raises QueryBudgetExceeded with QUERY_BUDGET_STRICT (the tests).
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+current = ContextVar('telemetry_request', default=None)
+counting_cache = ContextVar('telemetry_counting_cache', default=False)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+VALUES = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+
+
+def fingerprint(sql):
+    """The statement with its literals and placeholder lists folded, so shapes compare equal."""
+    sql = NUMBER.sub('?', STRING.sub('?', sql.replace('%s', '?')))
+    return VALUES.sub('(...)', ' '.join(sql.split()))
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()  # parallel ASGI queries record from several threads
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.size = 0
+
+    def query(self, sql, elapsed):
+        with self.lock:
+            self.queries += 1
+            self.db_time += elapsed
+            self.statements[sql] += 1
+
+    def cache(self, hits, misses):
+        with self.lock:
+            self.cache_hits += hits
+            self.cache_misses += misses
+
+    def repeated(self):
+        """{fingerprint: executions} of the statements run more than once."""
+        shapes = Counter()
+        for sql, count in self.statements.items():
+            shapes[fingerprint(sql)] += count
+        return {shape: count for shape, count in shapes.items() if count > 1}
+
+
+def record_query(execute, sql, params, many, context):
+    stats = current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.query(sql, time.perf_counter() - started)
+
+
+def instrument(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def instrument_new_connection(sender, connection, **kwargs):
+    instrument(connection)
+
+
+MISSING = object()
+
+
+@functools.cache
+def counting(backend_class):
+    """`backend_class` with its reads counted towards the current request."""
+
+    class CountingCache(backend_class):
+        # the outermost read counts: base get_many() loops over get(), some backends' get() calls get_many()
+        def get(self, key, default=None, version=None):
+            if counting_cache.get():
+                return super().get(key, default, version)
+            token = counting_cache.set(True)
+            try:
+                value = super().get(key, MISSING, version)
+            finally:
+                counting_cache.reset(token)
+            record_cache(int(value is not MISSING), int(value is MISSING))
+            return default if value is MISSING else value
+
+        def get_many(self, keys, version=None):
+            if counting_cache.get():
+                return super().get_many(keys, version)
+            keys = list(keys)
+            token = counting_cache.set(True)
+            try:
+                found = super().get_many(keys, version)
+            finally:
+                counting_cache.reset(token)
+            record_cache(len(found), len(keys) - len(found))
+            return found
+
+    CountingCache.__name__ = CountingCache.__qualname__ = f'Counting{backend_class.__name__}'
+    return CountingCache
+
+
+def record_cache(hits, misses):
+    stats = current.get()
+    if stats is not None:
+        stats.cache(hits, misses)
+
+
+class InstrumentedCache:
+    """
+    CACHES backend that counts hits and misses for the request telemetry.
+    OPTIONS['BACKEND'] is the backend doing the work; the rest of the entry is its.
+    """
+
+    def __new__(cls, location, params):
+        options = dict(params.get('OPTIONS', {}))
+        backend = import_string(options.pop('BACKEND'))
+        return counting(backend)(location, {**params, 'OPTIONS': options})
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            total += count
+            yield bound, total
+
+
+class EndpointMetrics:
+    def __init__(self):
+        self.responses = Counter()  # status code -> requests
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.db_duration = Histogram(DURATION_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+        self.repeated_queries = 0
+        self.cache = Counter()  # 'hit' / 'miss' -> reads
+        self.budget_exceeded = 0
+
+
+# (endpoint, method) -> EndpointMetrics, per process
+metrics = defaultdict(EndpointMetrics)
+metrics_lock = threading.Lock()
+
+
+def endpoint_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.url_name or match.route
+
+
+def query_budget(method, endpoint):
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    return budgets.get(f'{method} {endpoint}', budgets.get(endpoint, getattr(settings, 'QUERY_BUDGET_DEFAULT', None)))
+
+
+def observe(request, response, stats):
+    """Fold a finished request into the metrics; returns the budget overrun message, if any."""
+    elapsed = time.perf_counter() - stats.started
+    endpoint = endpoint_name(request)
+    repeated = stats.repeated()
+    budget = query_budget(request.method, endpoint)
+    over = budget is not None and stats.queries > budget
+    with metrics_lock:
+        recorded = metrics[(endpoint, request.method)]
+        recorded.responses[response.status_code] += 1
+        recorded.duration.observe(elapsed)
+        recorded.db_duration.observe(stats.db_time)
+        recorded.queries.observe(stats.queries)
+        recorded.size.observe(stats.size)
+        recorded.repeated_queries += sum(count - 1 for count in repeated.values())
+        recorded.cache['hit'] += stats.cache_hits
+        recorded.cache['miss'] += stats.cache_misses
+        recorded.budget_exceeded += over
+
+    threshold = getattr(settings, 'QUERY_REPEAT_THRESHOLD', 5)
+    for shape, count in repeated.items():
+        if count >= threshold:
+            logger.warning('%s %s ran one statement %d times, likely an N+1: %s',
+                           request.method, endpoint, count, shape)
+    if over:
+        return f'{request.method} {endpoint} ran {stats.queries} queries, over its budget of {budget}'
+    return None
+
+
+def measured(chunks, request, response, stats):
+    # streamed bodies run their queries after the middleware returned
+    iterator = iter(chunks)
+    try:
+        while True:
+            token = current.set(stats)
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                current.reset(token)
+            stats.size += len(chunk)
+            yield chunk
+    finally:
+        overrun = observe(request, response, stats)
+        if overrun:
+            logger.warning(overrun)  # too late to fail the request
+
+
+class TelemetryMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # connections opened before this module was loaded missed connection_created
+        for connection in connections.all(initialized_only=True):
+            instrument(connection)
+        stats = RequestStats()
+        token = current.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = current.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, stats)
+
+    def finish(self, request, response, stats):
+        if response.streaming:
+            if not response.is_async:
+                response.streaming_content = measured(response.streaming_content, request, response, stats)
+                return response
+        else:
+            stats.size = len(response.content)
+        overrun = observe(request, response, stats)
+        if overrun:
+            if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                raise QueryBudgetExceeded(overrun)
+            logger.warning(overrun)
+        return response
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def labels(**values):
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in values.items()) + '}'
+
+
+# pool_stats() keys -> (metric, type)
+POOL_METRICS = {
+    'size': ('api_db_pool_connections', 'gauge'),
+    'idle': ('api_db_pool_idle_connections', 'gauge'),
+    'in_use': ('api_db_pool_in_use_connections', 'gauge'),
+    'max_size': ('api_db_pool_max_connections', 'gauge'),
+    'saturation': ('api_db_pool_saturation', 'gauge'),
+    'max_wait': ('api_db_pool_max_wait_seconds', 'gauge'),
+    'checkouts': ('api_db_pool_checkouts_total', 'counter'),
+    'opened': ('api_db_pool_opened_total', 'counter'),
+    'discarded': ('api_db_pool_discarded_total', 'counter'),
+    'waits': ('api_db_pool_waits_total', 'counter'),
+    'timeouts': ('api_db_pool_timeouts_total', 'counter'),
+    'wait_time': ('api_db_pool_wait_seconds_total', 'counter'),
+}
+
+
+def render():
+    """The metrics of this process in the Prometheus text exposition format."""
+    lines = []
+
+    def family(name, kind, description):
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+
+    def histogram(name, description, attribute):
+        family(name, 'histogram', description)
+        for (endpoint, method), recorded in snapshot:
+            values = getattr(recorded, attribute)
+            for bound, count in values.cumulative():
+                lines.append(f'{name}_bucket{labels(endpoint=endpoint, method=method, le=bound)} {count}')
+            lines.append(f'{name}_sum{labels(endpoint=endpoint, method=method)} {values.sum}')
+            lines.append(f'{name}_count{labels(endpoint=endpoint, method=method)} {values.count}')
+
+    with metrics_lock:
+        snapshot = sorted(metrics.items())
+        family('api_requests_total', 'counter', 'Requests by endpoint (URL name), method and status.')
+        for (endpoint, method), recorded in snapshot:
+            for status, count in sorted(recorded.responses.items()):
+                lines.append(f'api_requests_total{labels(endpoint=endpoint, method=method, status=status)} {count}')
+        histogram('api_request_duration_seconds', 'Wall time of a request, streaming included.', 'duration')
+        histogram('api_request_db_duration_seconds', 'Time a request spent in database queries.', 'db_duration')
+        histogram('api_request_queries', 'Database queries per request.', 'queries')
+        histogram('api_response_size_bytes', 'Response body size.', 'size')
+        family('api_repeated_queries_total', 'counter',
+               'Executions of a statement already run in the same request (N+1 candidates).')
+        for (endpoint, method), recorded in snapshot:
+            lines.append(f'api_repeated_queries_total{labels(endpoint=endpoint, method=method)} '
+                         f'{recorded.repeated_queries}')
+        family('api_cache_reads_total', 'counter', 'Cache reads by result.')
+        for (endpoint, method), recorded in snapshot:
+            for result in ('hit', 'miss'):
+                lines.append(f'api_cache_reads_total{labels(endpoint=endpoint, method=method, result=result)} '
+                             f'{recorded.cache[result]}')
+        family('api_query_budget_exceeded_total', 'counter', 'Requests that ran more queries than QUERY_BUDGETS allows.')
+        for (endpoint, method), recorded in snapshot:
+            lines.append(f'api_query_budget_exceeded_total{labels(endpoint=endpoint, method=method)} '
+                         f'{recorded.budget_exceeded}')
+
+    pools = pool_stats()
+    for key, (name, kind) in POOL_METRICS.items():
+        family(name, kind, f'Connection pool {key.replace("_", " ")}.')
+        for pool, stats in sorted(pools.items()):
+            if stats.get(key) is not None:
+                lines.append(f'{name}{labels(pool=pool)} {stats[key]}')
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    with metrics_lock:
+        metrics.clear()
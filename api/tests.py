@@ -1,12 +1,51 @@
+import base64
+import contextlib
+import csv
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Count
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
 from rest_framework_simplejwt.tokens import RefreshToken
-from .models import User
+from .authentication import refresh_token_for
+from .db.pool import ConnectionPool, PoolTimeout
+from .renderers import FastJSONRenderer
+from .rows import ArticleRowSerializer, CommentRowSerializer
+from .serializers import ArticleSerializer, CommentSerializer
+from . import counters, facets, feed, ingest, profiles, related, routers, synthetic, tags, telemetry, trending
+from . import cache as cache_namespaces
+from .models import (
+    User, Article, Comment, Tag, Favorite, Follow, FeedEntry, SearchPosting, TrendingEpoch, TrendingScore, RelatedArticle,
+)
 
 def get_token_for_user(user):
-    return str(RefreshToken.for_user(user).access_token)
+    return str(refresh_token_for(user).access_token)
 
+# tests get a private in-memory cache instead of the shared file cache from settings
+TEST_CACHES = {'default': {'BACKEND': 'api.telemetry.InstrumentedCache',
+                           'OPTIONS': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}}
+
+# endpoints going over their QUERY_BUDGETS fail the test instead of logging;
+# buffered counter deltas are only flushed where a test asks for it, never by a timer firing mid-suite
+@override_settings(CACHES=TEST_CACHES, QUERY_BUDGET_STRICT=True, COUNTER_FLUSH_INTERVAL=3600)
 class BaseAPITestCase(APITestCase):
     def authenticate(self, token):
         self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
@@ -286,3 +325,1701 @@ class ArticleAPITestCase(BaseAPITestCase):
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertIn('No Article matches the given query.', response.data['detail'])
+
+class FeedAPITestCase(BaseAPITestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader', email='reader@example.com', password='TestPassword123')
+        self.author = User.objects.create_user(username='author', email='author@example.com', password='TestPassword123')
+        self.old_article = self.author.articles.create(slug='old', title='Old', description='d', body='b')
+        self.url = reverse('feed-articles')
+
+    def follow(self, username):
+        self.authenticate(get_token_for_user(self.reader))
+        return self.client.post(reverse('profile-follow', kwargs={'username': username}))
+
+    def test_follow_backfills_timeline(self):
+        self.assertEqual(self.follow('author').status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            list(FeedEntry.objects.filter(user=self.reader).values_list('article_id', flat=True)),
+            [self.old_article.id],
+        )
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([a['id'] for a in response.data['results']], [self.old_article.id])
+
+    def test_create_article_fans_out_to_followers(self):
+        self.follow('author')
+        self.authenticate(get_token_for_user(self.author))
+        response = self.client.post(reverse('articles-list'), {
+            'slug': 'new', 'title': 'New', 'description': 'd', 'body': 'b'
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(FeedEntry.objects.filter(user=self.reader, article_id=response.data['id']).exists())
+
+    def test_unfollow_prunes_timeline(self):
+        self.follow('author')
+        response = self.client.delete(reverse('profile-follow', kwargs={'username': 'author'}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_high_follower_author_merged_at_read_time(self):
+        self.follow('author')
+        cache.clear()  # drop the cached celebrity set computed before the follow existed
+        new_article = self.author.articles.create(slug='new', title='New', description='d', body='b')
+        feed.push_article(new_article)
+        self.assertFalse(FeedEntry.objects.filter(article=new_article).exists())
+        response = self.client.get(self.url)
+        self.assertIn(new_article.id, [a['id'] for a in response.data['results']])
+
+    def test_celebrity_articles_merged_across_pages(self):
+        celebrity = User.objects.create_user(username='celebrity', email='celebrity@example.com', password='TestPassword123')
+        fan = User.objects.create_user(username='fan', email='fan@example.com', password='TestPassword123')
+        Follow.objects.create(follower=fan, following=celebrity)
+        for i in range(3):
+            self.author.articles.create(slug=f'a{i}', title='t', description='d', body='b')
+            celebrity.articles.create(slug=f'c{i}', title='t', description='d', body='b')
+        self.follow('author')
+        self.follow('celebrity')  # backfilled while under the limit: those entries must not show twice
+        expected = list(Article.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        with self.settings(FEED_FANOUT_LIMIT=1):
+            cache.clear()
+            ids, url = [], self.url + '?cursor=&limit=3'
+            while url:
+                page = self.client.get(url).data
+                ids += [article['id'] for article in page['results']]
+                url = page['next']
+            self.assertEqual(ids, expected)
+            page = self.client.get(self.url, {'limit': 3, 'offset': 3}).data
+            self.assertEqual(page['count'], len(expected))
+            self.assertEqual([article['id'] for article in page['results']], expected[3:6])
+
+    @override_settings(FEED_MAX_LENGTH=2, FEED_TRIM_SLACK=0)
+    def test_publish_trims_timelines(self):
+        self.follow('author')
+        for i in range(3):
+            self.author.articles.create(slug=f'a{i}', title='t', description='d', body='b')
+        self.assertEqual(FeedEntry.objects.filter(user=self.reader).count(), 2)
+
+    @override_settings(FEED_MAX_LENGTH=2, FEED_TRIM_SLACK=0)
+    def test_timeline_is_capped(self):
+        for i in range(3):
+            self.author.articles.create(slug=f'a{i}', title='t', description='d', body='b')
+        self.follow('author')
+        self.assertEqual(FeedEntry.objects.filter(user=self.reader).count(), 2)
+
+class KeysetPaginationAPITestCase(BaseAPITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='TestPassword123')
+        self.tag = Tag.objects.create(name='python')
+        self.articles = []
+        for i in range(25):
+            article = self.user.articles.create(slug=f'a{i}', title=f'Title {i:02d}', description='d', body='b')
+            if i % 2 == 0:
+                article.tag.add(self.tag)
+            self.articles.append(article)
+        # identical timestamps force the id tiebreaker to keep pages stable
+        Article.objects.filter(id__in=[a.id for a in self.articles[:10]]).update(created_at=self.articles[0].created_at)
+        self.url = reverse('articles-list')
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            ids.extend(a['id'] for a in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_offset_mode_is_default(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], 25)
+
+    def test_cursor_walks_every_article_once_in_order(self):
+        ids = self.walk(self.url + '?cursor=')
+        expected = list(Article.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_cursor_with_tag_filter_and_ordering(self):
+        ids = self.walk(self.url + '?cursor=&limit=4&tag=python&ordering=title')
+        expected = list(Article.objects.filter(tag=self.tag).order_by('title', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url + '?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_with_invalid_values(self):
+        for position in (['not-a-date', 1], [{'x': 1}, 1], [None, None], ['2026-01-01T00:00:00', 'abc'], [True, 1]):
+            cursor = base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+            response = self.client.get(self.url, {'cursor': cursor})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, position)
+
+    def test_comments_cursor(self):
+        article = self.articles[0]
+        for i in range(12):
+            article.comments.create(author=self.user, body=f'c{i}')
+        ids = self.walk(reverse('comments-list-create', kwargs={'article_id': article.id}) + '?cursor=')
+        self.assertEqual(sorted(ids), sorted(article.comments.values_list('id', flat=True)))
+
+class ListQueryCountTestCase(BaseAPITestCase):
+    """Each list endpoint costs a fixed number of queries, however many authors are on the page."""
+
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader', email='reader@example.com', password='TestPassword123')
+        tag = Tag.objects.create(name='news')
+        self.article = None
+        for i in range(10):
+            author = User.objects.create_user(username=f'author{i}', email=f'author{i}@example.com', password='TestPassword123')
+            Follow.objects.create(follower=self.reader, following=author)
+            Follow.objects.create(follower=author, following=self.reader)
+            article = author.articles.create(slug=f'a{i}', title='t', description='d', body='b')
+            article.tag.add(tag)
+            self.article = self.article or article
+            self.article.comments.create(author=author, body='c')
+        feed.rebuild(self.reader)
+
+    def test_article_list_queries(self):
+        # count, articles + authors, tags
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('articles-list'))
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertNotIn('following', response.data['results'][0]['author'])
+
+    def test_feed_queries(self):
+        self.authenticate(get_token_for_user(self.reader))
+        cache.clear()
+        # token version (cold cache), celebrity set, count, articles + authors, tags, favorited ids
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('feed-articles'))
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_comment_list_queries(self):
+        # etag aggregate, count, comments + authors
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('comments-list-create', kwargs={'article_id': self.article.id}))
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertNotIn('following', response.data['results'][0]['author'])
+
+    def test_profile_following_is_paged(self):
+        response = self.client.get(reverse('profile', kwargs={'username': 'reader'}))
+        self.assertEqual(response.data['profile']['followingCount'], 10)
+        self.assertIs(response.data['profile']['following'], False)  # the reader's flag; the accounts are paged
+        # user, count, page
+        with self.assertNumQueries(3):
+            page = self.client.get(reverse('profile-following', kwargs={'username': 'reader'}), {'limit': 4})
+        self.assertEqual(page.data['count'], 10)
+        self.assertEqual([row['username'] for row in page.data['results']], ['author9', 'author8', 'author7', 'author6'])
+
+class FeedCacheTestCase(BaseAPITestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader', email='reader@example.com', password='TestPassword123')
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='TestPassword123')
+        self.author = User.objects.create_user(username='author', email='author@example.com', password='TestPassword123')
+        Follow.objects.create(follower=self.reader, following=self.author)
+        self.article = self.author.articles.create(slug='a', title='A', description='d', body='b')
+        self.url = reverse('feed-articles')
+
+    def feed_ids(self, user, query=''):
+        self.authenticate(get_token_for_user(user))
+        response = self.client.get(self.url + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [a['id'] for a in response.data['results']]
+
+    def test_repeat_read_is_served_from_cache(self):
+        self.feed_ids(self.reader)
+        self.authenticate(get_token_for_user(self.reader))
+        # token version is cached by the first request: no auth or feed queries at all
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_cache_is_per_user(self):
+        self.assertEqual(self.feed_ids(self.reader), [self.article.id])
+        self.assertEqual(self.feed_ids(self.other), [])
+
+    def test_cache_is_per_query(self):
+        self.assertEqual(self.feed_ids(self.reader), [self.article.id])
+        self.assertEqual(self.feed_ids(self.reader, '?offset=1'), [])
+
+    def test_tag_and_author_profile_changes_invalidate(self):
+        self.feed_ids(self.reader)
+        self.article.tag.add(Tag.objects.create(name='news'))
+        self.authenticate(get_token_for_user(self.reader))
+        self.assertEqual(self.client.get(self.url).data['results'][0]['tag'], ['news'])
+
+        self.author.bio = 'New bio'
+        self.author.save()
+        self.assertEqual(self.client.get(self.url).data['results'][0]['author']['bio'], 'New bio')
+
+    def test_publish_edit_delete_invalidate(self):
+        self.feed_ids(self.reader)
+        new_article = self.author.articles.create(slug='b', title='B', description='d', body='b')
+        self.assertEqual(self.feed_ids(self.reader), [new_article.id, self.article.id])
+
+        new_article.title = 'Edited'
+        new_article.save()
+        self.authenticate(get_token_for_user(self.reader))
+        self.assertEqual(self.client.get(self.url).data['results'][0]['title'], 'Edited')
+
+        new_article.delete()
+        self.assertEqual(self.feed_ids(self.reader), [self.article.id])
+
+    def test_follow_changes_invalidate(self):
+        self.assertEqual(self.feed_ids(self.other), [])
+        self.client.post(reverse('profile-follow', kwargs={'username': 'author'}))
+        self.assertEqual(self.feed_ids(self.other), [self.article.id])
+        self.client.delete(reverse('profile-follow', kwargs={'username': 'author'}))
+        self.assertEqual(self.feed_ids(self.other), [])
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_celebrity_publish_invalidates(self):
+        self.assertEqual(self.feed_ids(self.reader), [self.article.id])
+        new_article = self.author.articles.create(slug='b', title='B', description='d', body='b')
+        self.assertEqual(self.feed_ids(self.reader), [new_article.id, self.article.id])
+
+class ArticleCountersTestCase(BaseAPITestCase):
+    def setUp(self):
+        counters.discard()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='TestPassword123')
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='TestPassword123')
+        self.article = self.user.articles.create(slug='a', title='A', description='d', body='b')
+        self.second = self.user.articles.create(slug='b', title='B', description='d', body='b')
+
+    def favorite(self, user, article, method='post'):
+        self.authenticate(get_token_for_user(user))
+        url = reverse('favorite-article', kwargs={'article_id': article.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.client, method)(url)
+
+    @override_settings(COUNTER_FLUSH_INTERVAL=3600)
+    def test_counts_are_buffered_then_flushed_in_one_update(self):
+        TrendingEpoch.objects.update_or_create(pk=1, defaults={'at': timezone.now()})  # recent, so the flush has no rebase to do
+        self.favorite(self.user, self.article)
+        self.favorite(self.other, self.article)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.comments.create(author=self.other, body='c')
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.favorites_count, 0)
+
+        response = self.client.get(reverse('articles-detail', kwargs={'pk': self.article.id}))
+        self.assertEqual(response.data['favoritesCount'], 2)
+        self.assertEqual(response.data['commentsCount'], 1)
+
+        with self.assertNumQueries(5):  # savepoint/transaction bookkeeping + counters UPDATE + trending epoch + UPDATE
+            counters.flush()
+        self.article.refresh_from_db()
+        self.assertEqual((self.article.favorites_count, self.article.comments_count), (2, 1))
+
+    @override_settings(COUNTER_FLUSH_INTERVAL=3600)
+    def test_rolled_back_writes_are_not_counted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Favorite.objects.create(user=self.other, article=self.article)
+                self.article.comments.create(author=self.other, body='c')
+                transaction.set_rollback(True)
+        self.assertEqual(counters.pending(self.article.id, 'favorites_count'), 0)
+        self.assertEqual(counters.pending(self.article.id, 'comments_count'), 0)
+
+    @override_settings(COUNTER_FLUSH_INTERVAL=0.2)
+    def test_quiet_worker_flushes_on_a_timer(self):
+        flushed, threads = threading.Event(), []
+        def flush():
+            threads.append(threading.current_thread())
+            flushed.set()
+        with mock.patch.object(counters, 'flush', side_effect=flush):
+            counters.discard()
+            counters.incr(self.article.id, 'favorites_count')  # no later event comes to flush it
+            self.assertTrue(flushed.wait(5))
+        self.assertIsNot(threads[0], threading.current_thread())
+        counters.discard()
+        self.assertIsNone(counters._timer)
+
+    @override_settings(COUNTER_FLUSH_INTERVAL=0)
+    def test_unfavorite_decrements(self):
+        self.favorite(self.user, self.article)
+        self.favorite(self.user, self.article, 'delete')
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.favorites_count, 0)
+
+    def test_favorited_flag_is_per_user_and_batched(self):
+        self.favorite(self.other, self.second)
+        self.authenticate(get_token_for_user(self.other))
+        # count, articles + authors, favorites state, tags, favorited ids
+        # (token version was cached by the favorite call)
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('articles-list'))
+        flags = {a['id']: a['favorited'] for a in response.data['results']}
+        self.assertEqual(flags, {self.article.id: False, self.second.id: True})
+
+        self.authenticate(get_token_for_user(self.user))
+        response = self.client.get(reverse('articles-list'))
+        self.assertFalse(any(a['favorited'] for a in response.data['results']))
+
+    def test_recount(self):
+        Favorite.objects.create(user=self.other, article=self.article)
+        counters.discard()
+        Article.objects.update(favorites_count=42)
+        counters.recount()
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.favorites_count, 1)
+
+class ArticleSearchAPITestCase(BaseAPITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='TestPassword123')
+        self.django = self.user.articles.create(
+            slug='django', title='Django performance', description='Tuning the ORM', body='Indexes and queries.'
+        )
+        self.mysql = self.user.articles.create(
+            slug='mysql', title='Database tips', description='Tuning servers', body='Django apps need a database.'
+        )
+        self.other = self.user.articles.create(slug='other', title='Gardening', description='Roses', body='Soil.')
+        self.url = reverse('articles-search')
+
+    def search(self, query, extra=''):
+        response = self.client.get(f'{self.url}?q={query}{extra}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_ranks_title_matches_first(self):
+        ids = [a['id'] for a in self.search('django').data['results']]
+        self.assertEqual(ids, [self.django.id, self.mysql.id])
+
+    def test_prefix_and_all_terms_required(self):
+        self.assertEqual([a['id'] for a in self.search('tun datab').data['results']], [self.mysql.id])
+        self.assertEqual(self.search('').data['results'], [])
+
+    def test_tag_names_are_indexed(self):
+        tag = Tag.objects.create(name='horticulture')
+        self.other.tag.add(tag)
+        self.assertEqual([a['id'] for a in self.search('horticult').data['results']], [self.other.id])
+        self.other.tag.remove(tag)
+        self.assertEqual(self.search('horticult').data['results'], [])
+
+    def test_reindexes_on_save_and_delete(self):
+        self.other.title = 'Django gardens'
+        self.other.save()
+        self.assertIn(self.other.id, [a['id'] for a in self.search('django').data['results']])
+        self.other.delete()
+        self.assertNotIn(self.other.id, [a['id'] for a in self.search('django').data['results']])
+
+    def test_cursor_pages_through_ranked_results(self):
+        for i in range(5):
+            self.user.articles.create(slug=f's{i}', title='Search me', description='d', body='search ' * i)
+        response = self.search('search', '&limit=2')
+        ids = [a['id'] for a in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            ids.extend(a['id'] for a in response.data['results'])
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(len(set(ids)), 5)
+        self.assertNotIn('count', response.data)
+
+    def test_rebuild_command(self):
+        SearchPosting.objects.all().delete()
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual([a['id'] for a in self.search('gardening').data['results']], [self.other.id])
+
+    def test_feed_search_uses_index(self):
+        cache.clear()
+        reader = User.objects.create_user(username='reader', email='reader@example.com', password='TestPassword123')
+        Follow.objects.create(follower=reader, following=self.user)
+        feed.rebuild(reader)
+        self.authenticate(get_token_for_user(reader))
+        response = self.client.get(reverse('feed-articles') + '?search=roses')
+        self.assertEqual([a['id'] for a in response.data['results']], [self.other.id])
+
+class ArticleSlugAPITestCase(BaseAPITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='TestPassword123')
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='TestPassword123')
+        self.url = reverse('articles-list')
+        self.authenticate(get_token_for_user(self.user))
+
+    def test_slug_generated_and_unique_per_author(self):
+        data = {'title': 'Hello World', 'description': 'd', 'body': 'b'}
+        first = self.client.post(self.url, data)
+        second = self.client.post(self.url, data)
+        self.assertEqual(first.data['slug'], 'hello-world')
+        self.assertEqual(second.data['slug'], 'hello-world-2')
+        self.assertEqual(self.other.articles.create(title='Hello World', description='d', body='b').slug, 'hello-world')
+
+    def test_duplicate_explicit_slug_rejected(self):
+        self.user.articles.create(slug='taken', title='t', description='d', body='b')
+        response = self.client.post(self.url, {'slug': 'taken', 'title': 't', 'description': 'd', 'body': 'b'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('slug', response.data)
+        response = self.client.post(self.url, {'slug': '123', 'title': 't', 'description': 'd', 'body': 'b'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieve_by_slug(self):
+        mine = self.user.articles.create(slug='shared', title='Mine', description='d', body='b')
+        theirs = self.other.articles.create(slug='shared', title='Theirs', description='d', body='b')
+        url = reverse('articles-detail', kwargs={'pk': 'shared'})
+        self.assertEqual(self.client.get(url).data['id'], theirs.id)
+        self.assertEqual(self.client.get(url + '?author=testuser').data['id'], mine.id)
+        self.assertEqual(self.client.get(reverse('articles-detail', kwargs={'pk': 'missing'})).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_update_by_slug_checks_owner(self):
+        self.other.articles.create(slug='theirs', title='t', description='d', body='b')
+        url = reverse('articles-detail', kwargs={'pk': 'theirs'})
+        response = self.client.put(url, {'slug': 'theirs', 'title': 'x', 'description': 'd', 'body': 'b'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+class StatelessJWTAuthenticationTestCase(BaseAPITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='TestPassword123')
+        self.user.articles.create(slug='a', title='A', description='d', body='b')
+
+    def test_article_list_needs_no_auth_queries(self):
+        self.authenticate(get_token_for_user(self.user))
+        self.client.get(reverse('articles-list'))  # warms the token version cache
+        # count, articles + authors, favorites state, tags, favorited ids
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('articles-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_login_does_not_write_token(self):
+        response = self.client.post(reverse('user-login'), {'email': 'testuser@example.com', 'password': 'TestPassword123'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.token)
+        self.authenticate(response.data['user']['token'])
+        response = self.client.get(reverse('user-detail-update'))
+        self.assertEqual(response.data['user']['email'], 'testuser@example.com')
+
+    def test_revoked_token_is_rejected(self):
+        token = get_token_for_user(self.user)
+        self.authenticate(token)
+        self.assertEqual(self.client.get(reverse('user-detail-update')).status_code, status.HTTP_200_OK)
+        response = self.client.put(reverse('user-detail-update'), {'password': 'NewPassword456'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('refresh_token', response.data)
+        self.assertEqual(self.client.get(reverse('user-detail-update')).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.authenticate(response.data['user']['token'])
+        self.assertEqual(self.client.get(reverse('user-detail-update')).status_code, status.HTTP_200_OK)
+
+    def test_deactivation_revokes_tokens(self):
+        self.authenticate(get_token_for_user(self.user))
+        self.assertEqual(self.client.get(reverse('user-detail-update')).status_code, status.HTTP_200_OK)
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()
+        self.assertEqual(self.client.get(reverse('user-detail-update')).status_code, status.HTTP_401_UNAUTHORIZED)
+        user.is_active = True
+        user.save(update_fields=['is_active'])
+        self.assertEqual(self.client.get(reverse('user-detail-update')).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.authenticate(get_token_for_user(User.objects.get(pk=self.user.pk)))
+        self.assertEqual(self.client.get(reverse('user-detail-update')).status_code, status.HTTP_200_OK)
+
+    def test_profile_edit_keeps_tokens(self):
+        token = get_token_for_user(self.user)
+        self.authenticate(token)
+        response = self.client.put(reverse('user-detail-update'), {'bio': 'new bio'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('refresh_token', response.data)
+        self.assertEqual(response.data['user']['token'], token)
+        self.assertEqual(self.client.get(reverse('user-detail-update')).status_code, status.HTTP_200_OK)
+
+    def test_writes_work_with_claims_user(self):
+        self.authenticate(get_token_for_user(self.user))
+        response = self.client.post(reverse('articles-list'), {'title': 'New', 'description': 'd', 'body': 'b'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['author']['username'], 'testuser')
+        url = reverse('articles-detail', kwargs={'pk': response.data['id']})
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_legacy_token_still_accepted(self):
+        self.authenticate(str(RefreshToken.for_user(self.user).access_token))
+        self.assertEqual(self.client.get(reverse('user-detail-update')).status_code, status.HTTP_200_OK)
+
+class SharedCacheNamespaceTestCase(BaseAPITestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location, ignore_errors=True)
+        # two aliases on one directory stand in for two worker processes
+        backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': self.location}
+        settings_override = override_settings(CACHES={'default': backend, 'worker_b': backend})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_invalidate_is_seen_by_every_worker(self):
+        worker_a = cache_namespaces.CacheNamespace('tags')
+        worker_b = cache_namespaces.CacheNamespace('tags', alias='worker_b')
+        worker_b.set('tag_list', ['stale'])
+        self.assertEqual(worker_a.get('tag_list'), ['stale'])
+        worker_a.invalidate()
+        self.assertIsNone(worker_b.get('tag_list'))
+
+    @override_settings(TAG_LIST_REFRESH_ASYNC=False)
+    def test_tag_write_refreshes_cached_list(self):
+        Tag.objects.create(name='first')
+        self.assertEqual(self.client.get(reverse('tag-list')).data['tags'], ['first'])
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name='second')
+        self.assertEqual(self.client.get(reverse('tag-list')).data['tags'], ['first', 'second'])
+
+@override_settings(TAG_LIST_REFRESH_ASYNC=False)
+class TagListAPITestCase(BaseAPITestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('tag-list')
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='TestPassword123')
+
+    def test_empty_list_is_a_cache_hit(self):
+        self.assertEqual(self.client.get(self.url).data['tags'], [])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).data['tags'], [])
+
+    def test_ranked_by_recent_article_count(self):
+        python, django, old = (Tag.objects.create(name=name) for name in ('python', 'django', 'old'))
+        for i in range(3):
+            self.user.articles.create(slug=f'p{i}', title='t', description='d', body='b').tag.add(python, django if i else old)
+        stale = self.user.articles.create(slug='stale', title='t', description='d', body='b')
+        stale.tag.add(old)
+        Article.objects.filter(id=stale.id).update(created_at=timezone.now() - timedelta(days=365))
+        cache.clear()
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['tags'], ['python', 'django', 'old'])
+        self.assertEqual(response.data['counts'][0], {'name': 'python', 'articlesCount': 3})
+        self.assertEqual(response.data['counts'][2], {'name': 'old', 'articlesCount': 1})
+
+    def test_stale_list_is_served_while_refreshing(self):
+        Tag.objects.create(name='first')
+        self.client.get(self.url)
+        Tag.objects.filter(name='first').update(name='renamed')  # no signal, cache is now stale
+        with override_settings(TAG_LIST_REFRESH_INTERVAL=-1):
+            self.assertEqual(self.client.get(self.url).data['tags'], ['first'])
+        self.assertEqual(self.client.get(self.url).data['tags'], ['renamed'])
+
+    def test_cold_cache_waits_for_lock_holder(self):
+        Tag.objects.create(name='first')
+        cache.clear()
+        cache.add(tags.REFRESH_LOCK_KEY, 1)
+        payload = {'tags': ['from-other-worker'], 'counts': [], 'computed_at': time.time()}
+        timer = threading.Timer(0.1, cache_namespaces.tags.set, args=(tags.TAG_LIST_KEY, payload))
+        timer.start()
+        self.addCleanup(timer.cancel)
+        with self.assertNumQueries(0):
+            self.assertEqual(tags.get_tag_list()['tags'], ['from-other-worker'])
+
+class ConditionalGetAPITestCase(BaseAPITestCase):
+    def setUp(self):
+        cache.clear()
+        counters.discard()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='TestPassword123')
+        self.article = self.user.articles.create(slug='a', title='A', description='d', body='b')
+        self.article.comments.create(author=self.user, body='c')
+
+    def revalidate(self, url, response, **extra):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'], **extra)
+
+    def test_article_list_not_modified(self):
+        url = reverse('articles-list')
+        response = self.client.get(url)
+        self.assertIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+        # count and the page's rows; no tags, favorites or serialization
+        with self.assertNumQueries(2):
+            self.assertEqual(self.revalidate(url, response).status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(url, {'cursor': ''})
+        with self.assertNumQueries(1):
+            self.assertEqual(self.revalidate(url + '?cursor=', response).status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_article_list_changes_with_new_comment(self):
+        url = reverse('articles-list')
+        response = self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.comments.create(author=self.user, body='another')
+        self.assertEqual(counters.pending(self.article.id, 'comments_count'), 1)  # not flushed yet
+        revalidated = self.revalidate(url, response)
+        self.assertEqual(revalidated.status_code, status.HTTP_200_OK)
+        self.assertEqual(revalidated.data['results'][0]['commentsCount'], response.data['results'][0]['commentsCount'] + 1)
+
+    def test_article_retrieve_changes_with_new_comment(self):
+        url = reverse('articles-detail', kwargs={'pk': self.article.id})
+        response = self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.comments.create(author=self.user, body='another')
+        self.assertEqual(self.revalidate(url, response).status_code, status.HTTP_200_OK)
+
+    def test_article_list_changes_when_a_row_leaves_the_page(self):
+        url = reverse('articles-list')
+        response = self.client.get(url, {'limit': 1})
+        self.user.articles.create(slug='b', title='B', description='d', body='b')
+        self.assertEqual(self.revalidate(url + '?limit=1', response).status_code, status.HTTP_200_OK)
+
+    def test_article_list_etag_changes(self):
+        url = reverse('articles-list')
+        response = self.client.get(url)
+        self.assertEqual(self.revalidate(url + '?author=testuser', response).status_code, status.HTTP_200_OK)
+        self.article.tag.add(Tag.objects.create(name='new'))
+        self.assertEqual(self.revalidate(url, response).status_code, status.HTTP_200_OK)
+
+    def test_article_etag_is_per_reader(self):
+        url = reverse('articles-detail', kwargs={'pk': self.article.id})
+        response = self.client.get(url)
+        self.assertIn('Authorization', response['Vary'])
+        self.assertEqual(self.revalidate(url, response).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.authenticate(get_token_for_user(self.user))
+        self.assertEqual(self.revalidate(url, response).status_code, status.HTTP_200_OK)
+
+    def test_article_retrieve_changes_with_favorites(self):
+        self.authenticate(get_token_for_user(self.user))
+        url = reverse('articles-detail', kwargs={'pk': self.article.slug})
+        response = self.client.get(url)
+        self.client.post(reverse('favorite-article', kwargs={'article_id': self.article.id}))
+        revalidated = self.revalidate(url, response)
+        self.assertEqual(revalidated.status_code, status.HTTP_200_OK)
+        self.assertTrue(revalidated.data['favorited'])
+
+    def test_responses_carry_no_last_modified(self):
+        # deletions, unfavorites and counter flushes move no timestamp, so If-Modified-Since can't be trusted
+        for url in (reverse('articles-detail', kwargs={'pk': self.article.id}),
+                    reverse('comments-list-create', kwargs={'article_id': self.article.id})):
+            response = self.client.get(url)
+            self.assertIn('ETag', response)
+            self.assertNotIn('Last-Modified', response)
+
+    def test_comment_list_changes_after_delete(self):
+        url = reverse('comments-list-create', kwargs={'article_id': self.article.id})
+        self.article.comments.create(author=self.user, body='another')
+        response = self.client.get(url)
+        self.article.comments.order_by('id').first().delete()
+        self.assertEqual(self.revalidate(url, response).status_code, status.HTTP_200_OK)
+
+    def test_comment_list_not_modified_until_new_comment(self):
+        url = reverse('comments-list-create', kwargs={'article_id': self.article.id})
+        response = self.client.get(url)
+        self.assertEqual(self.revalidate(url, response).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.article.comments.create(author=self.user, body='another')
+        self.assertEqual(self.revalidate(url, response).status_code, status.HTTP_200_OK)
+
+    def test_profile_not_modified_until_follow(self):
+        other = User.objects.create_user(username='other', email='other@example.com', password='TestPassword123')
+        url = reverse('profile', kwargs={'username': 'testuser'})
+        response = self.client.get(url)
+        self.assertEqual(self.revalidate(url, response).status_code, status.HTTP_304_NOT_MODIFIED)
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(follower=self.user, following=other)
+        self.assertEqual(self.revalidate(url, response).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(reverse('profile', kwargs={'username': 'nobody'})).status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+class FastSerializationTestCase(BaseAPITestCase):
+    def setUp(self):
+        counters.discard()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='TestPassword123')
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='TestPassword123', bio='b io')
+        Follow.objects.create(follower=self.user, following=self.other)
+        zeta, alpha = Tag.objects.create(name='zeta'), Tag.objects.create(name='alpha')
+        for i in range(3):
+            article = self.other.articles.create(title=f'Article é {i}', description='"quoted"', body='</script>')
+            article.tag.add(zeta, alpha)
+            article.comments.create(author=self.user, body=f'comment {i}')
+        Favorite.objects.create(user=self.user, article=article)
+        self.request = RequestFactory().get('/')
+        self.request.user = self.user
+
+    def assertSameBytes(self, queryset, serializer_class, row_serializer):
+        expected = JSONRenderer().render(serializer_class(queryset, many=True, context={'request': self.request}).data)
+        rows = list(row_serializer.values(queryset))
+        self.assertEqual(FastJSONRenderer().render(row_serializer.serialize(rows, self.request)), expected)
+
+    def test_article_rows_match_serializer(self):
+        counters.incr(Article.objects.first().id, 'favorites_count', 2)
+        queryset = Article.objects.select_related('author').prefetch_related('tag').order_by('-created_at', '-id')
+        self.assertSameBytes(queryset, ArticleSerializer, ArticleRowSerializer())
+
+    def test_comment_rows_match_serializer(self):
+        queryset = Comment.objects.select_related('author').order_by('created_at')
+        self.assertSameBytes(queryset, CommentSerializer, CommentRowSerializer())
+
+    def test_list_endpoints_use_rows_with_cursor(self):
+        url = reverse('articles-list')
+        page = self.client.get(url, {'cursor': '', 'limit': 2}).json()
+        self.assertEqual(page['results'][0]['tag'], ['alpha', 'zeta'])
+        self.assertEqual(len(self.client.get(page['next']).json()['results']), 1)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_serializers', repeat=1, stdout=out)
+        self.assertNotIn('differs', out.getvalue())
+
+class SparseFieldsetAPITestCase(BaseAPITestCase):
+    def setUp(self):
+        counters.discard()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='TestPassword123')
+        self.article = self.user.articles.create(slug='a', title='A', description='d', body='long body')
+        self.url = reverse('articles-list')
+
+    def test_list_leaves_body_out_by_default(self):
+        with CaptureQueriesContext(connection) as queries:
+            article = self.client.get(self.url).data['results'][0]
+        self.assertNotIn('body', article)
+        self.assertIn('description', article)
+        self.assertFalse(any('"body"' in query['sql'] for query in queries))
+        self.assertEqual(self.client.get(self.url, {'omit': ''}).data['results'][0]['body'], 'long body')
+
+    def test_fields_and_omit(self):
+        article = self.client.get(self.url, {'fields': 'title,body,id'}).data['results'][0]
+        self.assertEqual(list(article), ['id', 'title', 'body'])
+        article = self.client.get(self.url, {'omit': 'tag,author'}).data['results'][0]
+        self.assertIn('body', article)
+        self.assertNotIn('author', article)
+
+    def test_unknown_field_rejected(self):
+        response = self.client.get(self.url, {'fields': 'title,secret'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'fields': ['Unknown field: secret']})
+        response = self.client.get(self.url, {'omit': 'hidden'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'omit': ['Unknown field: hidden']})
+
+    def test_retrieve_keeps_body_unless_narrowed(self):
+        url = reverse('articles-detail', kwargs={'pk': self.article.id})
+        self.assertEqual(self.client.get(url).data['body'], 'long body')
+        self.assertEqual(list(self.client.get(url, {'fields': 'slug,title'}).data), ['slug', 'title'])
+
+    def test_feed_omits_body(self):
+        other = User.objects.create_user(username='other', email='other@example.com', password='TestPassword123')
+        Follow.objects.create(follower=other, following=self.user)
+        feed.backfill(other, self.user)
+        self.authenticate(get_token_for_user(other))
+        results = self.client.get(reverse('feed-articles'), {'fields': 'slug,author'}).data['results']
+        self.assertEqual(results[0], {'slug': 'a', 'author': {'username': 'testuser', 'bio': None, 'image': None}})
+
+class ArticleIngestTestCase(BaseAPITestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='wire', email='wire@example.com', password='TestPassword123')
+        self.reader = User.objects.create_user(username='reader', email='reader@example.com', password='TestPassword123')
+        Follow.objects.create(follower=self.reader, following=self.author)
+        self.author.articles.create(slug='breaking-news', title='Breaking news', description='d', body='b')
+        self.url = reverse('articles-bulk')
+
+    def test_bulk_endpoint_reports_per_item(self):
+        self.authenticate(get_token_for_user(self.author))
+        items = [
+            {'title': 'Breaking news', 'body': 'b', 'tag': ['world', 'politics']},
+            {'title': 'Breaking news', 'body': 'b', 'tag': ['world']},
+            {'title': 'Taken', 'body': 'b', 'slug': 'breaking-news'},
+            {'title': '', 'body': 'b'},
+            {'title': 'Sports', 'body': 'b', 'slug': 'sports'},
+        ]
+        response = self.client.post(self.url, items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data['created'], 3)
+        results = response.data['results']
+        self.assertEqual([result.get('slug') for result in results],
+                         ['breaking-news-2', 'breaking-news-3', None, None, 'sports'])
+        self.assertIn('slug', results[2]['errors'])
+        self.assertIn('title', results[3]['errors'])
+
+        article = Article.objects.get(id=results[0]['id'])
+        self.assertEqual(sorted(article.tag.values_list('name', flat=True)), ['politics', 'world'])
+        self.assertTrue(FeedEntry.objects.filter(user=self.reader, article=article).exists())
+        self.assertTrue(SearchPosting.objects.filter(article=article, term='politics').exists())
+
+    def test_bulk_endpoint_query_count_is_per_chunk(self):
+        self.authenticate(get_token_for_user(self.author))
+        items = [{'title': f'Item {i}', 'body': 'b', 'tag': ['wire', f't{i}']} for i in range(20)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {'articles': items}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertLess(len(queries), 30)  # constant per chunk, related lists included
+        self.assertEqual(Article.objects.filter(tag__name='wire').count(), 20)
+
+    def test_bulk_endpoint_reports_item_list_errors(self):
+        self.authenticate(get_token_for_user(self.author))
+        items = [{'title': 'Long tag', 'body': 'b', 'tag': ['x' * 60]}, {'title': 'Fine', 'body': 'b'}]
+        response = self.client.post(self.url, items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(json.loads(response.content)['results'][0]['errors']['tag'].keys(), {'0'})
+
+    def test_bulk_endpoint_requires_auth_and_list(self):
+        self.assertEqual(self.client.post(self.url, [], format='json').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.authenticate(get_token_for_user(self.author))
+        self.assertEqual(self.client.post(self.url, {'title': 'x'}, format='json').status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+    def test_ingest_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as source:
+            source.write(json.dumps({'title': 'One', 'body': 'b', 'author': 'wire', 'tag': ['x']}) + '\n')
+            source.write('{not json\n')
+            source.write(json.dumps({'title': 'Two', 'body': 'b', 'author': 'nobody'}) + '\n')
+            source.write(json.dumps({'title': 'Three', 'body': 'b', 'author': 'reader'}) + '\n')
+        self.addCleanup(os.remove, source.name)
+        out, err = StringIO(), StringIO()
+        call_command('ingest_articles', source.name, chunk_size=2, stdout=out, stderr=err)
+        self.assertIn('Created 2 article(s), 2 failed.', out.getvalue())
+        self.assertIn('line 2:', err.getvalue())
+        self.assertIn('line 3:', err.getvalue())
+        self.assertTrue(Article.objects.filter(author=self.reader, slug='three').exists())
+
+class ExportAPITestCase(BaseAPITestCase):
+    def setUp(self):
+        counters.discard()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='TestPassword123')
+        self.tag = Tag.objects.create(name='django')
+        for i in range(5):
+            article = self.user.articles.create(title=f'Article, "{i}"', description='d', body='b\nb')
+            article.comments.create(author=self.user, body=f'c{i}')
+            if i % 2:
+                article.tag.add(self.tag)
+        self.authenticate(get_token_for_user(self.user))
+
+    def content(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_jsonl_matches_api_rows(self):
+        response = self.client.get(reverse('export-articles', kwargs={'export_format': 'jsonl'}))
+        records = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual([record['id'] for record in records], sorted(Article.objects.values_list('id', flat=True)))
+        self.assertEqual(records[1]['tag'], ['django'])
+        self.assertEqual(records[0]['author']['username'], 'testuser')
+        self.assertNotIn('favorited', records[0])
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_query_count_grows_per_chunk(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.content(self.client.get(reverse('export-articles', kwargs={'export_format': 'csv'}), {'tag': 'django'}))
+        self.assertEqual(len(queries), 3)  # two chunks of rows + tags, then the empty chunk
+
+    def test_csv_export(self):
+        response = self.client.get(reverse('export-comments', kwargs={'export_format': 'csv'}))
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.reader(StringIO(self.content(response))))
+        self.assertEqual(rows[0], ['id', 'body', 'article', 'author', 'created_at', 'updated_at'])
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[1][3], 'testuser')
+
+    def test_export_requires_auth(self):
+        self.client.credentials()
+        response = self.client.get(reverse('export-articles', kwargs={'export_format': 'jsonl'}))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_tag_and_author_feeds(self):
+        self.client.credentials()
+        rss = self.content(self.client.get(reverse('article-syndication',
+                                                   kwargs={'kind': 'tag', 'value': 'django', 'feed_type': 'rss'})))
+        self.assertTrue(rss.startswith('<?xml'))
+        self.assertEqual(rss.count('<item>'), 2)
+        self.assertIn('<category>django</category>', rss)
+        self.assertTrue(rss.rstrip().endswith('</rss>'))
+        atom = self.content(self.client.get(reverse('article-syndication',
+                                                    kwargs={'kind': 'author', 'value': 'testuser', 'feed_type': 'atom'})))
+        self.assertEqual(atom.count('<entry>'), 5)
+        self.assertTrue(atom.rstrip().endswith('</feed>'))
+        missing = self.client.get(reverse('article-syndication', kwargs={'kind': 'tag', 'value': 'nope', 'feed_type': 'rss'}))
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_export_command(self):
+        out = StringIO()
+        call_command('export_data', 'articles', format='csv', tag='django', chunk_size=1, stdout=out)
+        rows = list(csv.reader(StringIO(out.getvalue())))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1][2], 'Article, "1"')
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_HEALTH_CHECK_INTERVAL=60)
+class ReplicaRoutingTestCase(BaseAPITestCase):
+    def setUp(self):
+        cache.clear()
+        routers.replica_health.clear()
+        routers.replica_health['replica'] = (time.monotonic(), True)  # stand-in, never connected to
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='TestPassword123')
+        self.token = get_token_for_user(self.user)
+
+    def read_database(self, method='get', token=None):
+        request = getattr(RequestFactory(), method)('/', HTTP_AUTHORIZATION=f'Bearer {token}' if token else '')
+        chosen = []
+        def view(request):
+            chosen.append(routers.PrimaryReplicaRouter().db_for_read(Article))
+            return HttpResponse()
+        routers.ReplicaRoutingMiddleware(view)(request)
+        return chosen[0]
+
+    def test_safe_reads_use_replica_and_writes_the_primary(self):
+        self.assertEqual(self.read_database(), 'replica')
+        self.assertEqual(self.read_database('post'), 'default')
+        self.assertEqual(routers.PrimaryReplicaRouter().db_for_read(Article), 'default')  # outside a request
+
+    def test_user_pinned_to_primary_after_write(self):
+        self.assertEqual(self.read_database(token=self.token), 'replica')
+        self.read_database('post', token=self.token)
+        self.assertEqual(self.read_database(token=self.token), 'default')
+        self.assertEqual(self.read_database(), 'replica')  # other readers are unaffected
+        cache.delete(routers.pin_key(self.user.id))
+        self.assertEqual(self.read_database(token=self.token), 'replica')
+
+    def test_api_write_pins_user(self):
+        article = self.user.articles.create(title='A', description='d', body='b')
+        self.authenticate(self.token)
+        self.client.post(reverse('favorite-article', kwargs={'article_id': article.id}))
+        self.assertTrue(routers.is_pinned(self.user.id))
+
+    def test_register_and_login_pin_user(self):
+        response = self.client.post(reverse('user-register'), {
+            'username': 'newcomer', 'email': 'newcomer@example.com', 'password': 'TestPassword123',
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        newcomer = User.objects.get(username='newcomer')
+        self.assertTrue(routers.is_pinned(newcomer.id))
+        self.assertEqual(self.read_database(token=response.data['user']['token']), 'default')
+
+        self.assertFalse(routers.is_pinned(self.user.id))
+        response = self.client.post(reverse('user-login'), {'email': 'testuser@example.com', 'password': 'TestPassword123'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(routers.is_pinned(self.user.id))
+
+    def test_unhealthy_replica_falls_back_to_primary(self):
+        routers.replica_health.clear()
+        self.assertFalse(routers.check_replica('replica'))  # no such connection
+        self.assertEqual(self.read_database(), 'default')
+
+    @override_settings(REPLICA_MAX_LAG=-1)
+    def test_lagging_replica_is_skipped(self):
+        self.assertFalse(routers.check_replica('default'))
+
+    def test_streaming_body_keeps_routing(self):
+        def view(request):
+            chunks = (routers.PrimaryReplicaRouter().db_for_read(Article) for _ in range(2))
+            return StreamingHttpResponse(chunks)
+        response = routers.ReplicaRoutingMiddleware(view)(RequestFactory().get('/'))
+        self.assertEqual(b''.join(response.streaming_content), b'replicareplica')
+
+class ConnectionPoolTestCase(BaseAPITestCase):
+    def make_pool(self, **options):
+        self.opened = []
+        def connect():
+            connection = sqlite3.connect(':memory:', check_same_thread=False)
+            self.opened.append(connection)
+            return connection
+        check = lambda connection: connection.execute('SELECT 1')
+        return ConnectionPool(connect, check=check, **options)
+
+    def test_connections_are_reused(self):
+        pool = self.make_pool(max_size=2)
+        first = pool.checkout()
+        pool.checkin(first)
+        self.assertIs(pool.checkout(), first)
+        self.assertEqual(len(self.opened), 1)
+        self.assertEqual(pool.stats()['in_use'], 1)
+
+    def test_fill_opens_min_size(self):
+        pool = self.make_pool(min_size=2, max_size=4)
+        pool.fill()
+        self.assertEqual(pool.stats()['idle'], 2)
+
+    def test_saturated_pool_waits_then_times_out(self):
+        pool = self.make_pool(max_size=1, timeout=0.05)
+        held = pool.checkout()
+        with self.assertRaises(PoolTimeout):
+            pool.checkout()
+        threading.Timer(0.02, pool.checkin, [held]).start()
+        pool.timeout = 2
+        with self.assertLogs('api.db.pool', 'WARNING'):
+            self.assertIs(pool.checkout(), held)
+        stats = pool.stats()
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertEqual(stats['waits'], 1)
+        self.assertEqual(stats['saturation'], 1.0)
+        self.assertGreater(stats['wait_time'], 0)
+
+    def test_dead_and_expired_connections_are_replaced(self):
+        pool = self.make_pool(max_size=2)
+        dead = pool.checkout()
+        pool.checkin(dead)
+        dead.close()  # the health check fails on checkout
+        fresh = pool.checkout()
+        self.assertIsNot(fresh, dead)
+        pool.max_lifetime = 0
+        pool.checkin(fresh)  # too old to go back
+        self.assertEqual(pool.stats()['size'], 0)
+        self.assertEqual(pool.stats()['discarded'], 2)
+
+    def test_stats_endpoint_is_admin_only(self):
+        user = User.objects.create_user(username='testuser', email='testuser@example.com', password='TestPassword123')
+        self.authenticate(get_token_for_user(user))
+        self.assertEqual(self.client.get(reverse('database-pools')).status_code, status.HTTP_403_FORBIDDEN)
+        User.objects.filter(id=user.id).update(is_staff=True)
+        self.assertIn('pools', self.client.get(reverse('database-pools')).data)
+
+@override_settings(COUNTER_FLUSH_INTERVAL=0)
+class TrendingAPITestCase(BaseAPITestCase):
+    def setUp(self):
+        counters.discard()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='TestPassword123')
+        self.other = User.objects.create_user(username='other', email='other@example.com', password='TestPassword123')
+        self.python = Tag.objects.create(name='python')
+        self.django = Tag.objects.create(name='django')
+        self.quiet = self.user.articles.create(title='Quiet', description='d', body='b')
+        self.liked = self.user.articles.create(title='Liked', description='d', body='b')
+        self.discussed = self.user.articles.create(title='Discussed', description='d', body='b')
+        self.liked.tag.add(self.python)
+        self.discussed.tag.add(self.python, self.django)
+        self.authenticate(get_token_for_user(self.other))
+
+    def trending_ids(self, **params):
+        response = self.client.get(reverse('articles-trending'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [article['id'] for article in response.data['results']]
+
+    def test_weight_halves_per_half_life(self):
+        now = timezone.now()
+        earlier = now - timedelta(seconds=trending.half_life())
+        self.assertAlmostEqual(trending.weight('favorite', now) / trending.weight('favorite', earlier), 2)
+        self.assertAlmostEqual(trending.weight('comment', now) / trending.weight('favorite', now), 2)
+
+    def test_engagement_ranks_articles_globally_and_per_tag(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('favorite-article', kwargs={'article_id': self.liked.id}))
+            self.client.post(reverse('comments-list-create', kwargs={'article_id': self.discussed.id}), {'body': 'c'})
+        self.assertEqual(self.trending_ids(), [self.discussed.id, self.liked.id])  # a comment outweighs a favorite
+        self.assertEqual(self.trending_ids(tag='python'), [self.discussed.id, self.liked.id])
+        self.assertEqual(self.trending_ids(tag='django'), [self.discussed.id])
+        self.assertEqual(self.trending_ids(tag='missing'), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('favorite-article', kwargs={'article_id': self.liked.id}))
+        self.assertEqual(self.trending_ids(), [self.discussed.id])
+
+    def test_older_engagement_decays(self):
+        old = timezone.now() - timedelta(seconds=3 * trending.half_life())
+        for _ in range(3):
+            trending.record(self.discussed.id, 'comment', old)  # 6 points, three half-lives ago
+        trending.record(self.liked.id, 'favorite', timezone.now())  # 1 point now
+        self.assertEqual(self.trending_ids(), [self.liked.id, self.discussed.id])
+
+    def test_list_is_an_index_read(self):
+        trending.record(self.liked.id, 'favorite', timezone.now())
+        # page of articles + authors + score, tags, favorited ids
+        with self.assertNumQueries(3):
+            self.trending_ids(tag='python')
+
+    def test_pages_do_not_repeat_articles(self):
+        now = timezone.now()
+        articles = [self.quiet, self.liked, self.discussed]
+        for n in range(4):
+            article = self.user.articles.create(title=f'More {n}', description='d', body='b')
+            article.tag.add(self.python, self.django)
+            articles.append(article)
+        for n, article in enumerate(articles):
+            for _ in range(n % 3 + 1):  # tied scores too, so the id tiebreaker is crossed
+                trending.record(article.id, 'favorite', now)
+        counters.flush()
+        for params in ({}, {'tag': 'python'}):
+            expected = self.trending_ids(limit=100, **params)
+            seen, url, query = [], reverse('articles-trending'), {'limit': 2, **params}
+            while url:
+                response = self.client.get(url, query)
+                self.assertNotIn('count', response.data)
+                seen += [article['id'] for article in response.data['results']]
+                url, query = response.data['next'], None
+            self.assertEqual(seen, expected)
+            self.assertEqual(len(seen), len(set(seen)))
+
+    def test_rebase_rescales_scores_and_buffered_deltas(self):
+        self.addCleanup(trending.use_epoch, None)  # the moved epoch is rolled back with the test
+        now = timezone.now()
+        trending.record(self.discussed.id, 'comment', now - timedelta(seconds=trending.half_life()))
+        trending.record(self.liked.id, 'favorite', now)
+        counters.flush()
+        trending.record(self.liked.id, 'favorite', now)  # still buffered, scaled to the old epoch
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('rebase_trending', stdout=StringIO())
+        self.assertEqual(TrendingEpoch.objects.get().at, trending.epoch())
+        self.assertLess(abs(trending.epoch() - timezone.now()), timedelta(minutes=1))
+        trending.record(self.liked.id, 'favorite', now)  # scaled to the new epoch
+        counters.flush()
+        scores = dict(TrendingScore.objects.filter(tag=None).values_list('article_id', 'score'))
+        self.assertAlmostEqual(scores[self.discussed.id], 1, places=3)  # 2 points, one half-life ago
+        self.assertAlmostEqual(scores[self.liked.id], 3, places=3)  # the one buffered across the rebase included
+        self.assertEqual(self.trending_ids(), [self.liked.id, self.discussed.id])
+
+    def test_weights_stay_in_range_long_after_the_first_epoch(self):
+        self.addCleanup(trending.use_epoch, None)
+        later = trending.initial_epoch() + timedelta(seconds=2000 * trending.half_life())
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            with self.captureOnCommitCallbacks(execute=True):
+                trending.rebase()
+        self.assertEqual(trending.weight('favorite', later), 1)
+
+    def test_flush_rebases_a_stale_epoch(self):
+        self.addCleanup(trending.use_epoch, None)
+        trending.record(self.liked.id, 'favorite', timezone.now())
+        counters.flush()
+        later = trending.epoch() + timedelta(seconds=2000 * trending.half_life())
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            trending.record(self.discussed.id, 'comment', later)  # would overflow scaled to the old epoch
+            with self.captureOnCommitCallbacks(execute=True):
+                counters.flush()
+        self.assertEqual(trending.stored_epoch(), later)
+        scores = dict(TrendingScore.objects.filter(tag=None).values_list('article_id', 'score'))
+        self.assertEqual(scores[self.discussed.id], 2)
+        self.assertEqual(scores[self.liked.id], 0)  # decayed 2000 half-lives
+
+    def test_tag_rows_follow_article_tags(self):
+        trending.record(self.quiet.id, 'favorite', timezone.now())
+        self.quiet.tag.add(self.django)
+        self.assertEqual(self.trending_ids(tag='django'), [self.quiet.id])
+        self.quiet.tag.remove(self.django)
+        self.django.articles.clear()
+        self.assertEqual(self.trending_ids(tag='django'), [])
+        self.assertFalse(TrendingScore.objects.filter(tag=self.django).exists())
+
+    def test_rebuild_matches_incremental_scores(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.create(user=self.other, article=self.liked)
+            Favorite.objects.create(user=self.user, article=self.liked)
+            self.discussed.comments.create(author=self.other, body='c')
+        articles = ingest.ingest([{'title': 'Imported', 'body': 'b', 'tag': ['django']}], author=self.user)
+        counters.flush()
+        incremental = {(row.article_id, row.tag_id): row.score for row in TrendingScore.objects.all()}
+        self.assertIn((articles[0]['id'], self.django.id), incremental)
+        old_epoch = trending.stored_epoch()
+
+        TrendingScore.objects.all().delete()
+        call_command('rebuild_trending', stdout=StringIO())
+        rebuilt = {(row.article_id, row.tag_id): row.score for row in TrendingScore.objects.all()}
+        self.assertEqual(rebuilt.keys(), incremental.keys())
+        factor = trending.scale(old_epoch, trending.stored_epoch())  # rebuild also moves the epoch to now
+        for key, score in incremental.items():
+            self.assertAlmostEqual(rebuilt[key], score * factor)
+
+
+class RelatedArticlesAPITestCase(BaseAPITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='TestPassword123')
+        self.common = Tag.objects.create(name='common')
+        self.niche = Tag.objects.create(name='niche')
+        self.articles = {}
+        for title, tag_list in (('a', [self.common, self.niche]), ('b', [self.common, self.niche]),
+                                ('c', [self.common]), ('d', [self.niche]), ('e', []), ('f', [self.common]),
+                                ('g', [self.common])):
+            article = self.user.articles.create(title=title, description='d', body='b')
+            article.tag.add(*tag_list)
+            self.articles[title] = article
+        # incremental refreshes score with the IDFs of their moment; start from current ones
+        related.rebuild()
+
+    def related_titles(self, title):
+        response = self.client.get(reverse('articles-related', kwargs={'pk': self.articles[title].id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [article['title'] for article in response.data['articles']]
+
+    def test_shared_rare_tags_rank_first_then_recency(self):
+        # b shares both tags, the niche tag outweighs the common one, newer beats older
+        self.assertEqual(self.related_titles('a'), ['b', 'd', 'g', 'f', 'c'])
+        self.assertEqual(self.related_titles('e'), [])
+
+    def test_older_candidates_rank_lower(self):
+        Article.objects.filter(id=self.articles['g'].id).update(created_at=timezone.now() - timedelta(days=365))
+        related.refresh([self.articles['a'].id])
+        self.assertEqual(self.related_titles('a'), ['b', 'd', 'f', 'c', 'g'])
+
+    def test_tag_changes_refresh_both_directions(self):
+        self.articles['c'].tag.add(self.niche)
+        self.assertEqual(self.related_titles('a')[:3], ['b', 'c', 'd'])  # c now shares both tags
+        self.articles['b'].tag.clear()
+        self.assertNotIn('b', self.related_titles('a'))
+        self.assertEqual(self.related_titles('b'), [])
+        self.niche.articles.clear()
+        self.assertEqual(self.related_titles('d'), [])
+        self.assertNotIn('d', self.related_titles('a'))
+
+    @override_settings(RELATED_ARTICLES_COUNT=2)
+    def test_lists_are_capped(self):
+        related.rebuild()
+        self.assertEqual(self.related_titles('a'), ['b', 'd'])
+        newest = self.user.articles.create(title='h', description='d', body='b')
+        newest.tag.add(self.common, self.niche)
+        self.assertEqual(self.related_titles('a'), ['b', 'h'])  # h pushes out d
+        self.assertEqual(RelatedArticle.objects.filter(article=self.articles['a']).count(), 2)
+
+    def test_read_is_constant_queries(self):
+        with self.assertNumQueries(3):  # article id, related rows + authors, tags
+            self.related_titles('a')
+        response = self.client.get(reverse('articles-related', kwargs={'pk': 999999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_rebuild_matches_incremental_lists(self):
+        incremental = self.related_titles('a')
+        RelatedArticle.objects.all().delete()
+        call_command('rebuild_related', stdout=StringIO())
+        self.assertEqual(self.related_titles('a'), incremental)
+
+
+@override_settings(TAG_LIST_REFRESH_ASYNC=False)
+class SyntheticDataTestCase(BaseAPITestCase):
+    def setUp(self):
+        self.now = timezone.now()  # one clock for every dataset, or a second boundary between them shifts dates
+
+    def generate(self, prefix, seed=7, **sizes):
+        sizes = {'users': 30, 'articles': 60, 'comments': 120, 'tags': 8, **sizes}
+        synthetic.Generator(prefix=prefix, seed=seed, now=self.now).generate(**sizes)
+
+    def test_same_seed_same_dataset(self):
+        self.generate('first')
+        self.generate('second')
+        shape = lambda prefix: list(
+            Article.objects.filter(slug__startswith=f'{prefix}-').order_by('id')
+            .values_list('title', 'created_at', 'comments__body')
+        )
+        self.assertEqual(shape('first'), shape('second'))
+        self.assertEqual(Favorite.objects.filter(user__username__startswith='first').count(),
+                         Favorite.objects.filter(user__username__startswith='second').count())
+
+    def test_dataset_is_skewed_and_timestamped(self):
+        self.generate('skew', users=100, follows_per_user=3)
+        followers = list(
+            User.objects.filter(username__startswith='skew').annotate(total=Count('follower_relations'))
+            .order_by('-total').values_list('total', flat=True)
+        )
+        self.assertGreater(followers[0], 5 * max(followers[len(followers) // 2], 1))  # celebrities vs median
+        created = Article.objects.filter(slug__startswith='skew-').order_by('id').values_list('created_at', flat=True)
+        self.assertEqual(list(created), sorted(created))
+        self.assertLess(created[0], timezone.now() - timedelta(days=30))
+        for comment in Comment.objects.filter(article__slug__startswith='skew-').select_related('article')[:50]:
+            self.assertGreaterEqual(comment.created_at, comment.article.created_at)
+        synthetic.delete('skew')
+        self.assertFalse(Article.objects.filter(slug__startswith='skew-').exists())
+
+    def test_benchmark_runner_reports_every_endpoint(self):
+        call_command('generate_data', users=20, articles=40, comments=60, tags=5, stdout=StringIO())
+        User.objects.create_user(username='admin', email='admin@example.org', password='x', is_staff=True)
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'run.json')
+            err = StringIO()
+            call_command('benchmark_api', requests=2, warmup=0, output=output, stdout=StringIO(), stderr=err)
+            call_command('benchmark_api', requests=2, warmup=0, only=['feed'], compare=output, stdout=StringIO())
+            with open(output) as results:
+                run = json.load(results)
+        self.assertEqual(err.getvalue(), '')  # a scenario for every URL name
+        self.assertEqual(run['meta']['database'], connection.vendor)
+        self.assertEqual(run['meta']['articles'], 40)
+        failed = {name: result['status'] for name, result in run['endpoints'].items() if result['errors']}
+        self.assertEqual(failed, {})
+        self.assertEqual(Article.objects.count(), 40)  # write scenarios were rolled back
+        for result in run['endpoints'].values():
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+
+
+@override_settings(ROOT_URLCONF='news_project.asgi_urls', ASYNC_PARALLEL_QUERIES=False)
+class AsyncViewsTestCase(BaseAPITestCase):
+    def setUp(self):
+        cache.clear()
+        counters.discard()
+        self.author = User.objects.create_user(username='author', email='author@example.com', password='TestPassword123')
+        self.reader = User.objects.create_user(username='reader', email='reader@example.com', password='TestPassword123')
+        Follow.objects.create(follower=self.reader, following=self.author)
+        self.tag = Tag.objects.create(name='django')
+        for i in range(3):
+            article = self.author.articles.create(title=f'Article {i}', description='d', body='b')
+            article.tag.add(self.tag)
+        feed.rebuild(self.reader)
+        self.article = article
+        self.headers = {'Authorization': f'Bearer {get_token_for_user(self.reader)}'}
+
+    @contextlib.asynccontextmanager
+    async def committing(self):
+        # on_commit callbacks queue on the connection of the thread the ORM runs in, not the event loop's
+        capture = self.captureOnCommitCallbacks(execute=True)
+        await sync_to_async(capture.__enter__)()
+        try:
+            yield
+        finally:
+            await sync_to_async(capture.__exit__)(None, None, None)
+
+    def sync_get(self, path, **params):
+        cache.clear()
+        with self.settings(ROOT_URLCONF='news_project.urls'):
+            return self.client.get(path, params, headers=self.headers)
+
+    async def test_feed_matches_sync_view(self):
+        path = '/api/articles/feed/'
+        for params in ({}, {'cursor': '', 'limit': 2}, {'fields': 'slug,tag,favorited'}):
+            response = await self.async_client.get(path, params, headers=self.headers)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            expected = await sync_to_async(self.sync_get)(path, **params)
+            self.assertEqual(response.content, expected.content)
+        self.assertEqual((await self.async_client.get(path)).status_code, status.HTTP_401_UNAUTHORIZED)
+        invalid = await self.async_client.get(path, {'cursor': 'nope'}, headers=self.headers)
+        self.assertEqual(invalid.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_profile_matches_sync_view(self):
+        path = '/api/profile/reader/'
+        response = await self.async_client.get(path)
+        expected = await sync_to_async(self.sync_get)(path)
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response['ETag'], expected['ETag'])
+        revalidated = await self.async_client.get(path, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(revalidated.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual((await self.async_client.get('/api/profile/nobody/')).status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(COUNTER_FLUSH_INTERVAL=3600)  # keep the favorite delta buffered for the assertion
+    async def test_follow_and_favorite(self):
+        follow = '/api/profile/author/follow'
+        self.assertEqual((await self.async_client.delete(follow, headers=self.headers)).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(await FeedEntry.objects.filter(user=self.reader).aexists())
+        self.assertEqual((await User.objects.aget(username='author')).followers_count, 0)
+        self.assertEqual((await self.async_client.post(follow, headers=self.headers)).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(await FeedEntry.objects.filter(user=self.reader).acount(), 3)
+        self.assertEqual((await User.objects.aget(username='author')).followers_count, 1)
+        self.assertEqual((await self.async_client.post(follow, headers=self.headers)).status_code, status.HTTP_200_OK)
+        own = await self.async_client.post('/api/profile/reader/follow', headers=self.headers)
+        self.assertEqual(own.status_code, status.HTTP_400_BAD_REQUEST)
+        missing = await self.async_client.post('/api/profile/nobody/follow', headers=self.headers)
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+        unauthenticated = await self.async_client.post(follow)
+        self.assertEqual(unauthenticated.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('Bearer', unauthenticated['WWW-Authenticate'])
+
+        favorite = f'/api/articles/{self.article.id}/favorite/'
+        async with self.committing():
+            self.assertEqual((await self.async_client.post(favorite, headers=self.headers)).status_code,
+                             status.HTTP_201_CREATED)
+        self.assertEqual(counters.pending(self.article.id, 'favorites_count'), 1)
+        self.assertEqual((await self.async_client.delete(favorite, headers=self.headers)).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual((await self.async_client.delete(favorite, headers=self.headers)).status_code, status.HTTP_404_NOT_FOUND)
+        missing = await self.async_client.post('/api/articles/999999/favorite/', headers=self.headers)
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(TAG_LIST_REFRESH_ASYNC=False)
+    async def test_tag_list(self):
+        response = await self.async_client.get('/api/tags/')
+        self.assertEqual(json.loads(response.content)['tags'], ['django'])
+        created = await self.async_client.post('/api/tags/', {'name': 'python'}, content_type='application/json')
+        self.assertEqual(created.status_code, status.HTTP_201_CREATED)
+
+class TelemetryTestCase(BaseAPITestCase):
+    def setUp(self):
+        cache.clear()
+        telemetry.reset()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='TestPassword123')
+        self.article = self.user.articles.create(title='A', description='d', body='b')
+
+    def recorded(self, endpoint, method='GET'):
+        return telemetry.metrics[(endpoint, method)]
+
+    def test_requests_are_recorded_per_endpoint(self):
+        self.authenticate(get_token_for_user(self.user))
+        path = reverse('articles-detail', kwargs={'pk': self.article.id})
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(path)
+        self.client.get(path)
+        recorded = self.recorded('articles-detail')
+        self.assertEqual(recorded.responses[200], 2)
+        self.assertEqual(recorded.duration.count, 2)
+        self.assertEqual(recorded.queries.count, 2)
+        self.assertGreaterEqual(recorded.queries.sum, len(captured))
+        self.assertEqual(recorded.size.sum, 2 * len(response.content))
+        self.assertGreater(recorded.cache['hit'] + recorded.cache['miss'], 0)
+        self.assertEqual(recorded.repeated_queries, 0)
+
+    def test_cache_reads_are_counted(self):
+        stats = telemetry.RequestStats()
+        token = telemetry.current.set(stats)
+        try:
+            cache.set('present', 1)
+            cache.get('present')
+            cache.get('absent')
+            self.assertEqual(cache.get_many(['present', 'absent']), {'present': 1})
+        finally:
+            telemetry.current.reset(token)
+        self.assertEqual((stats.cache_hits, stats.cache_misses), (2, 2))
+
+    def test_repeated_statements_are_logged(self):
+        def view(request):
+            for article_id in range(5):
+                Article.objects.filter(id=article_id).exists()
+            return HttpResponse()
+        with self.assertLogs('api.telemetry', 'WARNING') as logs:
+            telemetry.TelemetryMiddleware(view)(RequestFactory().get('/'))
+        self.assertIn('N+1', logs.output[0])
+        self.assertEqual(self.recorded('unresolved').repeated_queries, 4)
+
+    def test_fingerprint_folds_literals(self):
+        self.assertEqual(
+            telemetry.fingerprint("SELECT \"a\".\"id\" FROM \"a\" WHERE \"a\".\"id\" IN (%s, %s) AND \"b1\" = 'x' LIMIT 21"),
+            'SELECT "a"."id" FROM "a" WHERE "a"."id" IN (...) AND "b1" = ? LIMIT ?',
+        )
+
+    def test_streamed_responses_are_recorded_when_consumed(self):
+        def view(request):
+            return StreamingHttpResponse(str(Article.objects.count()) for _ in range(2))
+        response = telemetry.TelemetryMiddleware(view)(RequestFactory().get('/'))
+        self.assertNotIn(('unresolved', 'GET'), telemetry.metrics)
+        self.assertEqual(b''.join(response.streaming_content), b'11')
+        self.assertEqual(self.recorded('unresolved').queries.sum, 2)
+        self.assertEqual(self.recorded('unresolved').size.sum, 2)
+
+    @override_settings(QUERY_BUDGETS={'GET articles-list': 1})
+    def test_query_budget(self):
+        with self.assertRaises(telemetry.QueryBudgetExceeded):
+            self.client.get(reverse('articles-list'))
+        with override_settings(QUERY_BUDGET_STRICT=False), self.assertLogs('api.telemetry', 'WARNING'):
+            self.assertEqual(self.client.get(reverse('articles-list')).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.recorded('articles-list').budget_exceeded, 2)
+        self.assertEqual(self.client.get(reverse('articles-trending')).status_code, status.HTTP_200_OK)
+
+    def test_metrics_endpoint(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_404_NOT_FOUND)
+        self.client.get(reverse('articles-list'))
+        with override_settings(METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_401_UNAUTHORIZED)
+            response = self.client.get(reverse('metrics'), headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        self.assertIn('api_requests_total{endpoint="articles-list",method="GET",status="200"} 1', text)
+        self.assertIn('api_request_queries_bucket{endpoint="articles-list",method="GET",le="+Inf"} 1', text)
+        self.assertIn('# TYPE api_request_duration_seconds histogram', text)
+
+@override_settings(TAG_LIST_REFRESH_ASYNC=False)
+class TagFacetsAPITestCase(BaseAPITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', email='testuser@example.com', password='TestPassword123')
+        self.python, self.django, self.web, self.rust = (
+            Tag.objects.create(name=name) for name in ('python', 'django', 'web', 'rust')
+        )
+        self.first = self.user.articles.create(title='First', description='d', body='b')
+        self.second = self.user.articles.create(title='Second', description='d', body='b')
+        self.third = self.user.articles.create(title='Third', description='d', body='b')
+        self.fourth = self.user.articles.create(title='Fourth', description='d', body='b')
+        self.first.tag.add(self.python, self.django)
+        self.second.tag.add(self.python, self.django, self.web)
+        self.third.tag.add(self.python)
+        self.fourth.tag.add(self.rust, self.web)
+
+    def filtered(self, tags, mode=None):
+        params = {'tags': tags} if mode is None else {'tags': tags, 'tags_mode': mode}
+        response = self.client.get(reverse('articles-list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {article['id'] for article in response.data['results']}, response.data['facets']
+
+    def test_all_mode_intersects(self):
+        ids, facets_data = self.filtered('python,django')
+        self.assertEqual(ids, {self.first.id, self.second.id})
+        self.assertEqual(facets_data, [{'name': 'web', 'articlesCount': 1}])
+        self.assertEqual(self.filtered('python,missing'), (set(), []))
+
+    def test_any_mode_unions(self):
+        ids, facets_data = self.filtered('django, rust,missing', 'any')
+        self.assertEqual(ids, {self.first.id, self.second.id, self.fourth.id})
+        self.assertEqual(facets_data, [{'name': 'python', 'articlesCount': 2}, {'name': 'web', 'articlesCount': 2}])
+
+    @override_settings(TAG_FILTER_MAX_IDS=1)
+    def test_large_matches_use_a_semi_join(self):
+        self.assertEqual(self.filtered('python,django')[0], {self.first.id, self.second.id})
+        self.assertEqual(self.filtered('django,web', 'any')[0], {self.first.id, self.second.id, self.fourth.id})
+
+    @override_settings(TAG_FILTER_MAX_TAGS=2)
+    def test_invalid_filters(self):
+        url = reverse('articles-list')
+        self.assertEqual(self.client.get(url, {'tags': 'a,b,c'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'tags': 'a', 'tags_mode': 'xor'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn('facets', self.client.get(url).data)
+
+    def test_intersections_read_cached_postings(self):
+        self.filtered('python,django')
+        with CaptureQueriesContext(connection) as captured:
+            self.filtered('python,django')
+        # no posting list rebuilt (the page's tag batch reads links by article, not by tag)
+        self.assertFalse(any('"api_article_tag"."tag_id" IN' in query['sql'] for query in captured.captured_queries))
+
+    def test_postings_follow_tag_changes(self):
+        self.filtered('python,django')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.third.tag.add(self.django)
+        self.assertEqual(self.filtered('python,django')[0], {self.first.id, self.second.id, self.third.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.django.articles.remove(self.first)
+        self.assertEqual(self.filtered('python,django')[0], {self.second.id, self.third.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.tag.clear()
+        self.assertEqual(self.filtered('python,django')[0], {self.third.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.third.delete()
+        self.assertEqual(self.filtered('python', 'any'), ({self.first.id}, []))
+        with self.captureOnCommitCallbacks(execute=True):
+            ingest.ingest([{'title': 'Bulk', 'body': 'b', 'tag': ['python', 'rust']}], author=self.user)
+        ids, facets_data = self.filtered('python')
+        self.assertEqual(len(ids), 2)
+        self.assertEqual(facets_data, [{'name': 'rust', 'articlesCount': 1}])  # the first article lost django
+
+    def test_encoding_round_trips(self):
+        article_ids = [3, 4, 90, 1000, 2 ** 40]
+        self.assertEqual(facets.decode(facets.encode(article_ids)), article_ids)
+        self.assertEqual(facets.decode(facets.encode([])), [])
+
+class FollowBatchAPITestCase(BaseAPITestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader', email='reader@example.com', password='TestPassword123')
+        self.authors = [
+            User.objects.create_user(username=f'author{n}', email=f'author{n}@example.com', password='TestPassword123')
+            for n in range(3)
+        ]
+        for author in self.authors:
+            for number in range(2):
+                author.articles.create(title=f'{author.username} {number}', description='d', body='b')
+        Follow.objects.create(follower=self.reader, following=self.authors[0])
+        self.authenticate(get_token_for_user(self.reader))
+        self.url = reverse('follows')
+
+    def test_batch_follow(self):
+        usernames = ['author0', 'author1', 'author2', 'nobody', 'reader']
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(self.url, {'usernames': usernames}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {
+            'followed': ['author1', 'author2'], 'already_following': ['author0'],
+            'not_found': ['nobody'], 'invalid': ['reader'],
+        })
+        self.assertEqual(set(self.reader.following_relations.values_list('following__username', flat=True)),
+                         {'author0', 'author1', 'author2'})
+        self.assertEqual(FeedEntry.objects.filter(user=self.reader, author__in=self.authors[1:]).count(), 4)
+        self.assertEqual(sum('INTO "api_follow"' in query['sql'] for query in captured.captured_queries), 1)
+
+    def test_batch_unfollow(self):
+        feed.backfill(self.reader, self.authors[0])
+        response = self.client.delete(self.url, {'usernames': ['author0', 'author1', 'nobody']}, format='json')
+        self.assertEqual(response.data, {'unfollowed': ['author0'], 'not_following': ['author1'], 'not_found': ['nobody']})
+        self.assertFalse(Follow.objects.filter(follower=self.reader).exists())
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+
+    def test_relationships_in_one_query(self):
+        Follow.objects.create(follower=self.authors[1], following=self.reader)
+        self.client.get(self.url)  # caches the token version
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'usernames': 'author1,author0,nobody'})
+        self.assertEqual(response.data['relationships'], [
+            {'username': 'author1', 'following': False, 'followed_by': True},
+            {'username': 'author0', 'following': True, 'followed_by': False},
+        ])
+
+    @override_settings(FOLLOW_BATCH_MAX=2)
+    def test_invalid_batches(self):
+        self.assertEqual(self.client.post(self.url, {'usernames': ['a', 'b', 'c']}, format='json').status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.post(self.url, {'usernames': 'author1'}, format='json').status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.client.credentials()
+        self.assertEqual(self.client.get(self.url, {'usernames': 'author1'}).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_following_flag(self):
+        url = reverse('profile', kwargs={'username': 'author0'})
+        self.client.get(url)  # caches the token version
+        with CaptureQueriesContext(connection) as signed_in:
+            response = self.client.get(url)
+        self.assertTrue(response.data['profile']['following'])
+        self.client.credentials()
+        with CaptureQueriesContext(connection) as anonymous:
+            anonymous_response = self.client.get(url)
+        self.assertFalse(anonymous_response.data['profile']['following'])
+        # the rest of the profile is cached, the reader's flag is the one query left
+        self.assertEqual((len(signed_in), len(anonymous)), (1, 0))
+        self.assertNotEqual(response['ETag'], anonymous_response['ETag'])
+        self.assertIn('Authorization', response['Vary'])
+
+class ProfileStatsTestCase(BaseAPITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='TestPassword123')
+        self.authors = [
+            User.objects.create_user(username=f'author{n}', email=f'author{n}@example.com', password='TestPassword123')
+            for n in range(3)
+        ]
+        self.authenticate(get_token_for_user(self.user))
+
+    def stats(self, username):
+        profile = self.client.get(reverse('profile', kwargs={'username': username})).data['profile']
+        return profile['followersCount'], profile['followingCount'], profile['articlesCount']
+
+    def assertRecounted(self):
+        stored = list(User.objects.order_by('id').values_list(*User.STATS))
+        profiles.recount()
+        self.assertEqual(stored, list(User.objects.order_by('id').values_list(*User.STATS)))
+
+    def test_follow_and_article_writes_move_cached_stats(self):
+        self.assertEqual(self.stats('author0'), (0, 0, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('profile-follow', kwargs={'username': 'author0'}))
+        self.assertEqual(self.stats('author0'), (1, 0, 0))
+        self.assertEqual(self.stats('reader'), (0, 1, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            created = self.client.post(reverse('articles-list'), {'title': 't', 'description': 'd', 'body': 'b'},
+                                       format='json')
+        self.assertEqual(self.stats('reader'), (0, 1, 1))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('articles-detail', kwargs={'pk': created.data['id']}))
+            self.client.delete(reverse('profile-follow', kwargs={'username': 'author0'}))
+        self.assertEqual(self.stats('reader'), (0, 0, 0))
+        self.assertEqual(self.stats('author0'), (0, 0, 0))
+        self.assertRecounted()
+
+    def test_cached_profile(self):
+        url = reverse('profile', kwargs={'username': 'author0'})
+        self.client.credentials()
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['profile']['username'], 'author0')
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+
+    def test_profile_update_drops_old_and_new_name(self):
+        self.client.get(reverse('profile', kwargs={'username': 'reader'}))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(reverse('user-detail-update'), {'username': 'renamed', 'bio': 'new bio'})
+        self.assertEqual(self.client.get(reverse('profile', kwargs={'username': 'reader'})).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(reverse('profile', kwargs={'username': 'renamed'})).data['profile']['bio'],
+                         'new bio')
+
+    def test_full_save_keeps_stats(self):
+        stale = User.objects.get(username='author0')
+        Follow.objects.create(follower=self.user, following=stale)
+        stale.bio = 'edited'
+        stale.save()
+        stale.refresh_from_db()
+        self.assertEqual((stale.bio, stale.followers_count), ('edited', 1))
+
+    def test_bulk_paths_recount(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            follows_url = reverse('follows')
+            self.client.post(follows_url, {'usernames': ['author0', 'author1', 'author2']}, format='json')
+        self.assertEqual(self.stats('reader'), (0, 3, 0))
+        self.assertEqual(self.stats('author2'), (1, 0, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('articles-bulk'), [{'title': f'Bulk {n}', 'body': 'b'} for n in range(3)],
+                             format='json')
+        self.assertEqual(self.stats('reader'), (0, 3, 3))
+        with CaptureQueriesContext(connection) as captured, self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(follows_url, {'usernames': ['author0', 'author1', 'author2']}, format='json')
+        # one recount instead of an UPDATE per deleted follow
+        self.assertEqual(sum('"followers_count" =' in query['sql'] for query in captured), 1)
+        self.assertEqual(self.stats('reader'), (0, 0, 3))
+        self.assertEqual(self.stats('author1'), (0, 0, 0))
+        self.assertRecounted()
+
+    def test_following_pages(self):
+        for author in self.authors:
+            Follow.objects.create(follower=self.user, following=author)
+        url = reverse('profile-following', kwargs={'username': 'reader'})
+        first = self.client.get(url, {'cursor': '', 'limit': 2}).data
+        self.assertEqual([row['username'] for row in first['results']], ['author2', 'author1'])
+        second = self.client.get(first['next']).data
+        self.assertEqual([row['username'] for row in second['results']], ['author0'])
+        self.assertIsNone(second['next'])
+        missing = self.client.get(reverse('profile-following', kwargs={'username': 'nobody'}))
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
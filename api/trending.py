@@ -0,0 +1,213 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Prefetch
+from django.utils import timezone
+from . import counters
+from .models import Article, Comment, Favorite, Tag, TrendingEpoch, TrendingScore
+
+# Trending articles (GET /articles/trending/).
+# Engagement decays exponentially: an event counts 2^-(age / TRENDING_HALF_LIFE)
+# of its weight. Decaying every stored score as time passes would rewrite the
+# whole table, so scores use forward decay instead: an event at time t adds
+# weight * 2^((t - epoch) / half-life). That is the decayed value times a
+# factor every article shares, so ordering by the stored score is ordering by
+# the decayed one at any moment, and favorites and comments only ever add (or,
+# when undone, subtract) a constant. Deltas go through the counters buffer,
+# tagged with the epoch they were scaled to. Each article has a global row
+# (tag=None) and one row per tag, so both rankings are a (tag, -score) index
+# range read. rebuild() (rebuild_trending command) recomputes all rows from
+# Favorite and Comment.
+# The factor doubles every half-life and a float overflows past 2^1024, so the
+# epoch (TrendingEpoch, starting at TRENDING_EPOCH) must move: rebase() moves
+# it to now and rescales the stored scores in one transaction. Flushes do that
+# themselves once the epoch is TRENDING_REBASE_AFTER half-lives old (the
+# rebase_trending command forces one). Flushes lock the epoch row and convert
+# the buffered deltas to it, so a rebase never mixes scales.
+
+DEFAULT_WEIGHTS = {'favorite': 1.0, 'comment': 2.0}
+# events older than this add under 1e-9 of a fresh one; rebuild() skips them
+EVENT_WINDOW_HALF_LIVES = 30
+
+_epoch = None  # this process's copy of TrendingEpoch.at, refreshed by every flush
+
+logger = logging.getLogger(__name__)
+
+
+def half_life():
+    return getattr(settings, 'TRENDING_HALF_LIFE', 60 * 60 * 24)
+
+
+def initial_epoch():
+    return datetime.fromisoformat(getattr(settings, 'TRENDING_EPOCH', '2026-01-01T00:00:00+00:00'))
+
+
+def stored_epoch():
+    return TrendingEpoch.objects.values_list('at', flat=True).first() or initial_epoch()
+
+
+def epoch():
+    """The epoch this process scales new events to; flushes convert them to the stored one."""
+    global _epoch
+    if _epoch is None:
+        _epoch = stored_epoch()
+    return _epoch
+
+
+def rebase_after():
+    return getattr(settings, 'TRENDING_REBASE_AFTER', 100)
+
+
+def is_stale(since, at):
+    """Whether scores scaled to epoch `since` have grown too large by `at` and the epoch must move."""
+    return (at - since).total_seconds() / half_life() > rebase_after()
+
+
+def scale(since, to):
+    """Factor converting scores scaled to epoch `since` into scores scaled to epoch `to`."""
+    return 2 ** ((since - to).total_seconds() / half_life())
+
+
+def weight(event, at, since=None):
+    """What an `event` ('favorite' or 'comment') at `at` adds to a score scaled to `since` (the epoch)."""
+    base = getattr(settings, 'TRENDING_WEIGHTS', DEFAULT_WEIGHTS)[event]
+    return base * scale(at, since or epoch())
+
+
+def record(article_id, event, at, sign=1):
+    since = epoch()
+    if is_stale(since, at):
+        # this process hasn't flushed for a long while; any epoch works, the flush converts it
+        use_epoch(at)
+        since = at
+    counters.incr(article_id, (counters.TRENDING, since), sign * weight(event, at, since))
+
+
+def locked_epoch():
+    """The stored epoch, locked until the transaction ends so a rebase can't move it meanwhile."""
+    global _epoch
+    _epoch = TrendingEpoch.objects.select_for_update().values_list('at', flat=True).first() or initial_epoch()
+    return _epoch
+
+
+def apply(deltas):
+    """Add buffered {article_id: {epoch: delta}} to the scores; called by counters.flush in its transaction."""
+    current = locked_epoch()
+    now = timezone.now()
+    if is_stale(current, now):
+        logger.info('Trending epoch %s is over %d half-lives old, rebasing', current.isoformat(), rebase_after())
+        current = move_epoch(current, now)
+    for article_id in sorted(deltas):
+        total = sum(delta * scale(since, current) for since, delta in deltas[article_id].items())
+        if total:
+            TrendingScore.objects.filter(article_id=article_id).update(score=F('score') + total)
+
+
+def set_epoch(at):
+    TrendingEpoch.objects.update_or_create(pk=1, defaults={'at': at})
+    transaction.on_commit(lambda: use_epoch(at))  # a rolled back move must not leave a stale copy
+
+
+def use_epoch(at):
+    global _epoch
+    _epoch = at
+
+
+def move_epoch(current, at):
+    """Rescale every stored score from epoch `current` (locked) to `at` and store `at`; returns it."""
+    TrendingScore.objects.update(score=F('score') * scale(current, at))
+    set_epoch(at)
+    return at
+
+
+def rebase():
+    """Move the epoch to now and rescale every stored score to it; returns the new epoch."""
+    with transaction.atomic():
+        return move_epoch(locked_epoch(), timezone.now())
+
+
+def create_scores(article_tags):
+    """Rows for new articles, `article_tags` being {article_id: [tag_id, ...]}."""
+    TrendingScore.objects.bulk_create(
+        [
+            TrendingScore(article_id=article_id, tag_id=tag_id)
+            for article_id, tag_ids in article_tags.items()
+            for tag_id in (None, *tag_ids)
+        ],
+        batch_size=1000,
+    )
+
+
+def add_tags(pairs):
+    """Per-tag rows for (article_id, tag_id) pairs, starting at the article's global score."""
+    article_ids = {article_id for article_id, _ in pairs}
+    scores = dict(
+        TrendingScore.objects.filter(article_id__in=article_ids, tag=None).values_list('article_id', 'score')
+    )
+    TrendingScore.objects.bulk_create(
+        [
+            TrendingScore(article_id=article_id, tag_id=tag_id, score=scores.get(article_id, 0))
+            for article_id, tag_id in pairs
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def remove_tags(article_ids, tag_ids=None):
+    """Drop per-tag rows of the articles, for `tag_ids` or for every tag."""
+    rows = TrendingScore.objects.filter(article_id__in=article_ids, tag__isnull=False)
+    if tag_ids is not None:
+        rows = rows.filter(tag_id__in=tag_ids)
+    rows.delete()
+
+
+def trending_articles(queryset, tag_name=None):
+    """
+    `queryset` narrowed to articles with engagement, hottest first, globally or
+    within a tag. The score is annotated from the one ranking row the filter
+    joins, so ordering and keyset cursors on `trending_score` add no second join.
+    """
+    if tag_name:
+        ranking = {'trending_scores__tag__name': tag_name}
+    else:
+        ranking = {'trending_scores__tag__isnull': True}
+    return (
+        queryset.filter(trending_scores__score__gt=0, **ranking)
+        .annotate(trending_score=F('trending_scores__score'))
+        .order_by('-trending_score', '-id')
+    )
+
+
+def rebuild(chunk_size=1000):
+    """Recompute every row from Favorite and Comment, with now as the new epoch; returns the number of articles."""
+    now = timezone.now()
+    since = now - timedelta(seconds=half_life() * EVENT_WINDOW_HALF_LIVES)
+    scores = defaultdict(float)
+    for event, model in (('favorite', Favorite), ('comment', Comment)):
+        events = model.objects.filter(created_at__gte=since).values_list('article_id', 'created_at')
+        for article_id, at in events.iterator(chunk_size=chunk_size):
+            scores[article_id] += weight(event, at, now)
+
+    articles = Article.objects.order_by('id').only('id').prefetch_related(
+        Prefetch('tag', queryset=Tag.objects.only('id'))
+    )
+    rebuilt = 0
+    with transaction.atomic():
+        locked_epoch()
+        set_epoch(now)
+        TrendingScore.objects.all().delete()
+        batch = []
+        for article in articles.iterator(chunk_size=chunk_size):
+            score = scores.get(article.id, 0)
+            batch += [
+                TrendingScore(article_id=article.id, tag_id=tag_id, score=score)
+                for tag_id in (None, *(tag.id for tag in article.tag.all()))
+            ]
+            rebuilt += 1
+            if len(batch) >= 5000:
+                TrendingScore.objects.bulk_create(batch, batch_size=1000)
+                batch = []
+        TrendingScore.objects.bulk_create(batch, batch_size=1000)
+    return rebuilt
@@ -1,18 +1,24 @@
-from django.urls import path, include
-from django.views.decorators.cache import cache_page
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     RegisterView,
     LoginView,
     UserRetrieveUpdateView,
     ProfileView,
+    ProfileFollowingView,
     ArticleViewSet,
     CommentListCreateView,
     CommentDetailView,
     TagListView,
     favorite_article,
     FeedView,
-    follow_user
+    follow_user,
+    follow_users,
+    database_pools,
+    metrics,
+    ArticleExportView,
+    CommentExportView,
+    ArticleSyndicationView
 )
 
 router = DefaultRouter()
@@ -26,8 +32,16 @@ urlpatterns = [
     path('articles/<int:article_id>/comments/', CommentListCreateView.as_view(), name='comments-list-create'),
     path('articles/<int:article_id>/comments/<int:comment_id>', CommentDetailView.as_view(), name='comments-detail'),
     path('articles/<int:article_id>/favorite/', favorite_article, name='favorite-article'),
-    path('articles/feed/', cache_page(60 * 15)(FeedView.as_view()), name='feed-articles'),
+    path('articles/feed/', FeedView.as_view(), name='feed-articles'),
     path('profile/<str:username>/', ProfileView.as_view(), name='profile'),
     path('profile/<str:username>/follow', follow_user, name='profile-follow'),
+    path('profile/<str:username>/following/', ProfileFollowingView.as_view(), name='profile-following'),
+    path('follows/', follow_users, name='follows'),
+    re_path(r'^export/articles\.(?P<export_format>jsonl|csv)$', ArticleExportView.as_view(), name='export-articles'),
+    re_path(r'^export/comments\.(?P<export_format>jsonl|csv)$', CommentExportView.as_view(), name='export-comments'),
+    re_path(r'^feeds/(?P<kind>tag|author)/(?P<value>[^/]+)\.(?P<feed_type>rss|atom)$',
+            ArticleSyndicationView.as_view(), name='article-syndication'),
+    path('health/db-pools/', database_pools, name='database-pools'),
+    path('metrics/', metrics, name='metrics'),
     path('', include(router.urls)),
 ]
@@ -1,14 +1,21 @@
+import hmac
+from django.conf import settings
+from django.db.models import Count, F, Max
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.http import urlencode
 from django.core.exceptions import PermissionDenied
 from django.core.cache import cache
+from django.views.decorators.http import require_GET
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics, viewsets, status, filters
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.views import APIView
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly, AllowAny
-from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, IsAuthenticatedOrReadOnly, AllowAny
 from rest_framework_simplejwt.views import TokenObtainPairView
 from .serializers import (
     CustomLoginSerializer,
@@ -16,12 +23,20 @@ from .serializers import (
     UserLoginSerializer,
     UserSerializer,
     UserProfileSerializer,
+    AuthorSerializer,
     ArticleSerializer,
     TagSerializer,
-    CommentSerializer
+    CommentSerializer,
+    requested_fields
 )
-from .models import User, Article, Comment, Tag, Favorite, Follow
+from .models import User, Article, Comment, Tag, Favorite
+from .conditional import ConditionalGetMixin, favorites_state, pending_counts, query_fingerprint
+from .authentication import full_user, refresh_token_for, revoke_tokens
+from .pagination import CursorOnlyPagination, KeysetPagination
+from .rows import ArticleRowSerializer, CommentRowSerializer, RowListMixin
 from .permissions import IsOwnerOrReadOnly
+from .db.pool import pool_stats
+from . import export, facets, feed, follows, ingest, profiles, related, routers, search, tags, telemetry, trending
 
 ## LoginView use TokenObtainPairView of rest_framework_simplejwt
 # class LoginView(TokenObtainPairView):
@@ -36,10 +51,12 @@ class LoginView(generics.GenericAPIView):
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
 
-        refresh_token = RefreshToken.for_user(user)
+        # tokens carry the claims StatelessJWTAuthentication needs; nothing is written back
+        refresh_token = refresh_token_for(user)
+        # the request carried no token for the middleware to pin, and the first reads
+        # with the new one must not hit a replica that hasn't seen the user yet
+        routers.pin(user.id)
         token = refresh_token.access_token
-        user.token = str(token)
-        user.save(update_fields=['token'])
         return Response({
             'user': {
                 **UserSerializer(user, context={'request': request}).data,
@@ -58,10 +75,12 @@ class RegisterView(generics.CreateAPIView):
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
 
-        refresh_token = RefreshToken.for_user(user)
+        # tokens carry the claims StatelessJWTAuthentication needs; nothing is written back
+        refresh_token = refresh_token_for(user)
+        # the request carried no token for the middleware to pin, and the first reads
+        # with the new one must not hit a replica that hasn't seen the user yet
+        routers.pin(user.id)
         token = refresh_token.access_token
-        user.token = str(token)
-        user.save(update_fields=['token'])
         return Response({
             'user': {
                 **UserSerializer(user, context={'request': request}).data,
@@ -75,55 +94,216 @@ class UserRetrieveUpdateView(generics.RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
-        user = self.request.user
+        user = full_user(request)
         profile_data = UserSerializer(user, context={'request': request}).data
-        return Response({'user': profile_data})
+        return Response({'user': {**profile_data, 'token': str(request.auth)}})
 
     def update(self, request, *args, **kwargs):
-        user = self.request.user
+        user = full_user(request)
         data = request.data.copy()
         allowed_fields = {'email', 'username', 'password', 'image', 'bio'}
         update_data = {k: v for k, v in data.items() if k in allowed_fields}
 
         serializer = self.get_serializer(user, data=update_data, partial=True)
         serializer.is_valid(raise_exception=True)
+        username = user.username
         if 'password' in update_data:
             user.set_password(update_data['password'])
             user.save(update_fields=['password'])
+            revoke_tokens(user)  # sign out every session holding an older token
         serializer.save()
-        return Response({'user': serializer.data})
+        profiles.forget({username, user.username})  # the cached profile, under its old name too
+        if 'password' not in update_data:
+            return Response({'user': {**serializer.data, 'token': str(request.auth)}})
+        # the caller's own token was revoked with the rest; hand back a fresh pair
+        refresh_token = refresh_token_for(user)
+        return Response({
+            'user': {**serializer.data, 'token': str(refresh_token.access_token)},
+            'refresh_token': str(refresh_token),
+        })
 
-class ProfileView(generics.RetrieveAPIView):
+class ProfileView(ConditionalGetMixin, generics.RetrieveAPIView):
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get(self, request, *args, **kwargs):
-        username = self.kwargs.get('username')
-        user = get_object_or_404(User, username=username)
-        profile_data = UserProfileSerializer(user, context={'request': request}).data
-        return Response({
-            "profile": profile_data
-        })
+        # stats are stored on the user row and cached per username (api/profiles.py);
+        # only the reader's following flag is looked up per request
+        row = profiles.stats(self.kwargs.get('username'))
+        if row is None:
+            raise Http404('No User matches the given query.')
+        following = profiles.is_following(request.user, row['id'])
+        validators = (tuple(sorted(row.items())), following, request.version)
+        respond = lambda: Response({'profile': profiles.representation(row, following)})
+        # no Last-Modified: follower and article counts move without touching the user row
+        return self.conditional_response(request, validators, None, respond, vary_on_user=True)
+
+class ProfileFollowingView(generics.ListAPIView):
+    # the accounts a profile follows, most recently followed first
+    serializer_class = AuthorSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
 
-class ArticleViewSet(viewsets.ModelViewSet):
+    def get_queryset(self):
+        user = get_object_or_404(User.objects.only('id'), username=self.kwargs.get('username'))
+        return (
+            User.objects.filter(follower_relations__follower_id=user.id)
+            .annotate(followed_at=F('follower_relations__created_at'))
+            .order_by('-followed_at', '-id')
+        )
+
+class ArticleViewSet(ConditionalGetMixin, RowListMixin, viewsets.ModelViewSet):
     # use select_related (1-1 or 1-n) and prefetch_related (n-n) avoid N+1 query: to optimize query
     queryset = Article.objects.all().select_related('author').prefetch_related('tag')
     serializer_class = ArticleSerializer
+    row_serializer = ArticleRowSerializer()  # read-only list path, see api/rows.py
+    list_omit = ('body',)  # list UIs don't show it; ?fields=body or ?omit= brings it back
+
     permission_classes = [IsOwnerOrReadOnly]
     filter_backends = [filters.OrderingFilter]
     ordering = ['-created_at']
 
+    def get_output_fields(self):
+        if self.request.method != 'GET':
+            return None
+        default_omit = () if self.action == 'retrieve' else self.list_omit
+        return requested_fields(self.request, ArticleSerializer.Meta.fields, default_omit)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.get_output_fields()
+        return context
+
+    def get_lookup_queryset(self):
+        # /articles/<id>/ or /articles/<slug>/; slugs are unique per author, so
+        # ?author= picks one and the newest article wins otherwise
+        lookup = self.kwargs[self.lookup_field]
+        queryset = self.filter_queryset(self.get_queryset())
+        if lookup.isdigit():
+            return queryset.filter(pk=lookup)
+        return queryset.filter(slug=lookup).order_by('-created_at', '-id')
+
+    def get_object(self):
+        article = self.get_lookup_queryset().first()
+        if article is None:
+            raise Http404('No Article matches the given query.')
+        self.check_object_permissions(self.request, article)
+        return article
+
+    def list(self, request, *args, **kwargs):
+        # validators come from the page itself: its rows (updated_at moves with
+        # tag changes) with this process's unflushed counter deltas, as the body
+        # shows them, plus the count/next link and facets. Revalidation costs
+        # the page query, never a scan of every matching article.
+        fields = self.get_output_fields()
+        rows = self.row_serializer.values(self.filter_queryset(self.get_queryset()), fields, include=('updated_at',))
+        page = self.paginate_queryset(rows)
+        results = list(rows) if page is None else page
+        tag_filter = self.get_tag_filter()
+        tag_facets = tag_filter.facets() if tag_filter is not None else None
+        state = [(tuple(row.items()), pending_counts(row['id'])) for row in results]
+        pagination = None if page is None else (getattr(self.paginator, 'count', None), self.paginator.get_next_link())
+        favorites = favorites_state(request)
+        validators = (state, pagination, tag_facets, favorites, request.user.id, query_fingerprint(request))
+
+        def respond():
+            data = self.row_serializer.serialize(results, request, fields)
+            response = Response(data) if page is None else self.get_paginated_response(data)
+            if tag_facets is not None:
+                response.data['facets'] = tag_facets
+            return response
+        return self.conditional_response(request, validators, None, respond, vary_on_user=True)
+
+    def retrieve(self, request, *args, **kwargs):
+        state = (
+            self.get_lookup_queryset().prefetch_related(None)
+            .values('id', 'updated_at', 'author__updated_at', 'favorites_count', 'comments_count').first()
+        )
+        respond = lambda: super(ArticleViewSet, self).retrieve(request, *args, **kwargs)
+        if state is None:
+            return respond()  # 404
+        favorites = favorites_state(request)
+        validators = (
+            tuple(sorted(state.items())), pending_counts(state['id']), favorites, request.user.id, request.version
+        )
+        return self.conditional_response(request, validators, None, respond, vary_on_user=True)
+
     def get_queryset(self):
         queryset = self.queryset
         tag_name = self.request.query_params.get('tag')
         if tag_name:
             queryset = queryset.filter(tag__name=tag_name)
+        tag_filter = self.get_tag_filter()
+        if tag_filter is not None:
+            queryset = tag_filter.filter(queryset)
         author_username = self.request.query_params.get('author')
         if author_username:
             queryset = queryset.filter(author__username=author_username)
+        fields = self.get_output_fields()
+        if fields is not None:
+            queryset = ArticleSerializer.defer_unrequested(queryset, fields)
         return queryset
 
+    def get_tag_filter(self):
+        # ?tags=a,b,c[&tags_mode=any], intersected in memory from tag posting lists (api/facets.py);
+        # resolved once per request, the list's state query and page query share it
+        if not hasattr(self, '_tag_filter'):
+            names = [name.strip() for name in self.request.query_params.get('tags', '').split(',') if name.strip()]
+            mode = self.request.query_params.get('tags_mode', facets.ALL)
+            if mode not in (facets.ALL, facets.ANY):
+                raise ValidationError({'tags_mode': [f'Expected "{facets.ALL}" or "{facets.ANY}".']})
+            max_tags = getattr(settings, 'TAG_FILTER_MAX_TAGS', 10)
+            if len(names) > max_tags:
+                raise ValidationError({'tags': [f'At most {max_tags} tags.']})
+            self._tag_filter = facets.TagFilter(names, mode) if names else None
+        return self._tag_filter
+
+    @action(detail=False, methods=['get'], pagination_class=CursorOnlyPagination)
+    def search(self, request):
+        # ranked full-text search over the inverted index (api/search.py)
+        queryset = search.search(self.get_queryset(), request.query_params.get('q', ''))
+        queryset = queryset.order_by('-score', '-id')
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'], pagination_class=CursorOnlyPagination)
+    def trending(self, request):
+        # hottest articles by decayed engagement, globally or ?tag= (api/trending.py)
+        queryset = trending.trending_articles(Article.objects.all(), request.query_params.get('tag'))
+        fields = self.get_output_fields()
+        page = self.paginate_queryset(self.row_serializer.values(queryset, fields))
+        return self.get_paginated_response(self.row_serializer.serialize(page, request, fields))
+
+    @action(detail=True, methods=['get'])
+    def related(self, request, pk=None):
+        # precomputed top related articles by shared tags (api/related.py)
+        article_id = self.get_lookup_queryset().values_list('id', flat=True).first()
+        if article_id is None:
+            raise Http404('No Article matches the given query.')
+        fields = self.get_output_fields()
+        rows = self.row_serializer.values(related.related_articles(Article.objects.all(), article_id), fields)
+        return Response({'articles': self.row_serializer.serialize(list(rows), request, fields)})
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def bulk(self, request):
+        # batched create for imports: bulk inserts and one round of invalidation per chunk (api/ingest.py)
+        items = request.data.get('articles') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list):
+            return Response({'articles': ['Expected a list of articles.']}, status=status.HTTP_400_BAD_REQUEST)
+        max_items = getattr(settings, 'ARTICLE_BULK_MAX_ITEMS', 500)
+        if len(items) > max_items:
+            return Response({'articles': [f'At most {max_items} articles per request.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+        results = ingest.ingest(items, author=request.user)
+        created = sum('id' in result for result in results)
+        return Response(
+            {'created': created, 'results': results},
+            status=status.HTTP_201_CREATED if created == len(items) else status.HTTP_207_MULTI_STATUS,
+        )
+
     def perform_create(self, serializer):
+        # fan-out to followers' timelines happens in signals.fan_out_article
         serializer.save(author=self.request.user)
 
 # TODO: remove block cmt
@@ -138,14 +318,24 @@ class ArticleViewSet(viewsets.ModelViewSet):
     # def perform_destroy(self, instance):
     #     instance.delete()
 
-class CommentListCreateView(generics.ListCreateAPIView):
+class CommentListCreateView(ConditionalGetMixin, RowListMixin, generics.ListCreateAPIView):
     serializer_class = CommentSerializer
+    row_serializer = CommentRowSerializer()
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get_queryset(self):
         article_id = self.kwargs.get('article_id')
         return Comment.objects.filter(article=article_id).select_related('author')
 
+    def list(self, request, *args, **kwargs):
+        state = (
+            self.filter_queryset(self.get_queryset()).order_by()
+            .aggregate(last=Max('updated_at'), authors_last=Max('author__updated_at'), total=Count('id'))
+        )
+        validators = (self.kwargs.get('article_id'), tuple(sorted(state.items())), query_fingerprint(request))
+        respond = lambda: super(CommentListCreateView, self).list(request, *args, **kwargs)
+        return self.conditional_response(request, validators, None, respond)
+
     def perform_create(self, serializer):
         author = self.request.user
         if not author.is_authenticated:
@@ -175,40 +365,59 @@ class TagListView(generics.ListCreateAPIView):
     permission_classes = [AllowAny]
 
     def list(self, request, *args, **kwargs):
-        cache_key = 'tag_list'
-        cached_tags = cache.get(cache_key)
-        if cached_tags:
-            return Response({'tags': cached_tags}, status=status.HTTP_200_OK)
-
-        queryset = self.get_queryset()
-        tag_names = queryset.values_list('name', flat=True)
-        cache.set(cache_key, tag_names, 60 * 15)
+        # precomputed popularity ranking, refreshed in the background (api/tags.py)
+        tag_list = tags.get_tag_list()
         return Response({
-            'tags': tag_names
+            'tags': tag_list['tags'],
+            'counts': tag_list['counts'],
         }, status=status.HTTP_200_OK)
 
     def perform_create(self, serializer):
         return super().perform_create(serializer)
 
+FOLLOW_OUTCOMES = {
+    'followed': ('User followed successfully.', status.HTTP_201_CREATED),
+    'already_following': ('You are already following this user.', status.HTTP_200_OK),
+    'invalid': ('You cannot follow yourself.', status.HTTP_400_BAD_REQUEST),
+    'unfollowed': ('User unfollowed successfully.', status.HTTP_204_NO_CONTENT),
+    'not_following': ('You are not following this user.', status.HTTP_404_NOT_FOUND),
+}
+
+def follow_one(user, username, method):
+    """
+    (detail, status) of following (POST) or unfollowing (DELETE) one user; the
+    sync and async follow views both go through the batched path (api/follows.py).
+    """
+    result = follows.follow(user, [username]) if method == 'POST' else follows.unfollow(user, [username])
+    if result['not_found']:
+        raise Http404('No User matches the given query.')
+    return next(FOLLOW_OUTCOMES[outcome] for outcome, usernames in result.items() if usernames)
+
 @api_view(['POST', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def follow_user(request, username):
-    user_to_follow = get_object_or_404(User, username=username)
-    if request.method == 'POST':
-        if user_to_follow == request.user:
-            return Response({'detail': 'You cannot follow yourself.'}, status=status.HTTP_400_BAD_REQUEST)
+    detail, status_code = follow_one(request.user, username, request.method)
+    return Response({'detail': detail}, status=status_code)
 
-        follow, created = Follow.objects.get_or_create(follower=request.user, following=user_to_follow)
-        if created:
-            return Response({'detail': 'User followed successfully.'}, status=status.HTTP_201_CREATED)
-        return Response({'detail': 'You are already following this user.'}, status=status.HTTP_200_OK)
-
-    elif request.method == 'DELETE':
-        follow = Follow.objects.filter(follower=request.user, following=user_to_follow)
-        if follow.exists():
-            follow.delete()
-            return Response({'detail': 'User unfollowed successfully.'}, status=status.HTTP_204_NO_CONTENT)
-        return Response({'detail': 'You are not following this user.'}, status=status.HTTP_404_NOT_FOUND)
+@api_view(['GET', 'POST', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def follow_users(request):
+    # batched follow/unfollow and relationship lookup (api/follows.py)
+    if request.method == 'GET':
+        usernames = [name.strip() for name in request.query_params.get('usernames', '').split(',') if name.strip()]
+    else:
+        usernames = request.data.get('usernames') if isinstance(request.data, dict) else None
+        if not isinstance(usernames, list) or not all(isinstance(name, str) for name in usernames):
+            return Response({'usernames': ['Expected a list of usernames.']}, status=status.HTTP_400_BAD_REQUEST)
+    usernames = list(dict.fromkeys(usernames))
+    if len(usernames) > follows.max_batch():
+        return Response({'usernames': [f'At most {follows.max_batch()} usernames per request.']},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if request.method == 'GET':
+        return Response({'relationships': follows.relationships(request.user, usernames)})
+    if request.method == 'POST':
+        return Response(follows.follow(request.user, usernames))
+    return Response(follows.unfollow(request.user, usernames))
 
 @api_view(['POST', 'DELETE'])
 @permission_classes([IsAuthenticated])
@@ -228,15 +437,120 @@ def favorite_article(request, article_id):
             return Response({'detail': 'Favorite removed.'}, status=status.HTTP_204_NO_CONTENT)
         return Response({'detail': 'Favorite does not exist.'}, status=status.HTTP_404_NOT_FOUND)
 
-class FeedView(generics.ListAPIView):
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def database_pools(request):
+    # this worker's connection pools: size, idle/in use, saturation, waits and wait time
+    return Response({'pools': pool_stats()})
+
+@require_GET
+def metrics(request):
+    # Prometheus scrape target: a plain view, scrapers present METRICS_TOKEN rather than a JWT
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if not token:
+        raise Http404
+    if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+        return HttpResponse(status=status.HTTP_401_UNAUTHORIZED, headers={'WWW-Authenticate': 'Bearer'})
+    return HttpResponse(telemetry.render(), content_type=telemetry.CONTENT_TYPE)
+
+class FeedView(RowListMixin, generics.ListAPIView):
     serializer_class = ArticleSerializer
+    row_serializer = ArticleRowSerializer()
     permission_classes = [IsAuthenticated]
-    pagination_class = LimitOffsetPagination
-    filter_backends = [filters.OrderingFilter, filters.SearchFilter, DjangoFilterBackend]
+    pagination_class = KeysetPagination
+    filter_backends = [filters.OrderingFilter, search.ArticleSearchFilter, DjangoFilterBackend]
     filterset_fields = ['tag__name']
-    ordering = ['-created_at']
+    ordering = ['-feed_created_at']  # the FeedEntry copy, so pages are range scans on the timeline index
+
+    def get_output_fields(self):
+        return requested_fields(self.request, ArticleSerializer.Meta.fields, ArticleViewSet.list_omit)
 
     def get_queryset(self):
-        user = self.request.user
-        following_users = user.following.all()
-        return Article.objects.filter(author__in=following_users).select_related('author').prefetch_related('tag')
+        return feed.feed_queryset(self.request.user)
+
+    def get_row_querysets(self):
+        # the materialized timeline, plus followed celebrities read separately (api/feed.py)
+        fields = self.get_output_fields()
+        return [
+            self.row_serializer.values(self.filter_queryset(queryset), fields)
+            for queryset in feed.feed_querysets(self.request.user, self.celebrity_authors)
+        ]
+
+    def list(self, request, *args, **kwargs):
+        # per-user page cache, expired by generation bumps (see api/feed.py)
+        self.celebrity_authors = feed.followed_celebrities(request.user)
+        cache_key = feed.response_cache_key(request, self.celebrity_authors)
+        cached_page = cache.get(cache_key)
+        if cached_page is not None:
+            return Response(cached_page)
+
+        page = self.paginator.paginate_merged(self.get_row_querysets(), request, self)
+        response = self.get_paginated_response(
+            self.row_serializer.serialize(page, request, self.get_output_fields())
+        )
+        cache.set(cache_key, response.data, settings.FEED_CACHE_TIMEOUT)
+        return response
+
+class ExportView(APIView):
+    """Streams every matching row as JSONL or CSV, a chunk at a time (api/export.py)."""
+    permission_classes = [IsAuthenticated]
+    name = None
+    fields = None
+
+    def perform_content_negotiation(self, request, force=False):
+        # the body isn't rendered by DRF, any Accept header gets the export
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, export_format):
+        content_type, render = export.FORMATS[export_format]
+        response = StreamingHttpResponse(render(self.fields, self.get_records()), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{self.name}.{export_format}"'
+        return response
+
+class ArticleExportView(ExportView):
+    name = 'articles'
+    fields = export.ARTICLE_FIELDS
+
+    def get_records(self):
+        queryset = Article.objects.all()
+        tag_name = self.request.query_params.get('tag')
+        if tag_name:
+            queryset = queryset.filter(tag__name=tag_name)
+        author_username = self.request.query_params.get('author')
+        if author_username:
+            queryset = queryset.filter(author__username=author_username)
+        return export.article_records(queryset)
+
+class CommentExportView(ExportView):
+    name = 'comments'
+    fields = export.COMMENT_FIELDS
+
+    def get_records(self):
+        queryset = Comment.objects.all()
+        article_id = self.request.query_params.get('article')
+        if article_id:
+            queryset = queryset.filter(article_id=article_id)
+        return export.comment_records(queryset)
+
+class ArticleSyndicationView(APIView):
+    """RSS 2.0 / Atom feed of the newest articles for a tag or an author."""
+    permission_classes = [AllowAny]
+    authentication_classes = []  # feed readers don't send tokens
+
+    def perform_content_negotiation(self, request, force=False):
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, kind, value, feed_type):
+        if kind == 'tag':
+            get_object_or_404(Tag, name=value)
+            queryset, title = Article.objects.filter(tag__name=value), f'Articles tagged {value}'
+        else:
+            get_object_or_404(User, username=value)
+            queryset, title = Article.objects.filter(author__username=value), f'Articles by {value}'
+        link = request.build_absolute_uri(f"{reverse('articles-list')}?{urlencode({kind: value})}")
+        feed_class = export.FEED_TYPES[feed_type]
+        syndication = feed_class(title=title, link=link, description=title, feed_url=request.build_absolute_uri())
+        items = export.feed_items(
+            queryset, lambda article_id: request.build_absolute_uri(reverse('articles-detail', kwargs={'pk': article_id}))
+        )
+        return StreamingHttpResponse(syndication.stream(items), content_type=syndication.content_type)
@@ -12,5 +12,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'news_project.settings')
+os.environ.setdefault('DJANGO_ASYNC_VIEWS', '1')  # serve news_project.asgi_urls, see api/async_views.py
 
 application = get_asgi_application()
@@ -0,0 +1,11 @@
+"""
+URL configuration for the ASGI deployment: news_project.urls with the async
+API views (api/asgi_urls.py). Selected through settings.ASYNC_VIEWS.
+"""
+from django.contrib import admin
+from django.urls import path, include
+
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path('api/', include('api.asgi_urls')),
+]
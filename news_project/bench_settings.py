@@ -0,0 +1,17 @@
+# Local load tests on SQLite (generate_data, benchmark_api):
+#   DJANGO_SETTINGS_MODULE=news_project.bench_settings python manage.py generate_data
+# BENCH_DATABASE picks the database file, so datasets of different sizes can sit side by side.
+import os
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR
+
+DEBUG = False
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('BENCH_DATABASE', str(BASE_DIR / 'bench.sqlite3')),
+    }
+}
+DATABASE_REPLICAS = []
+CACHES = {'default': {'BACKEND': 'api.telemetry.InstrumentedCache',
+                      'OPTIONS': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}}
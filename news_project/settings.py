@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from datetime import timedelta
 from pathlib import Path
 
@@ -46,7 +47,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.telemetry.TelemetryMiddleware',  # outermost, so its timings cover the whole stack
     'django.middleware.security.SecurityMiddleware',
+    'api.routers.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -55,7 +58,9 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'news_project.urls'
+# the ASGI entry point serves the async versions of the hot views (api/async_views.py)
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS') == '1'
+ROOT_URLCONF = 'news_project.asgi_urls' if ASYNC_VIEWS else 'news_project.urls'
 
 TEMPLATES = [
     {
@@ -80,7 +85,7 @@ WSGI_APPLICATION = 'news_project.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'api.db.mysql_pool',  # django.db.backends.mysql with a connection pool
         'NAME': 'news_db',
         'USER': 'root',
         'PASSWORD': 'root',
@@ -88,7 +93,58 @@ DATABASES = {
         'PORT': '3306',
         'OPTIONS': {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
-        }
+        },
+        'CONN_MAX_AGE': 0,  # connections go back to the pool at the end of each request
+        'POOL': {
+            'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 20)),  # per process, >= worker threads
+            'MAX_LIFETIME': 60 * 30,  # recycle before MySQL's wait_timeout can drop it
+            'TIMEOUT': 5,  # seconds to wait for a free connection before erroring
+            'CHECK_AFTER': 30,  # ping connections that sat idle this long before reuse
+        },
+    }
+}
+
+# Read replicas (see api/routers.py): DATABASE_REPLICA_HOSTS=db-r1,db-r2 adds one
+# alias per host with the primary's credentials. Safe-method requests read from
+# them unless the user wrote within REPLICA_PIN_SECONDS.
+DATABASE_REPLICAS = []
+for number, host in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_HOSTS', '').split(',')), 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = {**DATABASES['default'], 'HOST': host.strip(), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['api.routers.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = 10  # read-your-writes window after a write, longer than the usual lag
+REPLICA_MAX_LAG = 5  # seconds behind the primary before a replica is skipped
+REPLICA_HEALTH_CHECK_INTERVAL = 10  # seconds between health/lag checks, per process
+
+
+# Cache
+# Shared by every worker: feed generations, tag namespaces, token versions and
+# throttle counters must agree across processes, so the per-process LocMemCache
+# default is not enough. Production should point CACHE_BACKEND/CACHE_LOCATION
+# at memcached or redis (e.g. django.core.cache.backends.redis.RedisCache and
+# redis://host:6379/0). The file cache default is for development and single
+# host trials only: every set lists the whole directory to decide whether to
+# cull, and a cull deletes a random 1/CULL_FREQUENCY of the entries.
+
+cache_backend = os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache')
+cache_options = {'BACKEND': cache_backend}
+if cache_backend == 'django.core.cache.backends.filebased.FileBasedCache':
+    # the 300-entry default would cull on most sets; memcached and redis evict
+    # by LRU themselves and pass OPTIONS to their clients, so they get none
+    cache_options.update({
+        'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 100000)),
+        'CULL_FREQUENCY': 10,
+    })
+
+CACHES = {
+    'default': {
+        'BACKEND': 'api.telemetry.InstrumentedCache',  # counts hits and misses per endpoint
+        'LOCATION': os.environ.get('CACHE_LOCATION', str(BASE_DIR / '.cache')),
+        'KEY_PREFIX': 'news',
+        'TIMEOUT': 60 * 15,
+        'OPTIONS': cache_options,
     }
 }
 
@@ -138,12 +194,12 @@ AUTH_USER_MODEL = 'api.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
+        'api.renderers.FastJSONRenderer',  # uses orjson when installed
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.StatelessJWTAuthentication',  # user built from token claims, no per-request fetch
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',  # limit/offset, or keyset with ?cursor=
     'PAGE_SIZE': 10,
     'DEFAULT_THROTTLE_CLASSES': [
         'rest_framework.throttling.AnonRateThrottle',
@@ -174,4 +230,79 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'ROTATE_REFRESH_TOKENS': True,
-}
\ No newline at end of file
+}
+# Materialized home feed (see api/feed.py)
+FEED_MAX_LENGTH = 800  # entries kept per user timeline
+FEED_FANOUT_LIMIT = 10000  # authors above this follower count are merged at read time
+FEED_CACHE_TIMEOUT = 60 * 15  # cached feed pages, expired early by generation bumps; bounds how stale counts get
+
+# Buffered article counters (see api/counters.py)
+COUNTER_FLUSH_INTERVAL = 5  # seconds between flushes of buffered favorite/comment deltas
+COUNTER_FLUSH_SIZE = 500  # flush early once this many articles have pending deltas
+
+# Stateless JWT authentication (see api/authentication.py)
+AUTH_TOKEN_VERSION_CACHE_TIMEOUT = 60 * 5  # how long a revocation can take to reach other workers
+
+# Popular tag list (see api/tags.py)
+TAG_POPULARITY_WINDOW = 30  # days of articles counted per tag
+TAG_LIST_REFRESH_INTERVAL = 60  # seconds before a background refresh is started
+
+# Bulk article ingestion (see api/ingest.py)
+ARTICLE_INGEST_CHUNK_SIZE = 500  # articles validated and written per transaction
+ARTICLE_BULK_MAX_ITEMS = 500  # per POST /api/articles/bulk/ request
+
+# Streaming exports and syndication feeds (see api/export.py)
+EXPORT_CHUNK_SIZE = 1000  # rows per keyset query
+EXPORT_FEED_ITEMS = 50  # newest articles in an RSS/Atom feed
+
+# Trending articles (see api/trending.py); changing these needs a rebuild_trending
+TRENDING_HALF_LIFE = 60 * 60 * 24  # seconds for an event's contribution to halve
+TRENDING_WEIGHTS = {'favorite': 1.0, 'comment': 2.0}
+# the first epoch; scores grow 2x per half-life after it and overflow after ~1000
+TRENDING_EPOCH = '2026-01-01T00:00:00+00:00'
+TRENDING_REBASE_AFTER = 100  # half-lives; a counter flush then moves the epoch to now
+
+# Related articles (see api/related.py)
+RELATED_ARTICLES_COUNT = 10  # kept per article
+RELATED_CANDIDATES_PER_TAG = 200  # newest articles of each shared tag considered per refresh
+RELATED_RECENCY_HALF_LIFE = 60 * 60 * 24 * 90  # seconds; older candidates count half as much per half-life
+
+# Batched follows (see api/follows.py)
+FOLLOW_BATCH_MAX = 100  # usernames per /api/follows/ request
+
+# Profile stats and caching (see api/profiles.py)
+PROFILE_CACHE_TIMEOUT = 60 * 5  # seconds a cached profile lives; writes drop it sooner
+
+# Multi-tag filtering and facet counts (see api/facets.py)
+TAG_FILTER_MAX_TAGS = 10  # tags per ?tags= filter
+TAG_FILTER_MAX_IDS = 5000  # larger matches are filtered with a semi-join instead of an IN list
+TAG_FACET_CANDIDATES = 30  # most popular tags counted as facets
+TAG_FACET_COUNT = 10  # facets returned
+TAG_POSTINGS_CACHE_TIMEOUT = 60 * 60  # seconds a tag's cached article id list lives
+
+# Request telemetry and query budgets (see api/telemetry.py)
+QUERY_BUDGETS = {  # most queries a request may run, by 'METHOD url-name' or url-name for every method
+    'GET articles-list': 10,  # ?tags= on cold caches: tag list and posting list rebuilds
+    'POST articles-list': 25,
+    'GET articles-detail': 6,
+    'PUT articles-detail': 15,
+    'DELETE articles-detail': 15,
+    'GET articles-search': 4,
+    'GET articles-trending': 4,
+    'GET articles-related': 4,
+    'GET feed-articles': 8,
+    'GET comments-list-create': 6,
+    'POST comments-list-create': 12,
+    'GET comments-detail': 4,
+    'GET profile': 3,
+    'GET profile-following': 4,
+    'GET tag-list': 4,
+    'GET follows': 2,
+}
+QUERY_BUDGET_DEFAULT = None  # for endpoints not listed; None means no budget
+QUERY_BUDGET_STRICT = False  # raise QueryBudgetExceeded instead of logging a warning (the tests do)
+QUERY_REPEAT_THRESHOLD = 5  # one statement run this often in a request is logged as a likely N+1
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # bearer token for GET /api/metrics/, unset disables it
+
+# Async views (see api/aio.py)
+ASYNC_PARALLEL_QUERIES = True  # run independent queries of one request on separate connections
@@ -16,10 +16,15 @@ elif [ "$1" = "shell" ]; then
     python3 manage.py shell
 elif [ "$1" = "test" ]; then
     python3 manage.py test
+elif [ "$1" = "bench-data" ]; then
+    DJANGO_SETTINGS_MODULE=news_project.bench_settings python3 manage.py migrate
+    DJANGO_SETTINGS_MODULE=news_project.bench_settings python3 manage.py generate_data --replace "${@:2}"
+elif [ "$1" = "bench" ]; then
+    DJANGO_SETTINGS_MODULE=news_project.bench_settings python3 manage.py benchmark_api "${@:2}"
 elif [ "$1" = "collectstatic" ]; then
     python3 manage.py collectstatic --noinput
 elif [ "$1" = "createsuperuser" ]; then
     python3 manage.py createsuperuser
 else
-    echo "Invalid option. Use 'migrate', 'migration', 'createapp', 'url', 'run', 'shell', 'test', 'collectstatic', or 'createsuperuser'."
+    echo "Invalid option. Use 'migrate', 'migration', 'createapp', 'url', 'run', 'shell', 'test', 'bench-data', 'bench', 'collectstatic', or 'createsuperuser'."
 fi
\ No newline at end of file